@@ -9,7 +9,7 @@
 
 位置:
 - 位于 agent/nodes 层
-- 负责向量检索、结果合并与基础去重
+- 负责向量检索 (扩展查询一次批量检索)、结果合并与基础去重
 
 声明:
 - 一旦本文件逻辑更新
@@ -23,22 +23,22 @@ from agent.core.rag_state import RAGState
 
 def retrieval_node(state: RAGState, vector_store, embed_func=None):
     results = []
-    for q in state["expanded_queries"]:
-        if embed_func:
-            query_vector = embed_func(q)
-            search_results = vector_store.search(query_vector, top_k=3)
-            docs = [
+    queries = state["expanded_queries"]
+    if embed_func:
+        # 所有扩展查询合并为一次批量检索
+        query_vectors = [embed_func(q) for q in queries]
+        for search_results in vector_store.search_batch(query_vectors, top_k=3):
+            results.extend(
                 Document(
                     page_content=r["text"], 
                     metadata=r.get("metadata", {})
                 ) for r in search_results
-            ]
-        elif hasattr(vector_store, "similarity_search"):
-            docs = vector_store.similarity_search(q, k=3)
-        else:
-            raise ValueError("Vector store requires an embed_func or similarity_search method.")
-        
-        results.extend(docs)
+            )
+    elif hasattr(vector_store, "similarity_search"):
+        for q in queries:
+            results.extend(vector_store.similarity_search(q, k=3))
+    else:
+        raise ValueError("Vector store requires an embed_func or similarity_search method.")
     
     # Merge and deduplicate
     unique = {}
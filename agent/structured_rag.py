@@ -100,27 +100,25 @@ class StructuredRAGAgent:
 
     def dense_node(self, state: RAGState):
         results = []
-        for q in state["expanded_queries"]:
-            # 使用项目定义的 BaseVectorStore 接口进行检索
-            # 如果提供了 embed_func，则先将文本转为向量
-            if self.embed_func:
-                query_vector = self.embed_func(q)
-                search_results = self.vector_store.search(query_vector, top_k=3)
-                
+        queries = state["expanded_queries"]
+        # 使用项目定义的 BaseVectorStore 接口进行检索
+        # 如果提供了 embed_func，则先将文本转为向量，再一次批量检索所有查询
+        if self.embed_func:
+            query_vectors = [self.embed_func(q) for q in queries]
+            for search_results in self.vector_store.search_batch(query_vectors, top_k=3):
                 # 将项目自定义的搜索结果格式转换为 LangChain Document 格式以便后续处理
-                docs = [
+                results.extend(
                     Document(
                         page_content=r["text"], 
                         metadata=r.get("metadata", {})
                     ) for r in search_results
-                ]
-            elif hasattr(self.vector_store, "similarity_search"):
-                # 兼容旧的 LangChain 风格接口（如果有的话）
-                docs = self.vector_store.similarity_search(q, k=3)
-            else:
-                raise ValueError("Vector store requires an embed_func or similarity_search method.")
-            
-            results.extend(docs)
+                )
+        elif hasattr(self.vector_store, "similarity_search"):
+            # 兼容旧的 LangChain 风格接口（如果有的话）
+            for q in queries:
+                results.extend(self.vector_store.similarity_search(q, k=3))
+        else:
+            raise ValueError("Vector store requires an embed_func or similarity_search method.")
         
         return {"dense_results": results}
 
@@ -5,6 +5,7 @@ input:
 
 output:
 - IngestResponse: 包含生成的 ID 列表
+- 409: 目标集合只读 (如快照服务存储)
 
 pos:
 - 位于 api/routes 层
@@ -21,6 +22,7 @@ from fastapi import APIRouter, UploadFile, File, Query, HTTPException
 from typing import Optional
 from pipeline.ingest_flow import ingest_file
 from api.models.schemas import IngestResponse
+from store.base import ReadOnlyStoreError
 
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
@@ -64,6 +66,9 @@ async def upload_and_ingest(
             ids=ids,
             count=len(ids)
         )
+    except ReadOnlyStoreError as e:
+        # 只读集合 (如快照服务存储) 不接受摄入
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -25,8 +25,27 @@ class Config:
     OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
     LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    # 持久化嵌入缓存：开关、SQLite 文件与条数上限 (0 表示不限，超出按 LRU 淘汰)
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.db")
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1000000"))
+    # OpenAI 嵌入请求：单请求估算 token 上限与条数上限、并发请求数、限流/临时故障重试次数
+    EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "20000"))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+    EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+    EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+    # 异步嵌入接口 (aembed 等) 中同步推理所用线程池的线程数，0 表示 CPU 核数
+    EMBEDDING_ASYNC_WORKERS = int(os.getenv("EMBEDDING_ASYNC_WORKERS", "0"))
 
     FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", "./data/faiss_index")
+    # 常驻内存的向量集合数上限与内存预算 (MB，0 表示不限)
+    VECTOR_STORE_MAX_COLLECTIONS = int(os.getenv("VECTOR_STORE_MAX_COLLECTIONS", "8"))
+    VECTOR_STORE_MEMORY_BUDGET_MB = float(os.getenv("VECTOR_STORE_MEMORY_BUDGET_MB", "0"))
+    # 异步接口 (asearch/aadd 等) 专用线程池的线程数，0 表示 CPU 核数
+    VECTOR_STORE_ASYNC_WORKERS = int(os.getenv("VECTOR_STORE_ASYNC_WORKERS", "0"))
+    # 检索结果缓存的条数上限 (0 表示关闭) 与有效期 (秒，0 表示不过期)
+    VECTOR_STORE_QUERY_CACHE_SIZE = int(os.getenv("VECTOR_STORE_QUERY_CACHE_SIZE", "1024"))
+    VECTOR_STORE_QUERY_CACHE_TTL = float(os.getenv("VECTOR_STORE_QUERY_CACHE_TTL", "300"))
 
     TOP_K = int(os.getenv("TOP_K", "5"))
     SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
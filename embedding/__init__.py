@@ -1,3 +1,7 @@
-from embedding.embedder import embed, embed_query
+from embedding.embedder import (
+    embed, embed_query, embed_array, aembed, aembed_query, aembed_array, warmup, close_embedders
+)
 
-__all__ = ["embed", "embed_query"]
+__all__ = [
+    "embed", "embed_query", "embed_array", "aembed", "aembed_query", "aembed_array", "warmup", "close_embedders"
+]
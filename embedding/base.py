@@ -4,6 +4,9 @@ input:
 
 output:
 - List[List[float]]: 向量列表
+- embed_array / aembed_array: (len(texts), dim) 的连续 float32 矩阵，向量不经 Python float 对象直达向量存储
+- aembed / aembed_query: 异步版本，默认在有界的嵌入线程池中执行同步实现
+- warmup / close: 预热 (加载权重、建立连接) 与释放资源的钩子，默认空实现
 
 pos:
 - 位于 embedding 层基类定义
@@ -17,6 +20,18 @@ pos:
 from abc import ABC, abstractmethod
 from typing import List
 
+import numpy as np
+
+from embedding.executor import run_in_embedding_executor
+
+
+def as_embedding_matrix(vectors) -> np.ndarray:
+    """统一为 (n, dim) 的连续 float32 矩阵；已满足要求的 ndarray 原样返回"""
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim == 2:
+        return matrix
+    return matrix.reshape(len(matrix), -1 if matrix.size else 0)
+
 
 class BaseEmbedder(ABC):
     @abstractmethod
@@ -26,3 +41,23 @@ class BaseEmbedder(ABC):
     @abstractmethod
     def embed_query(self, text: str) -> List[float]:
         pass
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """矩阵形式的嵌入结果；默认由 embed 的列表转换，能直接产出 ndarray 的子类应覆盖以省去列表"""
+        return as_embedding_matrix(self.embed(texts))
+
+    async def aembed_array(self, texts: List[str]) -> np.ndarray:
+        return await run_in_embedding_executor(self.embed_array, texts)
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """异步嵌入：默认把同步 embed 放到共享的有界线程池执行，有原生异步客户端的子类可覆盖"""
+        return await run_in_embedding_executor(self.embed, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed([text]))[0]
+
+    def warmup(self) -> None:
+        """预热：提前完成首次调用的一次性开销，使之后的调用只剩推理本身"""
+
+    def close(self) -> None:
+        """释放模型、连接池等资源；关闭后实例不应再使用"""
@@ -0,0 +1,272 @@
+"""
+input:
+- provider / model: 嵌入服务商与模型名称 (缓存键的一部分)
+- texts: 文本列表 (按 sha256 摘要寻址)
+- vectors: 嵌入器返回的向量
+- path / max_entries: SQLite 缓存文件路径与条数上限
+
+output:
+- EmbeddingCache: 持久化的内容寻址向量缓存 (批量 get/put，按最近使用时间 LRU 淘汰)
+- CachedEmbedder: 包装任意 BaseEmbedder，只把未命中的文本发给服务商 (同步/异步)；
+  命中的向量直接从 BLOB 映射为 float32，与新算出的矩阵拼成 embed_array 输出
+- get_embedding_cache: 按路径共享的缓存实例
+
+pos:
+- 位于 embedding 层
+- 重复摄入同一文件、未变化的文档重新切片时，已算过的块直接从磁盘取回，不再重复付费与等待
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.config import Config
+from embedding.base import BaseEmbedder, as_embedding_matrix
+from embedding.executor import run_in_embedding_executor
+from monitoring.metrics import Metrics
+
+
+# SQLite 单条语句的参数上限 (旧版本为 999)，批量查询时留出 provider/model 两个参数
+_MAX_VARIABLES = 900
+
+# 条数在进程内增量维护，每新增这么多条重新 COUNT 一次，校正其他进程对同一文件的写入
+_RECOUNT_INTERVAL = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (provider, model, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite 向量缓存：(provider, model, sha256(text)) → float32 向量
+
+    - 同一库可被多个嵌入器共享，provider/model 不同的向量互不干扰
+    - 每次命中或写入刷新 last_used；写入后条数超过 max_entries 时删除最久未用的条目
+      (条数按插入/淘汰增量维护，不在每次写入时全表 COUNT)
+    - WAL 模式，读写不互斥；连接加锁后可跨线程使用
+    """
+
+    def __init__(self, path: str = ":memory:", max_entries: int = 0):
+        """
+        Args:
+            path: SQLite 文件路径，":memory:" 时只在进程内有效
+            max_entries: 条数上限，0 表示不限
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.executescript(_SCHEMA)
+            self._recount()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, provider: str, model: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        批量查询
+
+        Returns:
+            命中的 text_hash → float32 向量 (只读)；未命中的键不出现在结果中
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock, self._conn:
+            for start in range(0, len(unique), _MAX_VARIABLES):
+                batch = unique[start:start + _MAX_VARIABLES]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE provider = ? AND model = ? AND text_hash IN ({marks})",
+                    (provider, model, *batch)
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                if rows:
+                    hits = [key for key, _ in rows]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? "
+                        f"WHERE provider = ? AND model = ? AND text_hash IN ({','.join('?' * len(hits))})",
+                        (now, provider, model, *hits)
+                    )
+        return found
+
+    def put_many(self, provider: str, model: str, hashes: Sequence[str], vectors):
+        """批量写入 (已存在的键覆盖)，超出 max_entries 时按 LRU 淘汰；vectors 可为 float32 矩阵或嵌套列表"""
+        if len(hashes) != len(vectors):
+            raise ValueError(f"Length mismatch: {len(hashes)} hashes vs {len(vectors)} vectors")
+        if not hashes:
+            return
+        now = time.time()
+        rows = [
+            (provider, model, key, vector.tobytes(), now)
+            for key, vector in zip(hashes, as_embedding_matrix(vectors))
+        ]
+        with self._lock, self._conn:
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (provider, model, text_hash, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            ).rowcount
+            if inserted < len(rows):
+                # 部分键已存在：覆盖其向量
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ? "
+                    "WHERE provider = ? AND model = ? AND text_hash = ?",
+                    [(blob, used, row_provider, row_model, key) for row_provider, row_model, key, blob, used in rows]
+                )
+            self._count += inserted
+            self._inserted_since_recount += inserted
+            if self._inserted_since_recount >= _RECOUNT_INTERVAL:
+                self._recount()
+            if self.max_entries > 0:
+                self._evict()
+
+    def _recount(self):
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._inserted_since_recount = 0
+
+    def _evict(self):
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._count -= self._conn.execute(
+                "DELETE FROM embeddings WHERE (provider, model, text_hash) IN "
+                "(SELECT provider, model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            ).rowcount
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM embeddings")
+            self._count = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedder(BaseEmbedder):
+    """
+    缓存层：先按文本摘要批量查缓存，只把未命中 (且去重后) 的文本交给被包装的嵌入器，
+    结果写回缓存后按原顺序拼出完整输出；命中/未命中条数上报 embedding_cache_total
+    """
+
+    def __init__(self, embedder: BaseEmbedder, provider: str, model: str, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.provider = provider
+        self.model = model
+        self.cache = cache
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.provider, self.model, hashes)
+        missing = self._missing(texts, hashes, vectors)
+        if missing:
+            computed = self.embedder.embed_array(list(missing.values()))
+            self.cache.put_many(self.provider, self.model, list(missing), computed)
+            vectors.update(zip(missing, computed))
+        return self._assemble(hashes, vectors)
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return (await self.aembed_array(texts)).tolist()
+
+    async def aembed_array(self, texts: List[str]) -> np.ndarray:
+        # SQLite 读写放到嵌入线程池，未命中部分走被包装嵌入器自己的异步实现
+        hashes = [text_hash(text) for text in texts]
+        vectors = await run_in_embedding_executor(self.cache.get_many, self.provider, self.model, hashes)
+        missing = self._missing(texts, hashes, vectors)
+        if missing:
+            computed = await self.embedder.aembed_array(list(missing.values()))
+            await run_in_embedding_executor(self.cache.put_many, self.provider, self.model, list(missing), computed)
+            vectors.update(zip(missing, computed))
+        return self._assemble(hashes, vectors)
+
+    @staticmethod
+    def _assemble(hashes: List[str], vectors: Dict[str, np.ndarray]) -> np.ndarray:
+        """按输入顺序逐行拷入预分配的 float32 矩阵"""
+        if not hashes:
+            return np.empty((0, 0), dtype=np.float32)
+        matrix = np.empty((len(hashes), len(vectors[hashes[0]])), dtype=np.float32)
+        for row, key in enumerate(hashes):
+            matrix[row] = vectors[key]
+        return matrix
+
+    def _missing(self, texts: List[str], hashes: List[str], vectors: Dict[str, np.ndarray]) -> Dict[str, str]:
+        """未命中的 text_hash → 文本 (去重)，并上报命中/未命中数"""
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        hits = len(texts) - sum(1 for key in hashes if key in missing)
+        self._report("hit", hits)
+        self._report("miss", len(texts) - hits)
+        return missing
+
+    def warmup(self) -> None:
+        self.embedder.warmup()
+
+    def close(self) -> None:
+        self.embedder.close()
+
+    def _report(self, result: str, count: int):
+        if count:
+            Metrics.inc_counter(
+                "embedding_cache_total", "嵌入缓存命中/未命中文本数",
+                amount=count, provider=self.provider, result=result
+            )
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: Optional[str] = None, max_entries: Optional[int] = None) -> EmbeddingCache:
+    """
+    按路径共享的缓存实例 (同一文件只开一个连接)
+
+    Args:
+        path: 缓存文件，默认 Config.EMBEDDING_CACHE_PATH
+        max_entries: 条数上限，默认 Config.EMBEDDING_CACHE_SIZE
+    """
+    path = path or Config.EMBEDDING_CACHE_PATH
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = EmbeddingCache(
+                path, Config.EMBEDDING_CACHE_SIZE if max_entries is None else max_entries
+            )
+        return cache
@@ -6,10 +6,13 @@ input:
 
 output:
 - List[List[float]]: 向量列表
+- embed_array / aembed_array: 连续 float32 ndarray (多文本为 (n, dim) 矩阵，单文本为一维向量)，可直接交给向量存储
+- aembed / aembed_query: 异步版本 (OpenAI 走共享异步客户端，本地模型走有界线程池)，不阻塞事件循环
+- warmup / close_embedders: 预热共享嵌入器 / 关闭全部共享嵌入器
 
 pos:
 - 位于 embedding 层对外唯一入口
-- 负责文本向量化
+- 负责文本向量化；嵌入器实例由 EmbedderFactory 按进程共享，每次调用不再重新加载模型或新建客户端
 
 声明：
 - 一旦本文件逻辑更新
@@ -17,6 +20,7 @@ pos:
 - 并更新所属目录的 README.md
 """
 from typing import List, Union, Optional
+import numpy as np
 from embedding.factory import EmbedderFactory
 
 
@@ -59,3 +63,91 @@ def embed_query(
     """
     embedder = EmbedderFactory.get_embedder(provider=provider, model=model, **kwargs)
     return embedder.embed_query(text)
+
+
+def embed_array(
+    texts: Union[str, List[str]],
+    provider: str = "openai",
+    model: Optional[str] = None,
+    **kwargs
+) -> np.ndarray:
+    """
+    嵌入为 float32 ndarray：向量不经 Python float 列表，从模型/接口直达向量存储
+
+    Returns:
+        单文本返回 (dim,) 向量，文本列表返回 (n, dim) 矩阵
+    """
+    embedder = EmbedderFactory.get_embedder(provider=provider, model=model, **kwargs)
+
+    is_single = isinstance(texts, str)
+    matrix = embedder.embed_array([texts] if is_single else texts)
+
+    return matrix[0] if is_single else matrix
+
+
+async def aembed(
+    texts: Union[str, List[str]],
+    provider: str = "openai",
+    model: Optional[str] = None,
+    **kwargs
+) -> Union[List[float], List[List[float]]]:
+    """
+    异步嵌入入口，参数与返回值同 embed
+    """
+    embedder = EmbedderFactory.get_embedder(provider=provider, model=model, **kwargs)
+
+    is_single = isinstance(texts, str)
+    text_list = [texts] if is_single else texts
+
+    embeddings = await embedder.aembed(text_list)
+
+    return embeddings[0] if is_single else embeddings
+
+
+async def aembed_array(
+    texts: Union[str, List[str]],
+    provider: str = "openai",
+    model: Optional[str] = None,
+    **kwargs
+) -> np.ndarray:
+    """
+    异步嵌入为 float32 ndarray，参数与返回值同 embed_array
+    """
+    embedder = EmbedderFactory.get_embedder(provider=provider, model=model, **kwargs)
+
+    is_single = isinstance(texts, str)
+    matrix = await embedder.aembed_array([texts] if is_single else texts)
+
+    return matrix[0] if is_single else matrix
+
+
+async def aembed_query(
+    text: str,
+    provider: str = "openai",
+    model: Optional[str] = None,
+    **kwargs
+) -> List[float]:
+    """
+    异步查询文本嵌入（单文本）
+    """
+    embedder = EmbedderFactory.get_embedder(provider=provider, model=model, **kwargs)
+    return await embedder.aembed_query(text)
+
+
+
+def warmup(
+    provider: str = "openai",
+    model: Optional[str] = None,
+    **kwargs
+) -> None:
+    """
+    预热共享嵌入器 (加载模型权重 / 建立连接)，服务启动时调用可避免首个请求承担冷启动开销
+    """
+    EmbedderFactory.warmup(provider=provider, model=model, **kwargs)
+
+
+def close_embedders() -> None:
+    """
+    关闭全部共享嵌入器，释放模型与连接池
+    """
+    EmbedderFactory.close_all()
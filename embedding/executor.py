@@ -0,0 +1,48 @@
+"""
+input:
+- fn / args / kwargs: 要在线程池中执行的同步嵌入调用 (本地模型推理、嵌入缓存读写)
+- max_workers: 线程数 (默认 Config.EMBEDDING_ASYNC_WORKERS，0 表示 CPU 核数)
+
+output:
+- run_in_embedding_executor: 可 await 的嵌入调用结果
+- embedding_executor / configure_embedding_executor: 获取 / 重新配置共享线程池
+
+pos:
+- 位于 embedding 层
+- utils.executor.BoundedExecutor 的嵌入层实例，与存储层线程池相互隔离：
+  没有原生异步客户端的嵌入器 (如本地模型) 在此执行，不阻塞事件循环，
+  并发请求再多也最多占用 max_workers 个线程，不会超额订阅 CPU
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config.config import Config
+from utils.executor import BoundedExecutor, cpu_workers
+
+
+_executor = BoundedExecutor("embedding-async", lambda: cpu_workers(Config.EMBEDDING_ASYNC_WORKERS))
+
+
+def embedding_executor() -> ThreadPoolExecutor:
+    """所有嵌入器共享的线程池 (首次使用时创建)"""
+    return _executor.executor()
+
+
+def configure_embedding_executor(max_workers: Optional[int] = None):
+    """
+    按新的并行度重建共享线程池；已提交的任务在旧线程池中继续执行完
+
+    Args:
+        max_workers: 线程数，None 时取默认值
+    """
+    _executor.configure(max_workers)
+
+
+async def run_in_embedding_executor(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """在共享线程池中执行同步调用并等待结果，不阻塞事件循环"""
+    return await _executor.run(fn, *args, **kwargs)
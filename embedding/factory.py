@@ -1,21 +1,28 @@
 """
 input:
 - provider: 嵌入器类型
+- cache: 是否包装持久化嵌入缓存 (默认 Config.EMBEDDING_CACHE_ENABLED)
 
 output:
-- BaseEmbedder: 对应类型的嵌入器实例
+- BaseEmbedder: 对应类型的嵌入器实例 (同一 (provider, model, 参数) 在进程内共享一个)
+- warmup / close / close_all: 预热共享实例、关闭并移出注册表
 
 pos:
 - 位于 embedding 层
 - 负责嵌入器分发，不负责具体嵌入逻辑
+- 实例注册表使本地模型权重只加载一次、OpenAI 客户端连接池被复用，重复调用只剩推理本身
 
 声明：
 - 一旦本文件逻辑更新
 - 必须同步更新本文件注释
 - 并更新所属目录的 README.md
 """
-from typing import Optional
+import json
+import threading
+from typing import Dict, Optional, Tuple
+from config.config import Config
 from embedding.base import BaseEmbedder
+from embedding.cache import CachedEmbedder, get_embedding_cache
 from embedding.providers.openai_handler import OpenAIEmbedder
 from embedding.providers.local_handler import LocalEmbedder
 
@@ -32,25 +39,119 @@ class EmbedderFactory:
         "local": "sentence-transformers/all-MiniLM-L6-v2"
     }
     
+    # (provider, model, 是否缓存, 其余参数) → 共享实例；构造按键加锁，
+    # 同一个模型并发首次请求只加载一次，不同模型的加载互不阻塞
+    _instances: Dict[Tuple, BaseEmbedder] = {}
+    _building: Dict[Tuple, threading.Lock] = {}
+    _lock = threading.Lock()
+
     @classmethod
     def get_embedder(
         cls,
         provider: Optional[str] = None,
         model: Optional[str] = None,
+        cache: Optional[bool] = None,
         **kwargs
     ) -> BaseEmbedder:
+        """
+        获取共享的嵌入器实例，首次请求时创建
+
+        Args:
+            provider: 嵌入器类型
+            model: 模型名称，默认取该类型的默认模型
+            cache: 是否包装持久化嵌入缓存，默认 Config.EMBEDDING_CACHE_ENABLED
+            **kwargs: 传给嵌入器构造函数的参数 (参与实例区分)
+        """
         provider = provider or cls._default_provider
         if provider not in cls._providers:
             raise ValueError(f"Unsupported provider: {provider}")
-        
+
         model = model or cls._default_model.get(provider)
+        cache = Config.EMBEDDING_CACHE_ENABLED if cache is None else cache
+        key = cls._key(provider, model, cache, kwargs)
+
+        with cls._lock:
+            embedder = cls._instances.get(key)
+            if embedder is not None:
+                return embedder
+            building = cls._building.setdefault(key, threading.Lock())
+        with building:
+            with cls._lock:
+                embedder = cls._instances.get(key)
+            if embedder is None:
+                embedder = cls._create(provider, model, cache, **kwargs)
+                with cls._lock:
+                    cls._instances[key] = embedder
+                    cls._building.pop(key, None)
+        return embedder
+
+    @classmethod
+    def _create(cls, provider: str, model: str, cache: bool, **kwargs) -> BaseEmbedder:
         embedder_class = cls._providers[provider]
         
         if provider == "openai":
-            return embedder_class(model=model, **kwargs)
+            embedder = embedder_class(model=model, **kwargs)
         else:
-            return embedder_class(model_name=model, **kwargs)
+            embedder = embedder_class(model_name=model, **kwargs)
+
+        if cache:
+            return CachedEmbedder(embedder, provider, model, get_embedding_cache())
+        return embedder
+
+    @staticmethod
+    def _key(provider: str, model: str, cache: bool, kwargs: dict) -> Tuple:
+        return provider, model, cache, json.dumps(kwargs, sort_keys=True, default=repr)
+
+    @classmethod
+    def warmup(
+        cls,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        **kwargs
+    ) -> BaseEmbedder:
+        """创建 (或取得) 共享实例并预热，适合在服务启动时调用"""
+        embedder = cls.get_embedder(provider=provider, model=model, **kwargs)
+        embedder.warmup()
+        return embedder
+
+    @classmethod
+    def close(
+        cls,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        cache: Optional[bool] = None,
+        **kwargs
+    ) -> bool:
+        """
+        关闭一个共享实例并移出注册表，下次 get_embedder 会重新创建
+
+        Returns:
+            该实例是否存在
+        """
+        provider = provider or cls._default_provider
+        model = model or cls._default_model.get(provider)
+        cache = Config.EMBEDDING_CACHE_ENABLED if cache is None else cache
+        with cls._lock:
+            embedder = cls._instances.pop(cls._key(provider, model, cache, kwargs), None)
+        if embedder is None:
+            return False
+        embedder.close()
+        return True
+
+    @classmethod
+    def close_all(cls) -> None:
+        """关闭全部共享实例 (进程退出或测试清理时调用)"""
+        with cls._lock:
+            embedders, cls._instances = list(cls._instances.values()), {}
+        for embedder in embedders:
+            embedder.close()
     
     @classmethod
     def register_provider(cls, name: str, embedder_class: type) -> None:
         cls._providers[name] = embedder_class
+        # 同名类型被替换后，旧类型的共享实例不再可用
+        with cls._lock:
+            stale = [key for key in cls._instances if key[0] == name]
+            embedders = [cls._instances.pop(key) for key in stale]
+        for embedder in embedders:
+            embedder.close()
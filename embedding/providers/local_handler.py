@@ -4,28 +4,45 @@ input:
 
 output:
 - List[List[float]]: 本地模型向量列表
+- embed_array: 模型输出的 float32 矩阵 (不经 tolist)
 
 pos:
 - 位于 embedding/providers 层
 - 负责调用本地 sentence-transformers 模型
+- 权重在构造时加载一次 (由 EmbedderFactory 按进程共享实例)，encode 加锁保证多线程共用安全
 
 声明：
 - 一旦本文件逻辑更新
 - 必须同步更新本文件注释
 - 并更新所属目录的 README.md
 """
+import threading
 from typing import List
-from embedding.base import BaseEmbedder
+import numpy as np
+from embedding.base import BaseEmbedder, as_embedding_matrix
 
 
 class LocalEmbedder(BaseEmbedder):
     def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
         from sentence_transformers import SentenceTransformer
         self.model = SentenceTransformer(model_name)
+        self._lock = threading.Lock()
     
     def embed(self, texts: List[str]) -> List[List[float]]:
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings.tolist()
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            embeddings = self.model.encode(texts, convert_to_numpy=True)
+        return as_embedding_matrix(embeddings)
     
     def embed_query(self, text: str) -> List[float]:
         return self.embed([text])[0]
+
+    def warmup(self) -> None:
+        # 首次 encode 会初始化 tokenizer 与计算图
+        self.embed(["warmup"])
+
+    def close(self) -> None:
+        with self._lock:
+            self.model = None
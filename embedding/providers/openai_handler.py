@@ -1,22 +1,93 @@
 """
 input:
 - texts: 文本列表
+- batch_tokens / batch_size: 单个请求的估算 token 上限与条数上限
+- max_workers: 并发请求数上限
+- max_retries / backoff: 限流与临时故障的重试次数与退避基数 (秒)
 
 output:
-- List[List[float]]: OpenAI 向量列表
+- List[List[float]]: OpenAI 向量列表 (与输入顺序一致)
+- aembed / aembed_query: 基于共享 AsyncOpenAI 客户端的异步版本，批次以协程并发
+  (同一事件循环上的所有调用共用一个信号量，总并发同样受 max_workers 限制)
+- embed_array / aembed_array: float32 矩阵形式 (以 base64 请求，直接解码进 ndarray，不生成 Python float 列表)
 
 pos:
 - 位于 embedding/providers 层
 - 负责调用 OpenAI Embeddings API
+- 客户端 (连接池) 随实例创建，由 EmbedderFactory 按进程共享；OpenAI 客户端本身线程安全
+- 大批输入按估算 token 数切成多个请求，在有界线程池中并发发送，
+  限流 (429)、超时、连接错误与 5xx 按带抖动的指数退避重试，结果按原顺序拼回
 
 声明：
 - 一旦本文件逻辑更新
 - 必须同步更新本文件注释
 - 并更新所属目录的 README.md
 """
+import asyncio
+import base64
+import logging
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
-from embedding.base import BaseEmbedder
-from openai import OpenAI
+import numpy as np
+from config.config import Config
+from embedding.base import BaseEmbedder, as_embedding_matrix
+from monitoring.metrics import Metrics
+from openai import AsyncOpenAI, OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+
+logger = logging.getLogger(__name__)
+
+# 可重试的错误：限流、超时、连接失败与服务端 5xx；其余 (鉴权、参数错误等) 直接抛出
+_RETRYABLE = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# 单次退避的上限 (秒)
+_MAX_BACKOFF = 30.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算 token 数：按 UTF-8 字节数 / 3
+
+    英文约 4 字节一个 token、中文约 3 字节一个 token，该估算对两者都偏保守，
+    不依赖 tiktoken，只用于切分批次
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def decode_embeddings(data) -> np.ndarray:
+    """按 index 排序并解码为 float32 矩阵；兼容服务若忽略 encoding_format 返回浮点列表也可处理"""
+    rows = [
+        np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+        if isinstance(item.embedding, str) else item.embedding
+        for item in sorted(data, key=lambda item: item.index)
+    ]
+    return as_embedding_matrix(rows)
+
+
+def plan_batches(texts: List[str], batch_tokens: int, batch_size: int) -> List[range]:
+    """
+    按顺序贪心切分：每批估算 token 数不超过 batch_tokens、条数不超过 batch_size
+
+    单条文本自身超过 batch_tokens 时独占一批 (是否截断由服务端决定)
+
+    Returns:
+        每批在 texts 中的下标区间
+    """
+    batches = []
+    start, tokens = 0, 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if i > start and (tokens + cost > batch_tokens or i - start >= batch_size):
+            batches.append(range(start, i))
+            start, tokens = i, 0
+        tokens += cost
+    if start < len(texts):
+        batches.append(range(start, len(texts)))
+    return batches
 
 
 class OpenAIEmbedder(BaseEmbedder):
@@ -24,17 +95,151 @@ class OpenAIEmbedder(BaseEmbedder):
         self,
         model: str = "text-embedding-3-small",
         api_key: Optional[str] = None,
-        base_url: Optional[str] = None
+        base_url: Optional[str] = None,
+        batch_tokens: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff: float = 0.5
     ):
+        """
+        Args:
+            model: 模型名称
+            api_key / base_url: 客户端参数，base_url 可指向兼容服务或本地替身
+            batch_tokens: 单个请求的估算 token 上限，默认 Config.EMBEDDING_BATCH_TOKENS
+            batch_size: 单个请求的条数上限，默认 Config.EMBEDDING_BATCH_SIZE
+            max_workers: 并发请求数上限，默认 Config.EMBEDDING_MAX_WORKERS
+            max_retries: 可重试错误的最大重试次数，默认 Config.EMBEDDING_MAX_RETRIES
+            backoff: 退避基数 (秒)，第 n 次重试在 [0, backoff·2^n] 内随机等待
+        """
         self.model = model
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
-    
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        response = self.client.embeddings.create(
-            input=texts,
-            model=self.model
+        self.batch_tokens = batch_tokens or Config.EMBEDDING_BATCH_TOKENS
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        self.max_workers = max_workers or Config.EMBEDDING_MAX_WORKERS
+        self.max_retries = Config.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = backoff
+        # 重试由本类统一处理，关闭客户端自带的重试以免叠加
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        # 异步客户端同样按实例共享，所有协程复用同一个连接池
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # asyncio.Semaphore 绑定事件循环，按循环各建一个，循环回收后随之释放
+        self._limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
         )
-        return [item.embedding for item in response.data]
-    
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
     def embed_query(self, text: str) -> List[float]:
         return self.embed([text])[0]
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        batches = plan_batches(texts, self.batch_tokens, self.batch_size)
+        if len(batches) <= 1:
+            return self._concat([self._embed_batch(texts[batch.start:batch.stop]) for batch in batches])
+
+        futures = [self._executor().submit(self._embed_batch, texts[batch.start:batch.stop]) for batch in batches]
+        # 按提交顺序取结果，输出顺序与输入一致
+        return self._concat([future.result() for future in futures])
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return (await self.aembed_array(texts)).tolist()
+
+    async def aembed_array(self, texts: List[str]) -> np.ndarray:
+        batches = plan_batches(texts, self.batch_tokens, self.batch_size)
+        limit = self._limit()
+
+        async def run(batch: range) -> np.ndarray:
+            async with limit:
+                return await self._aembed_batch(texts[batch.start:batch.stop])
+
+        return self._concat(await asyncio.gather(*(run(batch) for batch in batches)))
+
+    @staticmethod
+    def _concat(parts: List[np.ndarray]) -> np.ndarray:
+        if not parts:
+            return np.empty((0, 0), dtype=np.float32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        attempt = 0
+        while True:
+            try:
+                response = self.client.embeddings.create(
+                    input=texts,
+                    model=self.model,
+                    encoding_format="base64"
+                )
+                return decode_embeddings(response.data)
+            except _RETRYABLE as e:
+                time.sleep(self._next_retry(e, attempt))
+                attempt += 1
+
+    async def _aembed_batch(self, texts: List[str]) -> np.ndarray:
+        attempt = 0
+        while True:
+            try:
+                response = await self.async_client.embeddings.create(
+                    input=texts,
+                    model=self.model,
+                    encoding_format="base64"
+                )
+                return decode_embeddings(response.data)
+            except _RETRYABLE as e:
+                await asyncio.sleep(self._next_retry(e, attempt))
+                attempt += 1
+
+    def _next_retry(self, error: Exception, attempt: int) -> float:
+        """重试次数用尽时重新抛出 error，否则记录本次重试并返回等待时间"""
+        if attempt >= self.max_retries:
+            raise error
+        delay = self._retry_delay(error, attempt)
+        Metrics.inc_counter(
+            "embedding_retries_total", "嵌入请求重试次数",
+            provider="openai", reason=type(error).__name__
+        )
+        logger.warning("Embedding request failed (%s), retry %d/%d in %.2fs",
+                       type(error).__name__, attempt + 1, self.max_retries, delay)
+        return delay
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """全抖动指数退避；服务端给出 Retry-After 时以其为下限"""
+        delay = random.uniform(0, min(_MAX_BACKOFF, self.backoff * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(delay, min(_MAX_BACKOFF, float(retry_after))) if retry_after else delay
+        except ValueError:
+            return delay
+
+    def _limit(self) -> asyncio.Semaphore:
+        """当前事件循环上的并发请求信号量 (首次使用时创建)，并发的多个调用共享 max_workers 个名额"""
+        loop = asyncio.get_running_loop()
+        with self._pool_lock:
+            limit = self._limits.get(loop)
+            if limit is None:
+                limit = self._limits[loop] = asyncio.Semaphore(self.max_workers)
+            return limit
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="openai-embed")
+            return self._pool
+
+    def warmup(self) -> None:
+        # 发一次最小请求，提前完成 DNS/TLS 握手并填充连接池
+        self.embed(["warmup"])
+
+    def close(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        self.client.close()
+        try:
+            asyncio.get_running_loop().create_task(self.async_client.close())
+        except RuntimeError:
+            asyncio.run(self.async_client.close())
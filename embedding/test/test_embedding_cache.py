@@ -0,0 +1,147 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+from embedding.base import BaseEmbedder
+from embedding.cache import CachedEmbedder, EmbeddingCache, text_hash
+from embedding.factory import EmbedderFactory
+
+
+class CountingEmbedder(BaseEmbedder):
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+        self.calls = []
+        self.threads = []
+
+    def embed(self, texts):
+        self.threads.append(threading.current_thread().name)
+        self.calls.append(list(texts))
+        return [[float(len(text)) + self.offset, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed([text])[0]
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_only_misses_reach_provider(self):
+        inner = CountingEmbedder()
+        embedder = CachedEmbedder(inner, "fake", "m1", EmbeddingCache(self.path))
+        first = embedder.embed(["a", "bb", "a"])
+        self.assertEqual(first, [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]])
+        self.assertEqual(inner.calls, [["a", "bb"]])
+
+        self.assertEqual(embedder.embed(["bb", "ccc", "a"]), [[2.0, 0.5], [3.0, 0.5], [1.0, 0.5]])
+        self.assertEqual(inner.calls[1], ["ccc"])
+        self.assertEqual(embedder.embed_query("ccc"), [3.0, 0.5])
+        self.assertEqual(len(inner.calls), 2)
+
+    def test_async_embed_only_sends_misses(self):
+        inner = CountingEmbedder()
+        embedder = CachedEmbedder(inner, "fake", "m1", EmbeddingCache(self.path))
+        embedder.embed(["a"])
+
+        async def scenario():
+            return await embedder.aembed(["a", "bb", "bb"]), await embedder.aembed_query("bb")
+
+        vectors, query = asyncio.run(scenario())
+        self.assertEqual(vectors, [[1.0, 0.5], [2.0, 0.5], [2.0, 0.5]])
+        self.assertEqual(query, [2.0, 0.5])
+        self.assertEqual(inner.calls, [["a"], ["bb"]])
+        # 没有原生异步实现的嵌入器在共享嵌入线程池中执行
+        self.assertTrue(inner.threads[1].startswith("embedding-async"))
+
+    def test_embed_array_returns_float32_matrix(self):
+        inner = CountingEmbedder()
+        embedder = CachedEmbedder(inner, "fake", "m1", EmbeddingCache(self.path))
+        embedder.embed(["a"])
+        matrix = embedder.embed_array(["bb", "a", "bb"])
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertTrue(matrix.flags["C_CONTIGUOUS"])
+        np.testing.assert_array_equal(matrix, [[2.0, 0.5], [1.0, 0.5], [2.0, 0.5]])
+        self.assertEqual(inner.calls, [["a"], ["bb"]])
+        self.assertEqual(embedder.embed_array([]).shape, (0, 0))
+        self.assertEqual(asyncio.run(embedder.aembed_array(["a"])).tolist(), [[1.0, 0.5]])
+
+    def test_keys_include_provider_and_model(self):
+        cache = EmbeddingCache(self.path)
+        CachedEmbedder(CountingEmbedder(), "fake", "m1", cache).embed(["x"])
+        other = CachedEmbedder(CountingEmbedder(offset=10), "fake", "m2", cache)
+        self.assertEqual(other.embed(["x"]), [[11.0, 0.5]])
+        self.assertEqual(len(cache), 2)
+
+    def test_persists_across_instances(self):
+        cache = EmbeddingCache(self.path)
+        CachedEmbedder(CountingEmbedder(), "fake", "m1", cache).embed(["persisted"])
+        cache.close()
+
+        inner = CountingEmbedder()
+        self.assertEqual(
+            CachedEmbedder(inner, "fake", "m1", EmbeddingCache(self.path)).embed(["persisted"]),
+            [[9.0, 0.5]]
+        )
+        self.assertEqual(inner.calls, [])
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(self.path, max_entries=2)
+        hashes = [text_hash(t) for t in ("a", "b", "c")]
+        with mock.patch("embedding.cache.time.time", side_effect=[1.0, 2.0, 3.0, 4.0]):
+            cache.put_many("fake", "m1", hashes[:1], [[1.0]])
+            cache.put_many("fake", "m1", hashes[1:2], [[2.0]])
+            # 命中刷新 "a" 的使用时间，之后写入 "c" 时淘汰的是 "b"
+            self.assertEqual(cache.get_many("fake", "m1", hashes[:1])[hashes[0]].tolist(), [1.0])
+            cache.put_many("fake", "m1", hashes[2:], [[3.0]])
+        self.assertEqual(set(cache.get_many("fake", "m1", hashes)), {hashes[0], hashes[2]})
+
+    def test_entry_count_is_tracked_without_full_counts(self):
+        cache = EmbeddingCache(self.path, max_entries=3)
+        hashes = [text_hash(str(i)) for i in range(5)]
+        cache.put_many("fake", "m1", hashes[:2], [[0.0], [1.0]])
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+        # 覆盖已存在的键不增加条数
+        cache.put_many("fake", "m1", hashes[:3], [[5.0], [1.0], [2.0]])
+        cache.put_many("fake", "m1", hashes[3:], [[3.0], [4.0]])
+        cache._conn.set_trace_callback(None)
+        self.assertFalse([sql for sql in statements if "COUNT" in sql])
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache._count, 3)
+        self.assertEqual(len(cache.get_many("fake", "m1", hashes)), 3)
+        self.assertEqual(EmbeddingCache(self.path, max_entries=3)._count, 3)
+        cache.clear()
+        self.assertEqual(cache._count, 0)
+
+    def test_bulk_lookup_beyond_variable_limit(self):
+        cache = EmbeddingCache(self.path)
+        hashes = [text_hash(str(i)) for i in range(2000)]
+        cache.put_many("fake", "m1", hashes, [[float(i)] for i in range(2000)])
+        found = cache.get_many("fake", "m1", hashes)
+        self.assertEqual(len(found), 2000)
+        self.assertEqual(found[hashes[1999]].tolist(), [1999.0])
+
+    def test_factory_wraps_by_switch(self):
+        EmbedderFactory.register_provider("fake_cached", CountingEmbedder)
+        self.addCleanup(EmbedderFactory._providers.pop, "fake_cached")
+        self.addCleanup(EmbedderFactory.close_all)
+        with mock.patch("embedding.factory.get_embedding_cache", return_value=EmbeddingCache(self.path)), \
+                mock.patch.object(CountingEmbedder, "__init__", return_value=None) as init:
+            cached = EmbedderFactory.get_embedder("fake_cached", model="m1", cache=True)
+            plain = EmbedderFactory.get_embedder("fake_cached", model="m1", cache=False)
+        self.assertIsInstance(cached, CachedEmbedder)
+        self.assertEqual((cached.provider, cached.model), ("fake_cached", "m1"))
+        self.assertIsInstance(plain, CountingEmbedder)
+        init.assert_called_with(model_name="m1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from embedding import embedder as embedding_api
+from embedding.base import BaseEmbedder
+from embedding.cache import EmbeddingCache
+from embedding.factory import EmbedderFactory
+
+
+class SlowLoadingEmbedder(BaseEmbedder):
+    loads = 0
+
+    def __init__(self, model_name: str, dim: int = 2):
+        # 模拟加载模型权重
+        time.sleep(0.05)
+        type(self).loads += 1
+        self.model_name = model_name
+        self.dim = dim
+        self.warmed = False
+        self.closed = False
+
+    def embed(self, texts):
+        return [[1.0] * self.dim for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed([text])[0]
+
+    def warmup(self):
+        self.warmed = True
+
+    def close(self):
+        self.closed = True
+
+
+class TestEmbedderRegistry(unittest.TestCase):
+    def setUp(self):
+        SlowLoadingEmbedder.loads = 0
+        EmbedderFactory.register_provider("slow", SlowLoadingEmbedder)
+
+    def tearDown(self):
+        EmbedderFactory.close_all()
+        EmbedderFactory._providers.pop("slow")
+
+    def test_instances_shared_per_provider_model_and_kwargs(self):
+        first = EmbedderFactory.get_embedder("slow", model="m1", cache=False)
+        self.assertIs(EmbedderFactory.get_embedder("slow", model="m1", cache=False), first)
+        self.assertIsNot(EmbedderFactory.get_embedder("slow", model="m2", cache=False), first)
+        self.assertIsNot(EmbedderFactory.get_embedder("slow", model="m1", cache=False, dim=3), first)
+        self.assertEqual(SlowLoadingEmbedder.loads, 3)
+
+        # 模块入口复用同一实例
+        with mock.patch.object(SlowLoadingEmbedder, "embed", wraps=first.embed) as embed:
+            embedding_api.embed(["a"], provider="slow", model="m1", cache=False)
+        embed.assert_called_once()
+        self.assertEqual(SlowLoadingEmbedder.loads, 3)
+
+    def test_concurrent_first_calls_load_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(EmbedderFactory.get_embedder("slow", model="m1", cache=False)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(SlowLoadingEmbedder.loads, 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+    def test_warmup_and_close_hooks(self):
+        embedder = EmbedderFactory.warmup("slow", model="m1", cache=False)
+        self.assertTrue(embedder.warmed)
+
+        self.assertTrue(EmbedderFactory.close("slow", model="m1", cache=False))
+        self.assertTrue(embedder.closed)
+        self.assertFalse(EmbedderFactory.close("slow", model="m1", cache=False))
+        self.assertIsNot(EmbedderFactory.get_embedder("slow", model="m1", cache=False), embedder)
+
+        with mock.patch("embedding.factory.get_embedding_cache", return_value=EmbeddingCache()):
+            cached = EmbedderFactory.get_embedder("slow", model="m1", cache=True)
+        embedding_api.close_embedders()
+        self.assertTrue(cached.embedder.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
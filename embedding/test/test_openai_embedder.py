@@ -0,0 +1,143 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from openai import AuthenticationError
+from embedding.providers.openai_handler import OpenAIEmbedder, estimate_tokens, plan_batches
+
+
+class StandInServer:
+    """本地替身：/v1/embeddings 返回 [文本长度, 文本末尾数字]，可注入 429 与 401 并记录并发度"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = []
+        self.rate_limited = 0
+        self.status = 200
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server.lock:
+                    server.requests.append(body["input"])
+                    limited = server.rate_limited > 0
+                    server.rate_limited -= limited
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                time.sleep(server.delay)
+                with server.lock:
+                    server.active -= 1
+                if limited or server.status != 200:
+                    status = 429 if limited else server.status
+                    return self._reply(status, {"error": {"message": "stand-in error", "type": "error"}},
+                                       {"retry-after": "0"})
+                data = []
+                for i, text in enumerate(body["input"]):
+                    vector = np.array([len(text), float(text.rsplit("-", 1)[-1])], dtype=np.float32)
+                    embedding = (base64.b64encode(vector.tobytes()).decode()
+                                 if body.get("encoding_format") == "base64" else vector.tolist())
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+                # 打乱返回顺序，验证按 index 还原
+                self._reply(200, {"object": "list", "data": data[::-1], "model": body["model"],
+                                  "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+            def _reply(self, status, payload, headers=None):
+                raw = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestPlanBatches(unittest.TestCase):
+    def test_respects_token_and_size_limits(self):
+        texts = ["x" * 30] * 10  # 每条估算 11 token
+        self.assertEqual(estimate_tokens(texts[0]), 11)
+        self.assertEqual([len(b) for b in plan_batches(texts, batch_tokens=35, batch_size=100)], [3, 3, 3, 1])
+        self.assertEqual([len(b) for b in plan_batches(texts, batch_tokens=1000, batch_size=4)], [4, 4, 2])
+        # 超长文本独占一批
+        self.assertEqual([list(b) for b in plan_batches(["a", "y" * 300, "b"], 20, 10)], [[0], [1], [2]])
+        self.assertEqual(plan_batches([], 10, 10), [])
+
+
+class TestOpenAIEmbedder(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer(delay=0.05)
+        self.addCleanup(self.server.shutdown)
+        self.texts = [f"text-{i}" for i in range(20)]
+
+    def make_embedder(self, **kwargs):
+        embedder = OpenAIEmbedder(model="stand-in", api_key="test", base_url=self.server.base_url,
+                                  backoff=0.01, **kwargs)
+        self.addCleanup(embedder.close)
+        return embedder
+
+    def test_batches_run_concurrently_and_keep_order(self):
+        embedder = self.make_embedder(batch_tokens=1000, batch_size=3, max_workers=3)
+        vectors = embedder.embed(self.texts)
+        self.assertEqual([v[1] for v in vectors], [float(i) for i in range(20)])
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertEqual(self.server.peak, 3)
+
+        matrix = embedder.embed_array(self.texts)
+        self.assertEqual((matrix.shape, matrix.dtype), ((20, 2), np.float32))
+        self.assertTrue(matrix.flags["C_CONTIGUOUS"])
+        np.testing.assert_array_equal(matrix, vectors)
+
+    def test_rate_limits_are_retried(self):
+        self.server.rate_limited = 3
+        embedder = self.make_embedder(batch_size=5, max_workers=2, max_retries=5)
+        vectors = embedder.embed(self.texts)
+        self.assertEqual([v[1] for v in vectors], [float(i) for i in range(20)])
+        self.assertEqual(len(self.server.requests), 4 + 3)
+
+        self.server.rate_limited = 10
+        with self.assertRaises(Exception):
+            self.make_embedder(max_retries=1).embed(["text-0"])
+
+    def test_async_embed_uses_bounded_coroutines(self):
+        self.server.rate_limited = 2
+        embedder = self.make_embedder(batch_size=3, max_workers=3)
+
+        async def scenario():
+            return await asyncio.gather(embedder.aembed(self.texts), embedder.aembed_query("query-7"))
+
+        vectors, query = asyncio.run(scenario())
+        self.assertEqual([v[1] for v in vectors], [float(i) for i in range(20)])
+        self.assertEqual(query, [7.0, 7.0])
+        # 同一事件循环上的并发调用共用 max_workers 个名额
+        self.assertLessEqual(self.server.peak, 3)
+        self.assertGreater(self.server.peak, 1)
+        # 新的事件循环使用新的信号量，不会绑定到已关闭的循环
+        self.assertEqual(asyncio.run(embedder.aembed_query("query-8")), [7.0, 8.0])
+
+    def test_non_retryable_errors_fail_fast(self):
+        self.server.status = 401
+        with self.assertRaises(AuthenticationError):
+            self.make_embedder(max_retries=5).embed(["text-0"])
+        self.assertEqual(len(self.server.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 """
 input:
 - operation: 操作名称
+- amount: 计数器增量 (默认 1，批量操作可一次累加)
 - **labels: 额外标签
 
 output:
@@ -42,11 +43,11 @@ class Metrics:
         return cls._metrics[key]
     
     @classmethod
-    def inc_counter(cls, name: str, description: str = "", **labels):
+    def inc_counter(cls, name: str, description: str = "", amount: float = 1, **labels):
         if not _PROMETHEUS_AVAILABLE:
             return
         counter = cls._get_metric(name, "counter", description, **labels)
-        counter.labels(**labels).inc()
+        counter.labels(**labels).inc(amount)
     
     @classmethod
     def observe_histogram(cls, name: str, value: float, description: str = "", **labels):
@@ -1,7 +1,7 @@
 """
 input:
 - file_path: 文档路径
-- store_path: 向量存储持久化路径
+- store_path: 向量存储集合路径 (删除旧块、写入与持久化都作用于该集合)
 - embed_provider: 嵌入服务商
 - store_provider: 向量存储引擎
 
@@ -10,7 +10,8 @@ output:
 
 pos:
 - 位于 pipeline 层
-- 负责协调 ingestion -> embedding -> store 的完整摄入流水线
+- 负责协调 ingestion -> embedding -> store 的完整摄入流水线 (重复摄入按 source 替换旧块)
+- 向量以 float32 矩阵从嵌入器直接交给向量存储，中间不生成 Python float 列表
 
 声明：
 - 一旦本文件逻辑更新
@@ -20,7 +21,7 @@ pos:
 import os
 from typing import List, Dict, Any, Optional
 from ingestion.chunker import chunk
-from embedding.embedder import embed
+from embedding.embedder import embed_array
 from store import vector_store
 
 
@@ -36,6 +37,8 @@ def ingest_file(
 ) -> List[str]:
     """
     全流程摄入：文件 -> 解析切片 -> 向量化 -> 关键存 -> 持久化
+
+    重复摄入同一文件时，按 source 删除旧块后写入新块，无需重建整个索引。
     
     Args:
         file_path: 文档路径
@@ -67,20 +70,27 @@ def ingest_file(
     
     # 2. 向量化
     print(f"正在为 {len(texts)} 个数据块生成向量 (Provider: {embed_provider}) ...")
-    vectors = embed(
+    vectors = embed_array(
         texts=texts,
         provider=embed_provider,
         model=embed_model,
         **kwargs
     )
     
-    # 3. 存储
+    # 3. 存储：先删除该文件旧版本的块，再写入新块，只触及本文件的块
     print(f"正在存入向量数据库 (Provider: {store_provider}) ...")
+    vector_store.delete(
+        filter={"source": file_path},
+        provider=store_provider,
+        path=store_path,
+        **kwargs
+    )
     ids = vector_store.add(
         texts=texts,
         vectors=vectors,
         metadatas=metadatas,
         provider=store_provider,
+        path=store_path,
         **kwargs
     )
     
@@ -7,7 +7,7 @@ from pipeline.ingest_flow import ingest_file
 class TestIngestFlow(unittest.TestCase):
     
     @patch('pipeline.ingest_flow.chunk')
-    @patch('pipeline.ingest_flow.embed')
+    @patch('pipeline.ingest_flow.embed_array')
     @patch('pipeline.ingest_flow.vector_store')
     def test_ingest_file_success(self, mock_store, mock_embed, mock_chunk):
         # 准备 Mock 数据
@@ -43,12 +43,20 @@ class TestIngestFlow(unittest.TestCase):
             model=None
         )
         
+        # 验证旧版本块按 source 删除
+        mock_store.delete.assert_called_once_with(
+            filter={"source": "test.txt"},
+            provider="mock_store",
+            path="test_store"
+        )
+        
         # 验证存储调用
         mock_store.add.assert_called_once_with(
             texts=["chunk 1", "chunk 2"],
             vectors=[[0.1, 0.2], [0.3, 0.4]],
             metadatas=[mock_doc1.metadata, mock_doc2.metadata],
-            provider="mock_store"
+            provider="mock_store",
+            path="test_store"
         )
         
         # 验证持久化调用
@@ -1,12 +1,25 @@
 """
 input:
 - texts: 文本列表
-- vectors: 向量列表
-- query_vector: 查询向量
+- vectors: 向量矩阵 (连续 float32 ndarray，直接使用不拷贝；List[List[float]] 仍然接受)
+- query_vector: 查询向量 (ndarray 或 List[float])
+- query_vectors: 批量查询向量 (同 vectors)
+- fetch_k / lambda_mult: MMR 多样性检索的候选数与相关性权重
+- ids: 文档 ID (调用方指定，或由内容派生)
 - path: 持久化路径
+- a 前缀方法 (asearch/asearch_batch/aadd): 同名同步方法的异步版本
 
 output:
 - various: 接口定义
+- normalize_vectors: 按行 L2 归一化 (余弦度量在写入与查询时使用)
+- as_vector_matrix: 把 ndarray / 嵌套列表统一为连续 float32 二维矩阵
+- Vector / Vectors: 向量参数的类型别名
+- resolve_metric / prepare_vectors / check_top_k / within_threshold / collect_results:
+  各引擎共用的度量解析、写入/查询矩阵预处理 (维度校验、余弦归一化)、top_k 校验、阈值判断与结果组装
+- new_positions: 本次 add 实际需要写入的条目 (派生 ID 去重并跳过已存储的内容，调用方 ID 重复时报错)
+- ReadOnlyStoreError: 对只读存储 (如快照服务存储) 写入时抛出
+- always_load: 集合管理器是否在目录不存在或为空时也调用 load
+- content_generation: 存储内容代号 (写入、删除、加载后变化)，检索结果缓存以其为键的一部分
 
 pos:
 - 位于 store 层基类定义
@@ -17,17 +30,184 @@ pos:
 - 必须同步更新本文件注释
 - 并更新所属目录的 README.md
 """
+import hashlib
+import itertools
+import json
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from store.executor import run_in_store_executor
+
+
+# 内容代号在进程内全局递增：同一集合被淘汰后重新加载的新实例也不会与旧实例的代号重复
+_CONTENT_GENERATIONS = itertools.count(1)
+
+# 向量参数既接受 ndarray 也接受 Python 列表；ndarray 为连续 float32 时全程不拷贝
+Vector = Union[np.ndarray, List[float]]
+Vectors = Union[np.ndarray, List[List[float]]]
+
+
+def content_id(text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """由文本与元数据派生稳定的文档 ID：同一文件同一位置的同一内容始终得到同一 ID"""
+    payload = json.dumps(metadata or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{payload}\x00{text}".encode("utf-8")).hexdigest()
+
+
+METRICS = ("l2", "ip", "cosine")
+
+
+def resolve_metric(metric: Optional[str], engine: str) -> Tuple[str, Optional[str]]:
+    """
+    解析构造参数中的度量
+
+    Args:
+        metric: 构造参数 (不区分大小写)，None 表示未指定
+        engine: 引擎名称，用于错误信息
+
+    Returns:
+        (实际度量, 显式指定的度量)；显式指定的度量在 load 时与持久化的度量校验，
+        缺省时新建为 l2、加载时沿用持久化的度量
+    """
+    requested = metric.lower() if metric is not None else None
+    metric = requested or "l2"
+    if metric not in METRICS:
+        raise ValueError(f"Unsupported {engine} metric: {metric}")
+    return metric, requested
+
+
+def prepare_vectors(vectors: Vectors, dimension: Optional[int], metric: str) -> np.ndarray:
+    """写入与查询共用：转为 float32 矩阵并校验维度，余弦度量按行归一化"""
+    matrix = as_vector_matrix(vectors)
+    if dimension is not None and matrix.shape[1] != dimension:
+        raise ValueError(f"Vector dimension mismatch: expected {dimension}, got {matrix.shape[1]}")
+    if metric == "cosine":
+        matrix = normalize_vectors(matrix)
+    return matrix
+
+
+def check_top_k(top_k: int):
+    if top_k < 1:
+        raise ValueError(f"top_k must be at least 1, got {top_k}")
+
+
+def within_threshold(score, score_threshold: float, metric: str):
+    """score 可为标量或 numpy 数组；l2 越小越相似，ip/cosine 越大越相似"""
+    if metric == "l2":
+        return score <= score_threshold
+    return score >= score_threshold
+
+
+def collect_results(
+    scores: np.ndarray,
+    labels: np.ndarray,
+    docs: Dict[int, Dict[str, Any]],
+    top_k: int,
+    metric: str,
+    filter: Optional[Dict[str, Any]] = None,
+    score_threshold: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    组装单个查询的结果
+
+    Args:
+        scores / labels: 按相似度排好序的候选分数与 label (-1 或 docs 中没有的 label 跳过)
+        docs: label → 文档 (id/text/metadata)
+        filter: 仍需逐条检查的元数据过滤条件 (已由倒排索引预过滤时为 None)
+
+    候选已排序，第一个越过阈值的候选之后全部丢弃
+    """
+    # 延迟导入：metadata_index 依赖 faiss
+    from store.metadata_index import match_filter
+
+    results = []
+    for score, label in zip(scores, labels):
+        doc = docs.get(int(label))
+        if doc is None:
+            continue
+        if score_threshold is not None and not within_threshold(score, score_threshold, metric):
+            break
+        if filter and not match_filter(doc["metadata"], filter):
+            continue
+        results.append({"id": doc["id"], "text": doc["text"], "score": float(score), "metadata": doc["metadata"]})
+        if len(results) >= top_k:
+            break
+    return results
+
+
+def new_positions(ids: List[str], existing: Iterable[str], generated: bool) -> List[int]:
+    """
+    本次 add 需要写入的下标
+
+    Args:
+        ids: 与输入一一对应的文档 ID
+        existing: ids 中已存储的 ID
+        generated: ids 是否由 content_id 派生
+
+    - 调用方指定的 ID：一次调用内重复或已存在时抛出 ValueError
+    - 派生的 ID：ID 相同即内容相同，同一调用内只写第一条，已存储的内容跳过
+    """
+    existing = set(existing)
+    if not generated:
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in one add call")
+        if existing:
+            raise ValueError(f"Ids already exist, use upsert to overwrite: {sorted(existing)[:5]}")
+        return list(range(len(ids)))
+    positions = []
+    for position, doc_id in enumerate(ids):
+        if doc_id not in existing:
+            existing.add(doc_id)
+            positions.append(position)
+    return positions
+
+
+def as_vector_matrix(vectors: Vectors) -> np.ndarray:
+    """统一为连续 float32 二维矩阵；已满足要求的 ndarray 原样返回，空输入得到 0 行矩阵"""
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        return matrix.reshape(1 if matrix.size else 0, -1 if matrix.size else 0)
+    return matrix
+
+
+def normalize_vectors(matrix: np.ndarray) -> np.ndarray:
+    """按行 L2 归一化 (返回新数组，零向量保持为零)，归一化后内积即余弦相似度"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """存储按设计只读 (写入应通过其他途径完成，如离线发布新快照)"""
 
 
 class BaseVectorStore(ABC):
+    # 为 True 时集合管理器即使目录不存在或为空也调用 load (如监视目录、等待数据出现的存储)
+    always_load = False
+
+    @property
+    def content_generation(self) -> int:
+        """
+        内容代号：add/delete/load 等改变检索结果的操作完成后变化
+
+        读到相同代号的两次检索之间存储内容未变，检索结果缓存据此判断条目是否过期
+        """
+        generation = getattr(self, "_content_generation", None)
+        if generation is None:
+            generation = self._content_generation = next(_CONTENT_GENERATIONS)
+        return generation
+
+    def _bump_content_generation(self):
+        """实现方在写入/删除/加载生效后 (仍持写锁时) 调用"""
+        self._content_generation = next(_CONTENT_GENERATIONS)
+
     @abstractmethod
     def add(
         self, 
         texts: List[str], 
-        vectors: List[List[float]], 
+        vectors: Vectors, 
         metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
         **kwargs
     ) -> List[str]:
         """
@@ -37,16 +217,59 @@ class BaseVectorStore(ABC):
             texts: 原始文本内容
             vectors: 对应的向量列表
             metadatas: 对应的元数据
+            ids: 文档 ID，已存在或同一调用内重复时抛出 ValueError；
+                缺省时由 content_id 派生，相同内容只写入一次、已存储的内容跳过 (见 new_positions)
             
         Returns:
-            添加成功的 ID 列表
+            与输入一一对应的 ID 列表
+        """
+        pass
+
+    def upsert(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        """
+        插入或覆盖：已存在的 ID 先删除再写入
+
+        Returns:
+            写入的 ID 列表
+        """
+        if ids is None:
+            # 删除同内容的旧文档后按派生 ID 写入 (同一调用内的重复内容只写一次)
+            metadatas = metadatas or [{} for _ in texts]
+            self.delete(ids=[content_id(text, metadata) for text, metadata in zip(texts, metadatas)])
+            return self.add(texts, vectors, metadatas, **kwargs)
+        self.delete(ids=ids)
+        return self.add(texts, vectors, metadatas, ids=ids, **kwargs)
+
+    @abstractmethod
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> int:
+        """
+        按 ID 或元数据过滤条件删除
+
+        Args:
+            ids: 待删除的文档 ID (不存在的 ID 忽略)
+            filter: 元数据过滤条件，与 search 的 filter 语义一致
+
+        Returns:
+            实际删除的条数
         """
         pass
 
     @abstractmethod
     def search(
         self, 
-        query_vector: List[float], 
+        query_vector: Vector, 
         top_k: int = 5, 
         **kwargs
     ) -> List[Dict[str, Any]]:
@@ -62,6 +285,130 @@ class BaseVectorStore(ABC):
         """
         pass
 
+    def search_batch(
+        self,
+        query_vectors: Vectors,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量相似性检索，默认逐条调用 search，引擎可覆盖为一次矩阵检索
+
+        Args:
+            query_vectors: 查询向量列表
+            top_k: 每个查询返回的结果数
+            filter: 元数据过滤条件
+
+        Returns:
+            与 query_vectors 一一对应的结果列表
+        """
+        return [
+            self.search(query_vector, top_k, filter=filter, **kwargs)
+            for query_vector in query_vectors
+        ]
+
+    async def aadd(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        """add 的异步版本，在存储专用线程池中执行"""
+        return await run_in_store_executor(self.add, texts, vectors, metadatas, ids=ids, **kwargs)
+
+    async def asearch(
+        self,
+        query_vector: Vector,
+        top_k: int = 5,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        search 的异步版本
+
+        在存储专用的有界线程池中执行 (见 store.executor)，不阻塞事件循环；
+        faiss/NumPy 计算期间释放 GIL，多个检索可在线程池中真正并行。
+        """
+        return await run_in_store_executor(self.search, query_vector, top_k, **kwargs)
+
+    async def asearch_batch(
+        self,
+        query_vectors: Vectors,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        """search_batch 的异步版本，在存储专用线程池中执行"""
+        return await run_in_store_executor(self.search_batch, query_vectors, top_k, filter=filter, **kwargs)
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        按文档 ID 取回存储的向量
+
+        Returns:
+            文档 ID → 向量 (不存在的 ID 不出现在结果中)
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not expose stored vectors")
+
+    def search_mmr(
+        self,
+        query_vector: Vector,
+        top_k: int = 5,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        最大边际相关性 (MMR) 检索：先取 fetch_k 个最相似的候选，再从中挑出既相关又彼此不重复的 top_k 个
+
+        Args:
+            query_vector: 查询向量
+            top_k: 返回的结果数
+            fetch_k: 参与多样性选择的候选数
+            lambda_mult: 1 只看相关性 (等价于普通检索)，0 只看多样性
+            filter: 元数据过滤条件
+
+        Returns:
+            按选中顺序排列的结果，score 仍为检索的原始分数
+        """
+        # 延迟导入：mmr 依赖本模块的 normalize_vectors
+        from store.mmr import maximal_marginal_relevance
+
+        candidates = self.search(query_vector, max(top_k, fetch_k), filter=filter, **kwargs)
+        # 检索与取向量之间被删除的候选直接丢弃
+        vectors = self.get_vectors([candidate["id"] for candidate in candidates])
+        candidates = [candidate for candidate in candidates if candidate["id"] in vectors]
+        if not candidates:
+            return []
+        matrix = np.stack([vectors[candidate["id"]] for candidate in candidates])
+        selected = maximal_marginal_relevance(query_vector, matrix, top_k, lambda_mult)
+        return [candidates[i] for i in selected]
+
+    def compact(self) -> int:
+        """
+        物理清除已删除 (墓碑) 的条目，释放其占用的内存并加快检索
+
+        Returns:
+            清除的条目数；引擎未实现时为 0
+        """
+        return 0
+
+    def memory_bytes(self) -> int:
+        """
+        估算常驻内存字节数，供集合管理器按内存预算淘汰
+
+        Returns:
+            引擎未实现时为 0 (只按数量上限淘汰)
+        """
+        return 0
+
+    def close(self):
+        """释放实例持有的资源 (文件句柄、线程等)，之后实例不再可用"""
+        pass
+
     @abstractmethod
     def save(self, path: str):
         """持久化存储"""
@@ -0,0 +1,287 @@
+"""
+input:
+- labels: 向量 id (faiss label)
+- ids / texts / metadatas: 文档 ID、文本、元数据
+- vectors: 原始 float32 向量 (可选，供压缩索引精确重排)
+- path: 持久化目录
+- filename / originals_filename: 块存储与原始向量的快照文件名
+
+output:
+- ChunkStore: 以向量 id 为主键的 SQLite 块存储 (点查、批量取 top-k、追加、删除、原始向量、分步归还空闲页)
+
+pos:
+- 位于 store 层
+- 负责文本/元数据的存储与持久化，替代整体 pickle 的 InMemoryDocstore
+- 原始向量委托给 store.originals.OriginalVectors (磁盘文件)，不进入内存 SQLite 工作副本
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from store.originals import ORIGINALS_FILE, OriginalVectors
+
+
+CHUNKS_DB = "chunks.db"
+
+# SQLite 单条语句的参数上限 (旧版本为 999)
+_MAX_VARIABLES = 900
+
+# 增量 vacuum 须在建表前设置，之后删除产生的空闲页可分步归还
+_SCHEMA = """
+PRAGMA auto_vacuum = INCREMENTAL;
+CREATE TABLE IF NOT EXISTS chunks (
+    label INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+-- 旧快照的原始向量表，可写打开时迁移到 OriginalVectors 文件
+CREATE TABLE IF NOT EXISTS vectors (
+    label INTEGER PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+"""
+
+
+class ChunkStore:
+    """
+    SQLite 块存储：label (INTEGER PRIMARY KEY，即 rowid) → (文档 ID, 文本, 元数据 JSON)
+
+    - 可选地保存原始 float32 向量，压缩索引检索后据此精确重排候选；
+      向量存放在磁盘文件中 (OriginalVectors)，重排只读取候选行
+
+    - 工作副本放在内存数据库中，save 时通过 SQLite backup 写出快照并原子替换
+    - read_only 模式直接只读打开磁盘快照 (immutable + mmap)，多进程共享页缓存，
+      只有被查询的行才会读入
+    - 旧快照 vectors 表中的原始向量：可写打开时迁移到文件，只读打开时仍从表中读取
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        read_only: bool = False,
+        originals: Optional[OriginalVectors] = None
+    ):
+        self._conn = conn
+        self._lock = threading.Lock()
+        self.read_only = read_only
+        self._originals = originals or OriginalVectors()
+        if not read_only:
+            self._conn.executescript(_SCHEMA)
+            self._migrate_vectors()
+        self._legacy_vectors = read_only and _has_vector_rows(conn)
+
+    @classmethod
+    def memory(cls) -> "ChunkStore":
+        return cls(sqlite3.connect(":memory:", check_same_thread=False))
+
+    @classmethod
+    def open(
+        cls,
+        path: str,
+        read_only: bool = False,
+        filename: str = CHUNKS_DB,
+        originals_filename: str = ORIGINALS_FILE
+    ) -> "ChunkStore":
+        """
+        打开磁盘快照
+
+        Args:
+            path: 持久化目录
+            read_only: True 时只读映射快照文件；否则整库拷入内存作为可写工作副本
+                (原始向量拷贝为临时目录中的工作文件)
+            filename: 快照文件名
+            originals_filename: 原始向量快照文件名 (不存在时没有原始向量)
+        """
+        db_path = os.path.abspath(os.path.join(path, filename))
+        originals = OriginalVectors.open(os.path.join(path, originals_filename), read_only=read_only)
+        # 快照只会被整体替换 (rename)，已打开的 inode 内容不变，因此可声明 immutable 免去加锁
+        source = sqlite3.connect(f"file:{db_path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        if read_only:
+            source.execute("PRAGMA mmap_size = 1073741824")
+            return cls(source, read_only=True, originals=originals)
+
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        source.backup(conn)
+        source.close()
+        return cls(conn, originals=originals)
+
+    def save(self, path: str, filename: str = CHUNKS_DB, originals_filename: str = ORIGINALS_FILE):
+        """写出完整快照：先备份到临时文件，再原子替换；原始向量另存为 originals_filename"""
+        target = os.path.join(path, filename)
+        tmp = target + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        dest = sqlite3.connect(tmp)
+        with self._lock:
+            self._conn.commit()
+            self._conn.backup(dest)
+            self._originals.save(os.path.join(path, originals_filename))
+        dest.close()
+        os.replace(tmp, target)
+
+    def _migrate_vectors(self):
+        """把旧快照 vectors 表中的原始向量移入文件并清空该表"""
+        rows = self._conn.execute("SELECT label, vector FROM vectors ORDER BY label").fetchall()
+        if not rows:
+            return
+        self._originals.write(
+            [label for label, _ in rows], np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+        )
+        self._conn.execute("DELETE FROM vectors")
+
+    def memory_bytes(self) -> int:
+        """内存工作副本占用的字节数；只读映射的快照与磁盘上的原始向量由页缓存共享，不计入"""
+        if self.read_only:
+            return 0
+        with self._lock:
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def reclaim(self, step_pages: int = 256) -> int:
+        """
+        分步归还删除产生的空闲页，每步之间释放锁，检索可以插队
+
+        Returns:
+            归还的页数 (早于增量 vacuum 的旧快照无法增量归还，返回 0)
+        """
+        if self.read_only:
+            return 0
+        reclaimed = 0
+        while True:
+            with self._lock:
+                before = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if before == 0:
+                    break
+                self._conn.executescript(f"PRAGMA incremental_vacuum({step_pages});")
+                after = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if after >= before:
+                break
+            reclaimed += before - after
+        return reclaimed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            self._originals.close()
+
+    def add(
+        self,
+        labels: Iterable[int],
+        ids: Iterable[str],
+        texts: Iterable[str],
+        metadatas: Iterable[Dict[str, Any]],
+        vectors: Optional[np.ndarray] = None
+    ):
+        labels = list(labels)
+        rows = [
+            (label, doc_id, text, json.dumps(metadata, ensure_ascii=False, default=str))
+            for label, doc_id, text, metadata in zip(labels, ids, texts, metadatas)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO chunks (label, doc_id, text, metadata) VALUES (?, ?, ?, ?)", rows
+            )
+            if vectors is not None:
+                self._originals.write(labels, vectors)
+
+    def delete(self, labels: Iterable[int]) -> int:
+        labels = list(labels)
+        deleted = 0
+        with self._lock:
+            for batch in _batches(labels):
+                cursor = self._conn.execute(
+                    f"DELETE FROM chunks WHERE label IN ({_placeholders(batch)})", batch
+                )
+                deleted += cursor.rowcount
+            self._originals.clear(labels)
+        return deleted
+
+    def get(self, label: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT label, doc_id, text, metadata FROM chunks WHERE label = ?", (label,)
+            ).fetchone()
+        return _to_doc(row)[1] if row else None
+
+    def get_many(self, labels: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """批量点查：一次取回多个 label (如一批查询的全部 top-k)"""
+        labels = list(dict.fromkeys(labels))
+        docs: Dict[int, Dict[str, Any]] = {}
+        with self._lock:
+            for batch in _batches(labels):
+                rows = self._conn.execute(
+                    f"SELECT label, doc_id, text, metadata FROM chunks WHERE label IN ({_placeholders(batch)})",
+                    batch
+                ).fetchall()
+                docs.update(_to_doc(row) for row in rows)
+        return docs
+
+    def get_vectors(self, labels: Iterable[int]) -> Dict[int, np.ndarray]:
+        """批量取原始向量 (只读取这些行)，未保存向量的 label 不出现在结果中"""
+        labels = list(dict.fromkeys(labels))
+        with self._lock:
+            vectors = self._originals.read(labels)
+            if not self._legacy_vectors:
+                return vectors
+            for batch in _batches([label for label in labels if label not in vectors]):
+                rows = self._conn.execute(
+                    f"SELECT label, vector FROM vectors WHERE label IN ({_placeholders(batch)})", batch
+                ).fetchall()
+                vectors.update((label, np.frombuffer(blob, dtype=np.float32)) for label, blob in rows)
+        return vectors
+
+    def labels_of(self, ids: Iterable[str]) -> Dict[str, int]:
+        """文档 ID → label，不存在的 ID 不出现在结果中"""
+        mapping: Dict[str, int] = {}
+        with self._lock:
+            for batch in _batches(list(ids)):
+                rows = self._conn.execute(
+                    f"SELECT doc_id, label FROM chunks WHERE doc_id IN ({_placeholders(batch)})", batch
+                ).fetchall()
+                mapping.update(rows)
+        return mapping
+
+    def items(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """按 label 升序遍历全部记录"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT label, doc_id, text, metadata FROM chunks ORDER BY label"
+            ).fetchall()
+        for row in rows:
+            yield _to_doc(row)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+def _has_vector_rows(conn: sqlite3.Connection) -> bool:
+    try:
+        return conn.execute("SELECT 1 FROM vectors LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+
+
+def _to_doc(row: Tuple[int, str, str, str]) -> Tuple[int, Dict[str, Any]]:
+    label, doc_id, text, metadata = row
+    return label, {"id": doc_id, "text": text, "metadata": json.loads(metadata)}
+
+
+def _batches(values: List[Any]) -> Iterator[List[Any]]:
+    for start in range(0, len(values), _MAX_VARIABLES):
+        yield values[start:start + _MAX_VARIABLES]
+
+
+def _placeholders(values: List[Any]) -> str:
+    return ",".join("?" * len(values))
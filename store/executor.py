@@ -0,0 +1,47 @@
+"""
+input:
+- fn / args / kwargs: 要在线程池中执行的同步存储调用
+- max_workers: 线程数 (默认 Config.VECTOR_STORE_ASYNC_WORKERS，0 表示 CPU 核数)
+
+output:
+- run_in_store_executor: 可 await 的存储调用结果
+- store_executor / configure_store_executor: 获取 / 重新配置共享线程池
+
+pos:
+- 位于 store 层
+- 为异步调用方 (FastAPI 路由、异步 agent) 提供专用且有界的线程池 (utils.executor.BoundedExecutor 的存储层实例)：
+  检索不阻塞事件循环，并发请求再多也最多占用 max_workers 个线程，不会超额订阅 CPU
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config.config import Config
+from utils.executor import BoundedExecutor, cpu_workers
+
+
+_executor = BoundedExecutor("vector-store-async", lambda: cpu_workers(Config.VECTOR_STORE_ASYNC_WORKERS))
+
+
+def store_executor() -> ThreadPoolExecutor:
+    """所有存储实例共享的线程池 (首次使用时创建)"""
+    return _executor.executor()
+
+
+def configure_store_executor(max_workers: Optional[int] = None):
+    """
+    按新的并行度重建共享线程池；已提交的任务在旧线程池中继续执行完
+
+    Args:
+        max_workers: 线程数，None 时取默认值
+    """
+    _executor.configure(max_workers)
+
+
+async def run_in_store_executor(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """在共享线程池中执行同步调用并等待结果，不阻塞事件循环"""
+    return await _executor.run(fn, *args, **kwargs)
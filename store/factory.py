@@ -1,7 +1,11 @@
 """
 input:
-- provider: 存储接口类型 (如 faiss)
-- **kwargs: 传递给构造函数的参数
+- provider: 存储接口类型 (faiss / numpy / sharded / snapshot)
+- **kwargs: 传递给构造函数的参数 (faiss: index_type(含 auto)/metric/nlist/nprobe/m/ef_search/compression/rescore/
+  auto_train_threshold 等;
+  numpy: metric/dtype/score_threshold/indexed_fields/mmap;
+  sharded: num_shards/partition/max_workers，其余参数透传给每个 faiss 分片;
+  snapshot: provider/poll_interval/grace_period，其余参数透传给底层存储)
 
 output:
 - BaseVectorStore: 具体的存储实例
@@ -18,6 +22,9 @@ pos:
 from typing import Optional
 from store.base import BaseVectorStore
 from store.providers.faiss import FAISSVectorStore
+from store.providers.numpy_store import NumpyVectorStore
+from store.providers.sharded import ShardedVectorStore
+from store.providers.snapshot import SnapshotVectorStore
 
 
 class VectorStoreFactory:
@@ -25,9 +32,25 @@ class VectorStoreFactory:
     def get_vector_store(provider: str = "faiss", **kwargs) -> BaseVectorStore:
         """
         获取向量存储实例
+
+        Args:
+            provider: 存储引擎名称
+            **kwargs: 透传给具体存储构造函数，例如
+                get_vector_store("faiss", index_type="hnsw_flat", m=32, ef_search=128)
+                get_vector_store("faiss", compression="sq8", rescore=True)
+                get_vector_store("faiss", index_type="auto", auto_train_threshold=100000)
+                get_vector_store("numpy", dtype="float16", mmap=True)
+                get_vector_store("sharded", num_shards=8, partition="source", index_type="hnsw_flat")
+                get_vector_store("snapshot", provider="faiss", mmap=True, grace_period=60)
         """
         provider = provider.lower()
         if provider == "faiss":
             return FAISSVectorStore(**kwargs)
+        elif provider == "numpy":
+            return NumpyVectorStore(**kwargs)
+        elif provider == "sharded":
+            return ShardedVectorStore(**kwargs)
+        elif provider == "snapshot":
+            return SnapshotVectorStore(**kwargs)
         else:
             raise ValueError(f"Unsupported vector store provider: {provider}")
@@ -0,0 +1,173 @@
+"""
+input:
+- ids: 向量 id 列表
+- metadatas: 对应的元数据字典列表
+- filter: 元数据过滤条件 ({字段: 值} 或 {字段: [值, ...]})
+
+output:
+- MetadataIndex: 元数据倒排索引，filter → 命中 id 集合 / faiss IDSelector；without 剔除已删除 id
+- id_selector / exclude_selector: id 集合 → 包含 / 排除型 IDSelector
+- match_filter: 单条元数据是否满足 filter (未索引字段的逐条过滤)
+
+pos:
+- 位于 store 层
+- 负责元数据预过滤，使带过滤的向量检索与无过滤检索代价相当
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import json
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import faiss
+import numpy as np
+
+
+INDEX_FILE = "metadata_index.npz"
+
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+class MetadataIndex:
+    """
+    元数据倒排索引：(字段, 值) → 按 id 升序排列的倒排表
+
+    - 只索引标量值 (str/int/float/bool)
+    - indexed_fields 为 None 时索引全部字段，否则只索引指定字段
+    - 检索时将倒排表求交/并得到 id 集合，再转成 faiss IDSelector 交给索引过滤
+    """
+
+    def __init__(self, indexed_fields: Optional[Iterable[str]] = None):
+        self.indexed_fields = set(indexed_fields) if indexed_fields is not None else None
+        # 惰性加载时值为 npz 中的数组名，访问时才读入
+        self._postings: Dict[str, Dict[Any, Union[array, str]]] = {}
+        self._npz = None
+
+    def _is_indexed(self, field: str) -> bool:
+        return self.indexed_fields is None or field in self.indexed_fields
+
+    def add(self, ids: Iterable[int], metadatas: Iterable[Dict[str, Any]]):
+        """登记新 id 的元数据；调用方保证 id 单调递增，倒排表因此保持有序"""
+        for vector_id, metadata in zip(ids, metadatas):
+            for field, value in metadata.items():
+                if not self._is_indexed(field) or not isinstance(value, _SCALAR_TYPES):
+                    continue
+                values = self._postings.setdefault(field, {})
+                if value not in values:
+                    values[value] = array("q")
+                values[value].append(vector_id)
+
+    def can_serve(self, filter: Dict[str, Any]) -> bool:
+        """filter 中每个字段都已被索引且值为标量 (或标量列表) 时才能走倒排索引"""
+        for field, value in filter.items():
+            if not self._is_indexed(field):
+                return False
+            candidates = value if isinstance(value, list) else [value]
+            if not all(isinstance(v, _SCALAR_TYPES) for v in candidates):
+                return False
+        return True
+
+    def _posting(self, field: str, value: Any) -> np.ndarray:
+        posting = self._postings.get(field, {}).get(value)
+        if posting is None:
+            return np.empty(0, dtype=np.int64)
+        if isinstance(posting, str):
+            return self._npz[posting]
+        # 拷贝一份，避免 numpy 视图占住 array 缓冲区导致后续 append 失败
+        return np.frombuffer(posting, dtype=np.int64).copy()
+
+    def select(self, filter: Dict[str, Any]) -> np.ndarray:
+        """返回满足 filter 的 id (升序)；列表值视为 "in"，字段之间取交集"""
+        result: Optional[np.ndarray] = None
+        for field, value in filter.items():
+            if isinstance(value, list):
+                matched = np.unique(np.concatenate(
+                    [self._posting(field, v) for v in value] or [np.empty(0, dtype=np.int64)]
+                ))
+            else:
+                matched = self._posting(field, value)
+            result = matched if result is None else np.intersect1d(result, matched, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result if result is not None else np.empty(0, dtype=np.int64)
+
+    def without(self, ids: np.ndarray) -> "MetadataIndex":
+        """返回剔除了给定 id 的新索引 (压缩时使用；原索引不变，检索可继续读取)"""
+        index = MetadataIndex(self.indexed_fields)
+        for field, values in self._postings.items():
+            for value in values:
+                posting = self._posting(field, value)
+                kept = posting[~np.isin(posting, ids)]
+                if len(kept):
+                    index._postings.setdefault(field, {})[value] = array("q", kept.tobytes())
+        return index
+
+    def save(self, path: str, filename: str = INDEX_FILE):
+        keys: List[List[Any]] = []
+        arrays: Dict[str, np.ndarray] = {}
+        for field, values in self._postings.items():
+            for value, posting in values.items():
+                arrays[f"p{len(keys)}"] = np.array(posting, dtype=np.int64)
+                keys.append([field, value])
+        manifest = {
+            "indexed_fields": sorted(self.indexed_fields) if self.indexed_fields is not None else None,
+            "keys": keys,
+        }
+        target = os.path.join(path, filename)
+        with open(target + ".tmp", "wb") as f:
+            np.savez(f, manifest=np.array(json.dumps(manifest)), **arrays)
+        os.replace(target + ".tmp", target)
+
+    @classmethod
+    def load(cls, path: str, lazy: bool = False, filename: str = INDEX_FILE) -> "MetadataIndex":
+        """lazy=True 时只读入清单，倒排表在首次检索时才从 npz 中读取 (只读)"""
+        data = np.load(os.path.join(path, filename), allow_pickle=False)
+        manifest = json.loads(str(data["manifest"]))
+        index = cls(manifest["indexed_fields"])
+        for i, (field, value) in enumerate(manifest["keys"]):
+            index._postings.setdefault(field, {})[value] = f"p{i}" if lazy else array("q", data[f"p{i}"].tobytes())
+        if lazy:
+            index._npz = data
+        else:
+            data.close()
+        return index
+
+
+def match_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """元数据过滤：值为列表时视为 "in" 匹配"""
+    for key, value in filter.items():
+        if isinstance(value, list):
+            if metadata.get(key) not in value:
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+
+def id_selector(ids: np.ndarray, id_space: int) -> faiss.IDSelector:
+    """
+    将 id 集合转成 faiss IDSelector
+
+    命中集合相对 id 空间较小时用 IDSelectorBatch (哈希集合)，
+    否则用 IDSelectorBitmap (每个 id 一位，构造代价 O(id_space / 8))。
+    """
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    if len(ids) * 64 < id_space:
+        return faiss.IDSelectorBatch(ids)
+    mask = np.zeros(id_space, dtype=bool)
+    mask[ids] = True
+    # faiss 位图按小端位序: id i 对应 bitmap[i >> 3] 的第 (i & 7) 位
+    return faiss.IDSelectorBitmap(np.packbits(mask, bitorder="little"))
+
+
+def exclude_selector(ids: np.ndarray, id_space: int) -> faiss.IDSelector:
+    """排除给定 id 集合 (如墓碑) 的 IDSelector"""
+    inner = id_selector(ids, id_space)
+    sel = faiss.IDSelectorNot(inner)
+    # IDSelectorNot 只持有裸指针，需保留内层对象的引用
+    sel.referenced_objects = [inner]
+    return sel
@@ -0,0 +1,62 @@
+"""
+input:
+- query_vector: 查询向量
+- candidate_vectors: 候选向量矩阵 (按相似度排好序的 fetch_k 个检索结果)
+- top_k: 选出的结果数
+- lambda_mult: 相关性与多样性的权衡 (1 只看相关性，0 只看多样性)
+
+output:
+- 选中候选的下标列表 (按选中顺序)
+
+pos:
+- 位于 store 层
+- 最大边际相关性 (MMR) 选择：去掉互相高度重叠的候选块 (如 chunk_overlap 造成的近似重复)
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+from typing import List
+
+import numpy as np
+
+from store.base import normalize_vectors
+
+
+def maximal_marginal_relevance(
+    query_vector,
+    candidate_vectors,
+    top_k: int = 5,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    贪心 MMR：每一步选 lambda·sim(q, d) - (1-lambda)·max sim(d, 已选) 最大的候选
+
+    相似度统一用余弦。查询-候选、候选-候选相似度各用一次矩阵乘算好，
+    之后每选中一个候选只需用它那一行与 "到已选集合的最大相似度" 做一次逐元素 maximum，
+    不再逐对计算相似度。
+
+    Returns:
+        选中候选在 candidate_vectors 中的下标，按选中顺序
+    """
+    candidates = normalize_vectors(np.asarray(candidate_vectors, dtype=np.float32))
+    if len(candidates) == 0 or top_k <= 0:
+        return []
+    query = normalize_vectors(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected = []
+    for _ in range(min(top_k, len(candidates))):
+        # 第一步没有已选集合，redundancy 为 -inf，只按相关性挑选
+        penalty = np.where(np.isinf(redundancy), 0, redundancy)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
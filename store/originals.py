@@ -0,0 +1,145 @@
+"""
+input:
+- labels: 向量 id (faiss label)，即文件中的行号
+- vectors: 原始 float32 向量
+- path: 快照文件路径 (.npy)
+
+output:
+- OriginalVectors: 按 label 存放原始向量的磁盘文件 (np.memmap 访问，只读取被请求的行)
+- ORIGINALS_FILE: 默认快照文件名
+
+pos:
+- 位于 store 层
+- ChunkStore 的原始向量部分：压缩索引精确重排只读取候选行，原始向量不进入进程私有内存
+  (此前存放在内存 SQLite 工作副本的 vectors 表中，与压缩编码节省的内存相抵)
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+ORIGINALS_FILE = "originals.npy"
+
+# 工作文件扩容的最小行数
+_MIN_ROWS = 1024
+
+
+class OriginalVectors:
+    """
+    行号即 label 的 float32 矩阵文件，未写入或已删除的行为 NaN
+
+    - 可写副本是临时目录 (tempfile，遵循 TMPDIR) 中的工作文件，写满时按倍数扩容，close 或对象回收时删除
+    - read_only 模式直接只读映射快照文件，多进程共享页缓存
+    - save 写出 (最大 label + 1, dim) 的 .npy 快照并原子替换
+    - 不加锁，由 ChunkStore 在自己的锁内调用
+    """
+
+    def __init__(self, data: Optional[np.ndarray] = None, working: Optional[str] = None):
+        self._data = data
+        self._rows = 0 if data is None else len(data)
+        self._set_working(working)
+
+    @classmethod
+    def open(cls, path: str, read_only: bool = False) -> "OriginalVectors":
+        """
+        打开快照文件，文件不存在时为空
+
+        Args:
+            path: 快照文件路径
+            read_only: True 时只读映射快照；否则拷贝为可写工作文件
+        """
+        if not os.path.exists(path):
+            return cls()
+        if read_only:
+            return cls(np.load(path, mmap_mode="r"))
+        working = _scratch_file()
+        shutil.copyfile(path, working)
+        return cls(np.load(working, mmap_mode="r+"), working)
+
+    def write(self, labels: Iterable[int], vectors: np.ndarray):
+        labels = np.asarray(list(labels), dtype=np.int64)
+        if len(labels) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        rows = int(labels.max()) + 1
+        self._reserve(rows, vectors.shape[1])
+        self._data[labels] = vectors
+        self._rows = max(self._rows, rows)
+
+    def clear(self, labels: Iterable[int]):
+        if self._data is None:
+            return
+        labels = np.asarray(list(labels), dtype=np.int64)
+        self._data[labels[(labels >= 0) & (labels < self._rows)]] = np.nan
+
+    def read(self, labels: Iterable[int]) -> Dict[int, np.ndarray]:
+        """只读取请求的行，未保存向量的 label 不出现在结果中"""
+        if self._data is None:
+            return {}
+        labels = np.asarray(list(labels), dtype=np.int64)
+        labels = labels[(labels >= 0) & (labels < self._rows)]
+        rows = np.array(self._data[labels])
+        kept = ~np.isnan(rows[:, 0]) if len(rows) else np.zeros(0, dtype=bool)
+        return dict(zip(labels[kept].tolist(), rows[kept]))
+
+    def __len__(self) -> int:
+        """已保存的向量数"""
+        if self._data is None:
+            return 0
+        return int((~np.isnan(self._data[:self._rows, 0])).sum())
+
+    def save(self, path: str):
+        """写出快照：先写临时文件再原子替换；没有任何向量时不写文件"""
+        if self._data is None:
+            return
+        tmp = path + ".tmp"
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(self._rows, self._data.shape[1]))
+        out[:] = self._data[:self._rows]
+        out.flush()
+        del out
+        os.replace(tmp, path)
+
+    def close(self):
+        self._data = None
+        self._rows = 0
+        self._set_working(None)
+
+    def _set_working(self, working: Optional[str]):
+        """切换工作文件并删除旧的；未 close 就被回收时由 finalizer 删除"""
+        if getattr(self, "_remove_working", None) is not None:
+            self._remove_working()
+        self._working = working
+        self._remove_working = weakref.finalize(self, _remove, working) if working is not None else None
+
+    def _reserve(self, rows: int, dim: int):
+        if self._data is not None and self._working is not None and len(self._data) >= rows:
+            return
+        if self._data is not None and self._data.shape[1] != dim:
+            raise ValueError(f"Original vectors have dimension {self._data.shape[1]}, got {dim}")
+        capacity = max(rows, 2 * self._rows, _MIN_ROWS)
+        working = _scratch_file()
+        data = np.lib.format.open_memmap(working, mode="w+", dtype=np.float32, shape=(capacity, dim))
+        data[:self._rows] = self._data[:self._rows] if self._data is not None else 0
+        data[self._rows:] = np.nan
+        self._set_working(working)
+        self._data = data
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _scratch_file() -> str:
+    fd, path = tempfile.mkstemp(prefix="originals-", suffix=".npy")
+    os.close(fd)
+    return path
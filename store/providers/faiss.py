@@ -3,102 +3,1143 @@ input:
 - texts: 文本列表
 - vectors: 向量列表
 - metadatas: 字典列表 (可选)
+- index_type / metric (l2/ip/cosine) / nlist / nprobe / m / ef_search 等索引参数 (构造参数)
+- compression / rescore / rescore_factor: 向量压缩编码 (fp16/sq8/pq) 与原始向量精确重排
+- score_threshold: 分数阈值 (默认 config.Config.SIMILARITY_THRESHOLD)
+- indexed_fields: 建立倒排索引的元数据字段 (默认全部)
+- mmap: 是否以只读内存映射方式加载 (冷启动快、多进程共享页缓存)
+- ids: 文档 ID (可选，缺省由内容派生)
+- wal_compact_ratio: 预写日志超过基础快照该比例时压缩为新快照
+- add_batch_size: 批量写入时每次持有写锁写入的条数
+- auto_train_threshold / auto_growth: index_type="auto" 时切换到 IVF 的规模阈值与重新训练的增长倍数
+- compact_dead_ratio: 墓碑占比达到该值时后台压缩 (None 只按需 compact)
 
 output:
-- search_results: 搜索结果列表
+- search_results: 搜索结果列表，含文档 ID 与真实分数 (search_batch 返回每个查询一组)
+- ids: add/upsert 写入的文档 ID，delete 删除的条数，compact 物理移除的条数
+- 持久化目录: 按代编号的基础快照 + 追加式预写日志 (save 只追加本次变更)
+- compression_summary: 各压缩模式的内存占用与 recall@k 对比
+- generations: auto 模式每一代 IVF 索引的 recall@k 与检索延迟 (同时写入日志)
 
 pos:
 - 位于 store/providers 目录下
-- 实现 FAISS 向量存储及其持久化逻辑
+- 直接持有原生 faiss 索引 (Flat/IVFFlat/IVFPQ/HNSWFlat)，实现向量存储及其持久化逻辑
 
 声明：
 - 一旦本文件逻辑更新
 - 必须同步更新本文件注释
 - 并更新所属目录的 README.md
 """
+import json
+import logging
 import os
-import shutil
-from typing import List, Dict, Any, Optional
-from store.base import BaseVectorStore
-from langchain_community.vectorstores import FAISS
-from langchain_core.embeddings import Embeddings
+import pickle
+import re
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple
 
+import faiss
+import numpy as np
 
-class FakeEmbeddings(Embeddings):
-    """一个不执行任何操作的嵌入类，因为我们直接传入向量"""
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return []
-    def embed_query(self, text: str) -> List[float]:
-        return []
+from config.config import Config
+from store.base import (
+    BaseVectorStore, Vector, Vectors, check_top_k, collect_results, content_id, new_positions,
+    normalize_vectors, prepare_vectors, resolve_metric, within_threshold
+)
+from store.chunk_store import ChunkStore
+from store import wal
+from store.chunk_store import CHUNKS_DB
+from store.originals import ORIGINALS_FILE
+from store.metadata_index import INDEX_FILE as METADATA_INDEX_FILE
+from store.metadata_index import MetadataIndex, id_selector, exclude_selector, match_filter
+from store.rwlock import RWLock
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+STATE_FILE = "state.json"
+WAL_FILE = "wal.log"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+# 各代快照与日志文件: index.3.faiss / chunks.3.db / originals.3.npy / metadata_index.3.npz / wal.3.log
+_SNAPSHOT_PATTERN = re.compile(r"^(index|chunks|originals|metadata_index|wal)(\.\d+)?\.(faiss|db|npy|npz|log)$")
+
+
+def _snapshot_name(filename: str, generation: Optional[int]) -> str:
+    """在扩展名前插入代号；generation 为 None 时为未分代的旧布局"""
+    if generation is None:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{generation}{ext}"
+
+
+def _mmap_flags(index_type: str) -> int:
+    """
+    只读内存映射加载标志：IVF 倒排表用 IO_FLAG_MMAP 映射；
+    Flat/HNSW 的向量编码用 IO_FLAG_MMAP_IFC 零拷贝映射 (较新版本 faiss 才有，两者不能混用)
+    """
+    if index_type.startswith("ivf") or not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+_METRICS = {
+    "l2": faiss.METRIC_L2,
+    "ip": faiss.METRIC_INNER_PRODUCT,
+    # 余弦：写入与查询时归一化，再用内积检索
+    "cosine": faiss.METRIC_INNER_PRODUCT,
+}
+
+_COMPRESSIONS = ("none", "fp16", "sq8", "pq")
+
+# auto 模式训练 IVF 时每个聚类的最大训练点数与评估用的抽样查询数
+_TRAIN_POINTS_PER_LIST = 64
+_EVAL_QUERIES = 100
+
+# 墓碑数少于该值时不自动压缩，避免小集合频繁重建
+_COMPACT_MIN_DEAD = 1000
 
 
 class FAISSVectorStore(BaseVectorStore):
-    def __init__(self, dimension: Optional[int] = None):
+    """
+    基于原生 faiss 索引的向量存储
+
+    index_type 可选:
+    - flat: 暴力精确检索 (IndexFlatL2 / IndexFlatIP)
+    - ivf_flat: 倒排 + 原始向量 (nlist 个聚类, 检索时探测 nprobe 个)
+    - ivf_pq: 倒排 + 乘积量化 (pq_m 个子空间, 每个 pq_nbits 位)
+    - hnsw_flat: HNSW 图索引 (每个节点 m 个邻居, 检索宽度 ef_search)
+    - auto: 从 flat 起步，存活向量数达到 auto_train_threshold 时在后台训练 ivf_flat
+      (nlist≈4·sqrt(n))，之后规模每增长 auto_growth 倍重新训练一次；
+      新索引训练完成并补写训练期间的新增向量后原子替换，add/search 不被阻塞，
+      每一代的 recall@10 (相对精确检索) 与单查询延迟记入 generations 并写入日志
+
+    IVF 类索引需要训练，首次 add 的向量即作为训练集。
+
+    compression 替换 flat/ivf_flat/hnsw_flat 中的向量编码 (ivf_pq 本身即 PQ 编码):
+    - fp16: 半精度，内存 1/2，精度几乎无损
+    - sq8: 每维 int8 标量量化，内存 1/4，需要训练
+    - pq: 乘积量化 (pq_m 个子空间, 每个 pq_nbits 位)，内存约 1/(4·dim/pq_m)，需要训练
+    rescore=True 时原始向量另存于块存储的磁盘文件 (不占索引与进程内存，重排只读取候选行)，
+    检索先取 top_k * rescore_factor 个压缩候选，再用原始向量计算精确分数并重排。
+
+    文档 ID 由调用方指定或由内容派生 (content_id)，映射到单调递增的 int64 label，
+    通过 IndexIDMap2 写入索引。delete 只记录墓碑 (tombstones)，检索时用 IDSelector 排除，
+    因此更新一个文件只需 O(其块数) 的工作量，无需重建整个索引。
+    墓碑向量由 compact 物理移除：复制存活向量后在锁外重建索引 (沿用已训练的量化器)，
+    补写期间的新增后原子替换；墓碑占比达到 compact_dead_ratio 时在后台自动压缩。
+
+    文本与元数据存放在以 label 为主键的 SQLite 块存储 (ChunkStore) 中，检索结果一次批量取回。
+    mmap=True 时以只读内存映射方式加载，冷启动不反序列化文档，检索只读取命中的记录；
+    未写入过的映射存储 save 回原目录时什么也不做，首次写入或写出新快照时才转为内存副本。
+
+    持久化布局 (第 g 代): index.g.faiss + chunks.g.db + metadata_index.g.npz 为基础快照，
+    wal.g.log 为其后的追加式预写日志，state.json 记录当前代号并作为提交点。
+    对同一目录重复 save 时只把自上次 save 以来的 add/delete 追加进日志并 fsync；
+    日志超过基础快照大小的 wal_compact_ratio 倍 (或 save(compact=True)) 时写出第 g+1 代快照并清理旧代文件。
+    load 先加载基础快照再重放日志，崩溃留下的残缺尾部记录会被丢弃。
+    度量记录在 state.json 中：构造时显式指定了 metric 而与持久化的度量不同，load 直接报错，
+    不会把不同度量的向量与分数混在一起。
+
+    score 为 faiss 原始分数:
+    - ip: 内积相似度，越大越相似，低于 score_threshold 的结果被丢弃
+    - cosine: 向量在 add 与查询时归一化后的内积，即余弦相似度 ([-1, 1])，阈值语义同 ip
+    - l2: 平方 L2 距离，越小越相似，高于 score_threshold 的结果被丢弃
+    ip/cosine 下 score_threshold 默认取 Config.SIMILARITY_THRESHOLD；
+    l2 距离未经校准，默认不截断。search 时可传 score_threshold 覆盖 (None 表示不截断)。
+
+    并发：检索持读锁并行执行；写操作由写者互斥锁串行化，只在修改内存结构时短暂持写锁。
+    大批量 add 按 add_batch_size 分批持写锁写入，批次之间检索照常进行；
+    新 label 在整批 add 完成前对检索不可见 (可见水位 _visible_label)，检索始终看到完整的一次 add。
+
+    filter 优先走元数据倒排索引：先求出命中 id 集合，再通过 IDSelector 让 faiss
+    只在这些 id 中检索；filter 涉及未索引字段时退化为多取 fetch_k 个候选后逐条过滤。
+    """
+
+    def __init__(
+        self,
+        dimension: Optional[int] = None,
+        index_type: str = "flat",
+        metric: Optional[str] = None,
+        nlist: int = 100,
+        nprobe: int = 10,
+        pq_m: int = 8,
+        pq_nbits: int = 8,
+        m: int = 32,
+        ef_construction: int = 40,
+        ef_search: int = 64,
+        score_threshold: Optional[float] = None,
+        indexed_fields: Optional[List[str]] = None,
+        mmap: bool = False,
+        wal_compact_ratio: float = 0.5,
+        compression: Optional[str] = None,
+        rescore: bool = False,
+        rescore_factor: int = 4,
+        add_batch_size: int = 1024,
+        auto_train_threshold: int = 50000,
+        auto_growth: float = 4.0,
+        compact_dead_ratio: Optional[float] = 0.3,
+    ):
+        index_type = index_type.lower()
+        metric, requested_metric = resolve_metric(metric, "faiss")
+        compression = (compression or "none").lower()
+        if index_type not in ("flat", "ivf_flat", "ivf_pq", "hnsw_flat", "auto"):
+            raise ValueError(f"Unsupported faiss index type: {index_type}")
+        if compression not in _COMPRESSIONS:
+            raise ValueError(f"Unsupported faiss compression: {compression}")
+        if index_type == "ivf_pq" and compression not in ("none", "pq"):
+            raise ValueError("ivf_pq index already uses PQ codes, compression must be none or pq")
+
         self.dimension = dimension
-        self.vector_store: Optional[FAISS] = None
-        self.embeddings = FakeEmbeddings()
+        self.index_type = index_type
+        self.metric = metric
+        self._requested_metric = requested_metric
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.compression = compression
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        if score_threshold is None and metric != "l2":
+            score_threshold = Config.SIMILARITY_THRESHOLD
+        self.score_threshold = score_threshold
+        self.mmap = mmap
+        self.wal_compact_ratio = wal_compact_ratio
+        self.add_batch_size = add_batch_size
+        # auto: 当前实际使用的索引类型，从 flat 起步，规模越过阈值后切换为 ivf_flat
+        self.active_type = "flat" if index_type == "auto" else index_type
+        self.auto_train_threshold = auto_train_threshold
+        self.auto_growth = auto_growth
+        # 墓碑占索引向量的比例达到该值时后台压缩，None 表示只按需 compact
+        self.compact_dead_ratio = compact_dead_ratio
+        # 当前 IVF 训练时的存活向量数，增长 auto_growth 倍后重新训练
+        self.trained_size = 0
+        # 每次自动训练产生的新一代索引的评估记录
+        self.generations: List[Dict[str, Any]] = []
+
+        # IndexIDMap2 包裹的 faiss 索引，外部 id 即内部单调递增的 label
+        self.index: Optional[faiss.Index] = None
+        # label → {"id": 文档 ID, "text": 文本, "metadata": 元数据}
+        self.chunk_store = ChunkStore.memory()
+        # 已删除但仍留在 faiss 索引中的 label，检索时排除
+        self.tombstones: Set[int] = set()
+        self.next_label = 0
+        self._tombstone_ids: Optional[np.ndarray] = None
+        self.metadata_index = MetadataIndex(indexed_fields)
+        # mmap 只读加载时记录来源目录
+        self._mmap_path: Optional[str] = None
+        # 尚未落盘的变更记录，save 到同一目录时追加进预写日志；只在已有持久化目录时缓冲
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_bytes = 0
+        # 当前内存状态对应的持久化目录与快照代号
+        self._home: Optional[str] = None
+        self._generation: Optional[int] = None
+        # 小于该 label 的向量对检索可见；批量 add 完成时才推进
+        self._visible_label = 0
+        # 写者之间互斥 (可重入：upsert → delete/add，add → _materialize → load)
+        self._write_mutex = threading.RLock()
+        # 检索与内存结构修改之间的读写锁
+        self._rw = RWLock()
+        # 同一时间只有一个重建任务 (重新训练/压缩)；load/close 推进 _epoch，使进行中的重建作废
+        self._rebuild_lock = threading.Lock()
+        self._background: Optional[threading.Thread] = None
+        self._epoch = 0
+
+    def _config(self) -> Dict[str, Any]:
+        return {
+            "dimension": self.dimension,
+            "index_type": self.index_type,
+            "active_type": self.active_type,
+            "trained_size": self.trained_size,
+            "metric": self.metric,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "pq_m": self.pq_m,
+            "pq_nbits": self.pq_nbits,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "score_threshold": self.score_threshold,
+            "compression": self.compression,
+            "rescore": self.rescore,
+            "rescore_factor": self.rescore_factor,
+        }
+
+    def _encoding(self) -> str:
+        if self.active_type == "ivf_pq" or self.compression == "pq":
+            return f"PQ{self.pq_m}x{self.pq_nbits}"
+        if self.compression == "sq8":
+            return "SQ8"
+        if self.compression == "fp16":
+            return "SQfp16"
+        return "Flat"
+
+    def _factory_string(self) -> str:
+        if self.active_type in ("ivf_flat", "ivf_pq"):
+            return f"IVF{self.nlist},{self._encoding()}"
+        if self.active_type == "hnsw_flat":
+            return f"HNSW{self.m},{self._encoding()}"
+        return self._encoding()
+
+    def _build_index(self, train_vectors: np.ndarray) -> faiss.Index:
+        index = faiss.index_factory(self.dimension, self._factory_string(), _METRICS[self.metric])
+        if self.active_type == "hnsw_flat":
+            index.hnsw.efConstruction = self.ef_construction
+        if not index.is_trained:
+            min_train = self.nlist if self.active_type.startswith("ivf") else 1
+            if self._encoding().startswith("PQ"):
+                min_train = max(min_train, 1 << self.pq_nbits)
+            if len(train_vectors) < min_train:
+                raise ValueError(
+                    f"{self.active_type} index requires at least {min_train} vectors to train, "
+                    f"got {len(train_vectors)}"
+                )
+            index.train(train_vectors)
+        return faiss.IndexIDMap2(index)
+
+    def _search_params(self, sel: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+        if self.active_type in ("ivf_flat", "ivf_pq"):
+            params = faiss.SearchParametersIVF(nprobe=self.nprobe)
+        elif self.active_type == "hnsw_flat":
+            params = faiss.SearchParametersHNSW(efSearch=self.ef_search)
+        elif sel is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        if sel is not None:
+            params.sel = sel
+        return params
 
     def add(
-        self, 
-        texts: List[str], 
-        vectors: List[List[float]], 
+        self,
+        texts: List[str],
+        vectors: Vectors,
         metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
         **kwargs
     ) -> List[str]:
-        if not texts or not vectors:
+        if len(texts) == 0:
             return []
-            
-        # 构造文本与向量的对应关系
-        text_embeddings = list(zip(texts, vectors))
-        
-        if self.vector_store is None:
-            self.vector_store = FAISS.from_embeddings(
-                text_embeddings=text_embeddings,
-                embedding=self.embeddings,
-                metadatas=metadatas
-            )
-        else:
-            self.vector_store.add_embeddings(
-                text_embeddings=text_embeddings,
-                metadatas=metadatas
-            )
-            
-        return [str(i) for i in range(len(texts))]
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+        with self._write_mutex:
+            return self._add(texts, vectors, metadatas, ids)
+
+    def _add(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]],
+        ids: Optional[List[str]]
+    ) -> List[str]:
+        self._materialize()
+
+        metadatas = metadatas or [{} for _ in texts]
+        generated = ids is None
+        if generated:
+            ids = [content_id(text, metadata) for text, metadata in zip(texts, metadatas)]
+        if len(ids) != len(texts):
+            raise ValueError("ids and texts must have the same length")
+        all_ids = list(ids)
+        positions = new_positions(ids, self.chunk_store.labels_of(ids), generated)
+        if not positions:
+            return all_ids
+
+        matrix = prepare_vectors(vectors, self.dimension, self.metric)
+        if len(positions) < len(ids):
+            # 派生 ID 重复或内容已存储的条目不再写入
+            matrix = matrix[positions]
+            texts = [texts[i] for i in positions]
+            metadatas = [metadatas[i] for i in positions]
+            ids = [ids[i] for i in positions]
+        if self.index is None:
+            # 索引为空时检索直接返回，训练期间无需持锁
+            self.dimension = matrix.shape[1]
+            index = self._build_index(matrix)
+            with self._rw.write():
+                self.index = index
+
+        labels = list(range(self.next_label, self.next_label + len(texts)))
+        # 分批持写锁，批次之间让出给检索；新 label 在水位推进前不可见
+        for start in range(0, len(labels), self.add_batch_size):
+            end = start + self.add_batch_size
+            with self._rw.write():
+                self._apply_add(labels[start:end], matrix[start:end], ids[start:end], texts[start:end], metadatas[start:end])
+        with self._rw.write():
+            self._visible_label = self.next_label
+            self._bump_content_generation()
+        if self._home is not None:
+            # 拷贝向量：调用方之后修改自己的数组不影响待写日志
+            self._log(wal.add_record(labels, matrix.copy(), list(ids), list(texts), metadatas))
+        self._maybe_rebuild()
+
+        return all_ids
+
+    def _apply_add(
+        self,
+        labels: List[int],
+        matrix: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]]
+    ):
+        self.index.add_with_ids(matrix, np.array(labels, dtype=np.int64))
+        self.next_label = max(self.next_label, labels[-1] + 1)
+        self.chunk_store.add(labels, ids, texts, metadatas, vectors=matrix if self.rescore else None)
+        self.metadata_index.add(labels, metadatas)
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> int:
+        if ids is None and filter is None:
+            raise ValueError("delete requires ids or filter")
+        with self._write_mutex:
+            self._materialize()
+
+            labels = set()
+            if ids is not None:
+                labels.update(self.chunk_store.labels_of(ids).values())
+            if filter:
+                labels.update(self._labels_matching(filter))
+
+            if labels:
+                labels = sorted(labels)
+                with self._rw.write():
+                    self._apply_delete(labels)
+                    self._bump_content_generation()
+                if self._home is not None:
+                    self._log(wal.delete_record(labels))
+                self._maybe_rebuild()
+            return len(labels)
+
+    def upsert(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        # 删除与写入之间不允许插入其他写者
+        with self._write_mutex:
+            return super().upsert(texts, vectors, metadatas, ids=ids, **kwargs)
+
+    def _log(self, record: Dict[str, Any]):
+        """
+        缓冲一条待追加进预写日志的变更
+
+        只在已有持久化目录 (_home) 时调用：没有目录的存储下次 save 必然写出完整快照，
+        缓冲只会在内存中多存一份向量与文本
+        """
+        self._pending.append(record)
+        self._pending_bytes += wal.record_bytes(record)
+
+    def _clear_pending(self):
+        self._pending = []
+        self._pending_bytes = 0
+
+    def _apply_delete(self, labels: List[int]):
+        # 只打墓碑，不动 faiss 索引：检索时通过 IDSelector 排除，物理删除留给压缩
+        self.chunk_store.delete(labels)
+        self.tombstones.update(labels)
+        self._tombstone_ids = None
+
+    def _labels_matching(self, filter: Dict[str, Any]) -> List[int]:
+        if self.metadata_index.can_serve(filter):
+            return [label for label in self.metadata_index.select(filter).tolist() if label not in self.tombstones]
+        return [label for label, doc in self.chunk_store.items() if match_filter(doc["metadata"], filter)]
+
+    def _dead_ids(self) -> np.ndarray:
+        if self._tombstone_ids is None:
+            self._tombstone_ids = np.array(sorted(self.tombstones), dtype=np.int64)
+        return self._tombstone_ids
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """rescore 模式返回块存储中的原始向量，否则从索引中重建 (压缩编码时为解码后的近似值)"""
+        with self._rw.read():
+            needs_map = self.index is not None and not _has_direct_map(self.index)
+        if needs_map:
+            # IVF 按 id 重建向量需要直接映射表，只在首次建立时短暂持写锁
+            with self._rw.write():
+                if self.index is not None:
+                    _ensure_direct_map(self.index)
+
+        with self._rw.read():
+            if self.index is None:
+                return {}
+            mapping = {
+                doc_id: label for doc_id, label in self.chunk_store.labels_of(ids).items()
+                if label < self._visible_label
+            }
+            if not mapping:
+                return {}
+            if self.rescore:
+                originals = self.chunk_store.get_vectors(list(mapping.values()))
+                if len(originals) == len(mapping):
+                    return {doc_id: originals[label] for doc_id, label in mapping.items()}
+            vectors = self.index.reconstruct_batch(np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping)))
+            return dict(zip(mapping, vectors))
 
     def search(
-        self, 
-        query_vector: List[float], 
-        top_k: int = 5, 
+        self,
+        query_vector: Vector,
+        top_k: int = 5,
         filter: Optional[Dict[str, Any]] = None,
         **kwargs
     ) -> List[Dict[str, Any]]:
-        if self.vector_store is None:
+        return self.search_batch([query_vector], top_k, filter=filter, **kwargs)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Vectors,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        fetch_k: int = 20,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        check_top_k(top_k)
+        if len(query_vectors) == 0:
             return []
-            
-        # 使用 LangChain 的 similarity_search_by_vector
-        # 它支持 filter 参数进行元数据过滤
-        docs_with_score = self.vector_store.similarity_search_by_vector(
-            embedding=query_vector,
-            k=top_k,
-            filter=filter
-        )
-        
-        results = []
-        for doc in docs_with_score:
-            results.append({
-                "text": doc.page_content,
-                "score": 0.0,  # LangChain 的这个接口某些版本不直接返回分数，如果需要分数可用 similarity_search_with_score_by_vector
-                "metadata": doc.metadata
+        with self._rw.read():
+            return self._search_batch(query_vectors, top_k, filter, fetch_k, **kwargs)
+
+    def _search_batch(
+        self,
+        query_vectors: Vectors,
+        top_k: int,
+        filter: Optional[Dict[str, Any]],
+        fetch_k: int,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        if self.index is None or self._live_count() == 0:
+            return [[] for _ in query_vectors]
+
+        queries = prepare_vectors(query_vectors, self.dimension, self.metric)
+        visible = self._visible_label
+        sel = None
+        k = top_k
+        if filter and self.metadata_index.can_serve(filter):
+            # 倒排索引预过滤：faiss 只在命中的存活 id 中检索，无需再逐条过滤
+            matched = self.metadata_index.select(filter)
+            if visible < self.next_label:
+                matched = matched[matched < visible]
+            if self.tombstones:
+                matched = np.setdiff1d(matched, self._dead_ids(), assume_unique=True)
+            if len(matched) == 0:
+                return [[] for _ in query_vectors]
+            sel = id_selector(matched, visible)
+            filter = None
+        else:
+            if filter:
+                # 未索引字段：先多取 fetch_k 个候选，再按元数据过滤
+                k = max(top_k, fetch_k)
+            if self.tombstones:
+                sel = exclude_selector(self._dead_ids(), self.next_label)
+            if visible < self.next_label:
+                sel = _visible_selector(visible, sel)
+        if self.rescore:
+            k = max(k, top_k * self.rescore_factor)
+        # 所有查询合并为一次矩阵检索
+        distances, labels = self.index.search(queries, k, params=self._search_params(sel))
+        if self.rescore:
+            distances, labels = self._rescore(queries, distances, labels)
+        score_threshold = kwargs.get("score_threshold", self.score_threshold)
+
+        # 一次批量取回所有查询中过阈值候选的文本与元数据
+        candidates = labels >= 0
+        if score_threshold is not None:
+            candidates &= within_threshold(distances, score_threshold, self.metric)
+        docs = self.chunk_store.get_many(labels[candidates].tolist())
+
+        return [
+            collect_results(row_distances, row_labels, docs, top_k, self.metric, filter, score_threshold)
+            for row_distances, row_labels in zip(distances, labels)
+        ]
+
+    def _rescore(
+        self,
+        queries: np.ndarray,
+        distances: np.ndarray,
+        labels: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """用原始向量重新计算候选的精确分数并按其排序；没有原始向量的候选保留压缩分数"""
+        originals = self.chunk_store.get_vectors(labels[labels >= 0].tolist())
+        if not originals:
+            return distances, labels
+        found = np.isin(labels, np.fromiter(originals, dtype=np.int64, count=len(originals)))
+        rows, cols = np.nonzero(found)
+        candidates = np.stack([originals[label] for label in labels[rows, cols].tolist()])
+        if self.metric == "l2":
+            exact = np.square(candidates - queries[rows]).sum(axis=1)
+        else:
+            exact = np.einsum("ij,ij->i", candidates, queries[rows])
+
+        distances = distances.copy()
+        distances[rows, cols] = exact
+        # 空位 (label = -1) 排到最后
+        worst = np.inf if self.metric == "l2" else -np.inf
+        distances[labels < 0] = worst
+        order = np.argsort(distances if self.metric == "l2" else -distances, axis=1, kind="stable")
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+    def memory_bytes(self) -> int:
+        """
+        估算常驻内存：向量编码 + 图/倒排开销 + id 映射 + 内存中的块存储 + 待写日志缓冲；
+        mmap 映射部分由页缓存共享，不计入
+        """
+        with self._rw.read():
+            if self.index is None:
+                return 0
+            # IndexIDMap2 的正反向 id 映射
+            per_vector = 16
+            if self._mmap_path is None:
+                base = faiss.downcast_index(self.index.index)
+                if isinstance(base, faiss.IndexHNSW):
+                    # 第 0 层每个节点 2m 个 int32 邻居
+                    per_vector += faiss.downcast_index(base.storage).code_size + 2 * self.m * 4
+                elif isinstance(base, faiss.IndexIVF):
+                    # 倒排表中每条编码另存一个 int64 id
+                    per_vector += base.code_size + 8
+                else:
+                    per_vector += base.code_size
+            return self.index.ntotal * per_vector + self.chunk_store.memory_bytes() + self._pending_bytes
+
+    def _live_count(self) -> int:
+        # 墓碑始终是索引中 label 的子集 (压缩移除的向量同时移出墓碑)
+        return self.index.ntotal - len(self.tombstones) if self.index is not None else 0
+
+    def _maybe_rebuild(self):
+        """
+        写入后检查是否需要后台重建索引 (同一时间最多一个后台任务):
+        - auto 模式下存活向量数越过阈值 (或自上次训练增长 auto_growth 倍) 时重新训练 IVF
+        - 墓碑占比达到 compact_dead_ratio (且至少 _COMPACT_MIN_DEAD 个) 时压缩
+        """
+        if self.index is None or (self._background is not None and self._background.is_alive()):
+            return
+        live = self._live_count()
+        if self.index_type == "auto" and (
+            live >= self.auto_train_threshold if self.active_type == "flat"
+            else live >= self.trained_size * self.auto_growth
+        ):
+            target, name = self.retrain, "faiss-auto-ivf"
+        elif (
+            self.compact_dead_ratio is not None
+            and len(self.tombstones) >= _COMPACT_MIN_DEAD
+            and len(self.tombstones) >= self.compact_dead_ratio * self.index.ntotal
+        ):
+            target, name = self.compact, "faiss-compact"
+        else:
+            return
+        self._background = threading.Thread(target=self._run_in_background, args=(target,), name=name, daemon=True)
+        self._background.start()
+
+    def _run_in_background(self, target: Callable[[], Any]):
+        try:
+            target()
+        except Exception:
+            # 失败时继续使用当前索引，下次写入越过阈值时重试
+            logger.exception("Background rebuild of faiss index failed")
+
+    def _rebuild(
+        self,
+        build: Callable[[np.ndarray, np.ndarray], faiss.Index],
+        apply: Optional[Callable[[], None]] = None
+    ) -> Optional[int]:
+        """
+        在不阻塞读写的前提下重建索引并原子替换 (retrain 与 compact 共用)
+
+        持写者互斥锁复制当前向量 (已打墓碑的除外) → 不持锁调用 build(vectors, labels) 构建新索引 →
+        再持写者互斥锁补写复制之后新增的向量，在写锁下替换索引并执行 apply。
+        向量取自 _source_vectors：保存了原始向量时用原始值，量化误差不会随重建累积。
+        复制期间检索照常进行，构建期间 add/delete/search 都照常进行。
+
+        Returns:
+            从索引中物理移除的墓碑向量数；期间存储被 load/close 时返回 None
+        """
+        with self._write_mutex:
+            self._materialize()
+            if self.index is None:
+                return None
+            epoch = self._epoch
+            source = self.index
+            with self._rw.write():
+                _ensure_direct_map(source)
+            # 写者互斥下索引不会变化
+            vectors, labels = self._source_vectors(source, 0, source.ntotal)
+            dead = self._dead_ids()
+
+        alive = ~np.isin(labels, dead)
+        index = build(vectors[alive], labels[alive])
+
+        with self._write_mutex:
+            if self._epoch != epoch:
+                return None
+            with self._rw.write():
+                _ensure_direct_map(self.index)
+            # 补写复制之后新增的向量 (IndexIDMap2 内部位置按写入顺序递增)
+            tail_vectors, tail_labels = self._source_vectors(self.index, len(labels), self.index.ntotal)
+            if len(tail_labels):
+                index.add_with_ids(tail_vectors, tail_labels)
+            removed = labels[~alive]
+            # 新倒排索引在写锁外构建，检索继续使用旧的
+            metadata_index = self.metadata_index.without(removed) if len(removed) else self.metadata_index
+            with self._rw.write():
+                self.index = index
+                self.metadata_index = metadata_index
+                self.tombstones.difference_update(removed.tolist())
+                self._tombstone_ids = None
+                if apply is not None:
+                    apply()
+                # 重新训练后近似检索的结果可能不同
+                self._bump_content_generation()
+            # 索引结构已变化，下次 save 写出完整快照而不是只追加日志，缓冲的日志记录随之作废
+            self._home = None
+            self._clear_pending()
+            if len(removed):
+                self.chunk_store.reclaim()
+        return len(removed)
+
+    def _source_vectors(self, index: faiss.IndexIDMap2, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        重建用的向量及其 label (内部位置 [start, stop))
+
+        rescore 保存了原始向量时直接使用原始值；压缩编码 (pq/sq8) 的 reconstruct_n 解码值带量化误差，
+        用它重新训练、重新编码会让误差随每次重建累积，只在没有原始向量时回退使用。
+        已删除 (原始向量随之删除) 的位置逐条解码补齐，它们随后会被过滤掉。
+        """
+        if not self.rescore:
+            return _reconstruct(index, start, stop)
+        labels = faiss.vector_to_array(index.id_map)[start:stop]
+        originals = self.chunk_store.get_vectors(labels.tolist())
+        if len(labels) and not originals:
+            return _reconstruct(index, start, stop)
+        vectors = np.empty((len(labels), index.d), dtype=np.float32)
+        for row, label in enumerate(labels.tolist()):
+            vector = originals.get(label)
+            vectors[row] = vector if vector is not None else index.index.reconstruct(start + row)
+        return vectors, labels
+
+    def retrain(self) -> Optional[Dict[str, Any]]:
+        """
+        按当前规模重新训练 IVF 索引 (nlist≈4·sqrt(n)) 并替换当前索引，顺带移除墓碑向量
+
+        Returns:
+            新一代索引的评估记录 (同时追加到 generations)；训练期间存储被 load/close 时返回 None
+        """
+        record: Dict[str, Any] = {}
+
+        def build(vectors: np.ndarray, labels: np.ndarray) -> faiss.Index:
+            started = time.perf_counter()
+            nlist = _auto_nlist(len(vectors))
+            ivf = faiss.index_factory(self.dimension, f"IVF{nlist},{self._encoding()}", _METRICS[self.metric])
+            rng = np.random.default_rng(0)
+            sample_size = min(len(vectors), _TRAIN_POINTS_PER_LIST * nlist)
+            ivf.train(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+            ivf.make_direct_map()
+            index = faiss.IndexIDMap2(ivf)
+            index.add_with_ids(vectors, labels)
+            record.update(self._evaluate(index, vectors, labels))
+            record.update({
+                "index": f"IVF{nlist},{self._encoding()}",
+                "nlist": nlist,
+                "train_seconds": time.perf_counter() - started,
             })
-        return results
+            return index
 
-    def save(self, path: str = "./vector_store"):
-        if self.vector_store:
-            self.vector_store.save_local(path)
+        def apply():
+            self.active_type = "ivf_flat"
+            self.nlist = record["nlist"]
+            self.trained_size = self._live_count()
+            record["vectors"] = int(self.index.ntotal)
 
-    def load(self, path: str):
-        self.vector_store = FAISS.load_local(
-            path, 
-            self.embeddings, 
-            allow_dangerous_deserialization=True
+        with self._rebuild_lock:
+            if self._rebuild(build, apply) is None:
+                return None
+            record["generation"] = len(self.generations) + 1
+            self.generations.append(record)
+        logger.info(
+            "faiss index generation %d: %s over %d vectors, recall@%d=%.3f, latency=%.3fms, trained in %.1fs",
+            record["generation"], record["index"], record["vectors"], record["k"],
+            record["recall"], record["latency_ms"], record["train_seconds"]
         )
+        return record
+
+    def compact(self) -> int:
+        """
+        物理移除墓碑向量：按当前索引结构 (沿用已训练的聚类中心/量化器) 重建不含已删除向量的索引并原子替换，
+        同时从元数据倒排索引中剔除、分步归还块存储的空闲页。重建期间 add/delete/search 照常进行。
+
+        Returns:
+            移除的向量数
+        """
+        def build(vectors: np.ndarray, labels: np.ndarray) -> faiss.Index:
+            index = faiss.index_factory(self.dimension, self._factory_string(), _METRICS[self.metric])
+            if not index.is_trained:
+                # 需要训练的编码 (IVF/SQ/PQ) 复制已训练的结构后清空，无需重新训练
+                with self._rw.read():
+                    if self.index is None:
+                        # 期间被 close，重建结果会被丢弃
+                        return faiss.IndexIDMap2(index)
+                    index = faiss.clone_index(faiss.downcast_index(self.index.index))
+                index.reset()
+            elif self.active_type == "hnsw_flat":
+                index.hnsw.efConstruction = self.ef_construction
+            index = faiss.IndexIDMap2(index)
+            index.add_with_ids(vectors, labels)
+            return index
+
+        with self._rebuild_lock:
+            with self._write_mutex:
+                if not self.tombstones:
+                    return 0
+            removed = self._rebuild(build) or 0
+        if removed:
+            logger.info("Compacted faiss index: removed %d deleted vectors", removed)
+        return removed
+
+    def _evaluate(self, index: faiss.Index, vectors: np.ndarray, labels: np.ndarray) -> Dict[str, Any]:
+        """以精确暴力检索为基准，在抽样查询上评估新索引的 recall@k 与单查询延迟"""
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.choice(len(vectors), min(len(vectors), _EVAL_QUERIES), replace=False)]
+        k = min(10, len(vectors))
+        _, truth = faiss.knn(queries, vectors, k, metric=_METRICS[self.metric])
+        started = time.perf_counter()
+        _, found = index.search(queries, k, params=faiss.SearchParametersIVF(nprobe=self.nprobe))
+        latency_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        hits = sum(len(np.intersect1d(row, labels[expected])) for row, expected in zip(found, truth))
+        return {"k": k, "recall": hits / (k * len(queries)), "latency_ms": latency_ms}
+
+    def close(self):
+        """释放索引与块存储；等待进行中的检索结束，之后的检索返回空结果"""
+        with self._write_mutex, self._rw.write():
+            self._epoch += 1
+            self.index = None
+            self._visible_label = self.next_label = 0
+            self.tombstones = set()
+            self._tombstone_ids = None
+            self.chunk_store.close()
+            self.chunk_store = ChunkStore.memory()
+            self._mmap_path = None
+            self._clear_pending()
+            self._bump_content_generation()
+
+    def _materialize(self):
+        """mmap 只读加载的存储在首次写入前转为完整的内存副本"""
+        if self._mmap_path is not None:
+            self.load(self._mmap_path, mmap=False)
+
+    def save(self, path: str = "./vector_store", compact: bool = False):
+        """
+        持久化到本地
+
+        Args:
+            path: 持久化目录
+            compact: 强制写出新一代完整快照 (否则对同一目录只追加预写日志)
+        """
+        with self._write_mutex:
+            if self.index is None:
+                return
+            unchanged = not self._pending and self._generation is not None and self._home == os.path.abspath(path)
+            if unchanged and not compact:
+                # 自上次 save/load 以来没有变更：目录中已是当前状态，mmap 映射也无需转为内存副本
+                return
+            self._materialize()
+            os.makedirs(path, exist_ok=True)
+            # 写者互斥下内存结构不会变化，只持读锁，检索不受影响
+            with self._rw.read():
+                self._save(path, compact)
+
+    def _save(self, path: str, compact: bool):
+        if compact or self._generation is None or self._home != os.path.abspath(path):
+            self._write_snapshot(path)
+            return
+
+        wal_path = os.path.join(path, _snapshot_name(WAL_FILE, self._generation))
+        wal.append_records(wal_path, self._pending)
+        self._clear_pending()
+        if wal.wal_size(wal_path) > self.wal_compact_ratio * self._snapshot_bytes(path):
+            self._write_snapshot(path)
+
+    def _snapshot_bytes(self, path: str) -> int:
+        return sum(
+            os.path.getsize(os.path.join(path, _snapshot_name(filename, self._generation)))
+            for filename in (INDEX_FILE, CHUNKS_DB, METADATA_INDEX_FILE)
+        )
+
+    def _write_snapshot(self, path: str):
+        """写出下一代完整快照，替换 state.json 即提交，随后清理旧代文件"""
+        generation = (_read_state(path) or {}).get("generation", 0) + 1
+        index_path = os.path.join(path, _snapshot_name(INDEX_FILE, generation))
+        # 先写临时文件再原子替换，正在 mmap 旧文件的进程不受影响
+        faiss.write_index(self.index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        self.chunk_store.save(
+            path,
+            filename=_snapshot_name(CHUNKS_DB, generation),
+            originals_filename=_snapshot_name(ORIGINALS_FILE, generation)
+        )
+        self.metadata_index.save(path, filename=_snapshot_name(METADATA_INDEX_FILE, generation))
+        state_path = os.path.join(path, STATE_FILE)
+        with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "config": self._config(),
+                "generation": generation,
+                "next_label": self.next_label,
+                "tombstones": sorted(self.tombstones),
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(state_path + ".tmp", state_path)
+
+        self._clear_pending()
+        self._home = os.path.abspath(path)
+        self._generation = generation
+        current = {
+            _snapshot_name(filename, generation)
+            for filename in (INDEX_FILE, CHUNKS_DB, ORIGINALS_FILE, METADATA_INDEX_FILE, WAL_FILE)
+        }
+        for filename in os.listdir(path):
+            if _SNAPSHOT_PATTERN.match(filename) and filename not in current:
+                os.remove(os.path.join(path, filename))
+
+    def load(self, path: str, mmap: Optional[bool] = None):
+        """
+        从本地加载
+
+        Args:
+            path: 持久化目录 (其中没有任何持久化文件时得到空存储)
+            mmap: 是否只读内存映射加载，缺省取构造参数 mmap。
+                映射模式下 faiss 索引与块存储都不读入私有内存，多个进程共享页缓存，
+                文本/元数据只在命中 top-k 时读取；首次写入时自动转为内存副本。
+                预写日志非空时需要重放，自动退化为普通加载。
+        """
+        mmap = self.mmap if mmap is None else mmap
+        with self._write_mutex, self._rw.write():
+            self._epoch += 1
+            state = _read_state(path)
+            if state is None and not os.path.exists(os.path.join(path, INDEX_FILE)):
+                # 目录中没有任何持久化文件：视为空存储，而不是旧版格式
+                self._load_empty()
+            elif state is None:
+                self._load_legacy(path)
+            else:
+                self._load(path, state, mmap)
+            self._visible_label = self.next_label
+            self._bump_content_generation()
+
+    def _check_metric(self, persisted: str, path: str):
+        if self._requested_metric is not None and persisted != self._requested_metric:
+            raise ValueError(
+                f"Vector store at {path} was built with metric {persisted!r}, "
+                f"but this store was configured with {self._requested_metric!r}"
+            )
+
+    def _load(self, path: str, state: Dict[str, Any], mmap: bool):
+        self._check_metric(state["config"].get("metric", "l2"), path)
+        for key, value in state["config"].items():
+            setattr(self, key, value)
+        if "active_type" not in state["config"]:
+            self.active_type = self.index_type
+        generation = state.get("generation")
+        self.next_label = state["next_label"]
+        self.tombstones = set(state["tombstones"])
+        self._tombstone_ids = None
+
+        wal_path = os.path.join(path, _snapshot_name(WAL_FILE, generation))
+        records, valid_bytes = wal.read_records(wal_path) if generation is not None else ([], 0)
+        if records:
+            mmap = False
+
+        index_path = os.path.join(path, _snapshot_name(INDEX_FILE, generation))
+        if mmap:
+            self.index = faiss.read_index(index_path, _mmap_flags(self.active_type))
+        else:
+            self.index = faiss.read_index(index_path)
+        self.dimension = self.index.d
+        self._replace_chunk_store(
+            ChunkStore.open(
+                path,
+                read_only=mmap,
+                filename=_snapshot_name(CHUNKS_DB, generation),
+                originals_filename=_snapshot_name(ORIGINALS_FILE, generation)
+            )
+        )
+        self.metadata_index = MetadataIndex.load(
+            path, lazy=mmap, filename=_snapshot_name(METADATA_INDEX_FILE, generation)
+        )
+        self._mmap_path = path if mmap else None
+
+        for record in records:
+            if record["op"] == "add":
+                self._apply_add(record["labels"], record["vectors"], record["ids"], record["texts"], record["metadatas"])
+            else:
+                self._apply_delete(record["labels"])
+        if not mmap:
+            # 丢弃崩溃时写了一半的尾部记录，后续追加从完整记录之后开始
+            wal.truncate(wal_path, valid_bytes)
+
+        self._clear_pending()
+        self._home = os.path.abspath(path)
+        self._generation = generation
+
+    def _replace_chunk_store(self, chunk_store: ChunkStore):
+        self.chunk_store.close()
+        self.chunk_store = chunk_store
+
+    def _load_empty(self):
+        self.index = None
+        self.next_label = 0
+        self.tombstones = set()
+        self._tombstone_ids = None
+        self._replace_chunk_store(ChunkStore.memory())
+        self.metadata_index = MetadataIndex(self.metadata_index.indexed_fields)
+        self._mmap_path = None
+        self._clear_pending()
+        self._home = None
+        self._generation = None
+
+    def _load_legacy(self, path: str):
+        """
+        兼容旧版 LangChain save_local 格式: index.faiss + index.pkl
+        (InMemoryDocstore, {位置: docstore_id})；旧索引没有 id 映射，取出原始向量重建为 IndexIDMap2
+        """
+        index = faiss.read_index(os.path.join(path, INDEX_FILE))
+        metric = "l2" if index.metric_type == faiss.METRIC_L2 else "ip"
+        self._check_metric(metric, path)
+        with open(os.path.join(path, LEGACY_DOCSTORE_FILE), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+
+        vectors = index.reconstruct_n(0, index.ntotal)
+        self.index = faiss.IndexIDMap2(faiss.index_factory(index.d, "Flat", index.metric_type))
+        self.index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+        self.dimension = index.d
+        self.active_type = "flat"
+        self.metric = metric
+
+        labels = list(range(len(vectors)))
+        ids = [index_to_docstore_id[label] for label in labels]
+        docs = [docstore.search(doc_id) for doc_id in ids]
+        metadatas = [doc.metadata for doc in docs]
+        self._replace_chunk_store(ChunkStore.memory())
+        self.chunk_store.add(labels, ids, [doc.page_content for doc in docs], metadatas)
+        self.next_label = len(vectors)
+        self.tombstones = set()
+        self._tombstone_ids = None
+        self._mmap_path = None
+        self._clear_pending()
+        self._home = None
+        self._generation = None
+
+        self.metadata_index = MetadataIndex(self.metadata_index.indexed_fields)
+        self.metadata_index.add(labels, metadatas)
+
+
+def _auto_nlist(n: int) -> int:
+    """聚类数取 4·sqrt(n)，并保证每个聚类至少有 faiss 建议的 39 个训练点"""
+    return int(max(1, min(4 * np.sqrt(n), n // 39, 65536)))
+
+
+def _has_direct_map(index: faiss.IndexIDMap2) -> bool:
+    base = faiss.downcast_index(index.index)
+    return not isinstance(base, faiss.IndexIVF) or base.direct_map.type != faiss.DirectMap.NoMap
+
+
+def _ensure_direct_map(index: faiss.IndexIDMap2):
+    """IVF 需要直接映射表才能按内部位置取回向量"""
+    if not _has_direct_map(index):
+        faiss.downcast_index(index.index).make_direct_map()
+
+
+def _reconstruct(index: faiss.IndexIDMap2, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """取回内部位置 [start, stop) 的向量 (压缩编码时为解码值) 及其 label"""
+    if stop <= start:
+        return np.empty((0, index.d), dtype=np.float32), np.empty(0, dtype=np.int64)
+    vectors = index.index.reconstruct_n(start, stop - start)
+    labels = faiss.vector_to_array(index.id_map)[start:stop]
+    return vectors, labels
+
+
+def _visible_selector(visible: int, sel: Optional[faiss.IDSelector]) -> faiss.IDSelector:
+    """只保留 label < visible 的向量 (可与已有选择器取交)"""
+    visible_sel = faiss.IDSelectorRange(0, visible)
+    if sel is None:
+        return visible_sel
+    combined = faiss.IDSelectorAnd(visible_sel, sel)
+    combined.referenced_objects = [visible_sel, sel]
+    return combined
+
+
+def compression_summary(
+    vectors,
+    queries,
+    top_k: int = 10,
+    compressions: Tuple[str, ...] = _COMPRESSIONS,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    在一份样本上对比各压缩模式的内存占用与召回率
+
+    Args:
+        vectors: 样本向量 (同时作为 IVF/SQ/PQ 的训练集)
+        queries: 查询向量
+        top_k: recall@k 的 k
+        compressions: 参与对比的压缩模式
+        **kwargs: 其余 FAISSVectorStore 构造参数 (index_type/metric/pq_m 等)
+
+    Returns:
+        每种模式一行: compression, index_bytes, bytes_per_vector, memory_ratio (相对 float32 原始向量的压缩倍数),
+        recall (压缩分数直接排序), rescored_recall (原始向量精确重排后)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    kwargs = {**kwargs, "score_threshold": None}
+    metric = kwargs.get("metric") or "l2"
+    if metric == "cosine":
+        vectors, queries = normalize_vectors(vectors), normalize_vectors(queries)
+    # 精确 top-k 作为基准
+    if metric == "l2":
+        scores = -(np.square(queries).sum(axis=1, keepdims=True) - 2 * queries @ vectors.T + np.square(vectors).sum(axis=1))
+    else:
+        scores = queries @ vectors.T
+    truth = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+
+    ids = [str(i) for i in range(len(vectors))]
+    texts = [""] * len(vectors)
+    summary = []
+    for compression in compressions:
+        store = FAISSVectorStore(compression=compression, rescore=True, **kwargs)
+        store.add(texts, vectors, ids=ids)
+        index_bytes = int(faiss.serialize_index(store.index).nbytes)
+        row = {
+            "compression": compression,
+            "index_bytes": index_bytes,
+            "bytes_per_vector": index_bytes / len(vectors),
+            "memory_ratio": vectors.nbytes / index_bytes,
+        }
+        for key, rescore in (("recall", False), ("rescored_recall", True)):
+            store.rescore = rescore
+            results = store.search_batch(queries, top_k=top_k)
+            hits = sum(
+                len({int(r["id"]) for r in result} & set(expected.tolist()))
+                for result, expected in zip(results, truth)
+            )
+            row[key] = hits / truth.size
+        summary.append(row)
+    return summary
+
+
+def _read_state(path: str) -> Optional[Dict[str, Any]]:
+    state_path = os.path.join(path, STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,389 @@
+"""
+input:
+- texts / vectors / metadatas / ids: 同 FAISSVectorStore
+- metric: l2 (平方距离) / ip (内积) / cosine (写入与查询时归一化后的内积)
+- dtype: 向量矩阵存储精度 (float32 / float16)
+- score_threshold / indexed_fields / mmap: 同 FAISSVectorStore
+
+output:
+- search_results: 精确 top-k 检索结果 (search_batch 返回每个查询一组)
+- ids: add/upsert 写入的文档 ID，delete 删除的条数
+
+pos:
+- 位于 store/providers 目录下
+- 纯 NumPy 暴力检索实现：一块连续矩阵 + BLAS 矩阵乘 + argpartition，适合 20 万块以内的集合，
+  也作为近似索引的精确基线
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from config.config import Config
+from store.base import (
+    BaseVectorStore, Vector, Vectors, check_top_k, collect_results, content_id, new_positions,
+    prepare_vectors, resolve_metric, within_threshold
+)
+from store.chunk_store import ChunkStore
+from store.metadata_index import MetadataIndex, match_filter
+from store.rwlock import RWLock
+
+
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+STATE_FILE = "state.json"
+
+# 分块计算打分矩阵，限制 float16 转换与 (查询数 × 块行数) 中间结果的内存
+_BLOCK_ROWS = 65536
+
+
+class NumpyVectorStore(BaseVectorStore):
+    """
+    基于 NumPy 的精确向量存储
+
+    - 所有向量存放在一块按行追加的连续矩阵中 (容量倍增，均摊 O(1) 追加)，行号即 label
+    - 检索: 打分 = 查询矩阵 @ 向量矩阵.T (一次 BLAS 矩阵乘)，argpartition 取 top-k 后只对 k 个排序；
+      l2 距离由 |q|² - 2 q·x + |x|² 展开，|x|² 在写入时预先算好
+    - dtype=float16 时内存减半，检索时按块转回 float32 计算
+    - delete 只打墓碑，检索时把已删除行的分数置为最差
+    - 文本/元数据存放在 SQLite 块存储，filter 走元数据倒排索引，未索引字段多取 fetch_k 个候选后逐条过滤
+    - 持久化为 vectors.npy + norms.npy + chunks.db + metadata_index.npz + state.json，不使用 pickle；
+      mmap=True 时以只读内存映射加载向量矩阵，冷启动近乎瞬时，首次写入时转为内存副本
+    """
+
+    def __init__(
+        self,
+        dimension: Optional[int] = None,
+        metric: Optional[str] = None,
+        dtype: str = "float32",
+        score_threshold: Optional[float] = None,
+        indexed_fields: Optional[List[str]] = None,
+        mmap: bool = False,
+    ):
+        metric, requested_metric = resolve_metric(metric, "numpy")
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported numpy dtype: {dtype}")
+
+        self.dimension = dimension
+        self.metric = metric
+        self._requested_metric = requested_metric
+        self.dtype = dtype
+        if score_threshold is None and metric != "l2":
+            score_threshold = Config.SIMILARITY_THRESHOLD
+        self.score_threshold = score_threshold
+        self.mmap = mmap
+
+        # 容量可大于行数，只有前 size 行有效
+        self._vectors: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self.size = 0
+        self.tombstones = set()
+        self.chunk_store = ChunkStore.memory()
+        self.metadata_index = MetadataIndex(indexed_fields)
+        self._mmap_path: Optional[str] = None
+        self._write_mutex = threading.RLock()
+        self._rw = RWLock()
+
+    def _config(self) -> Dict[str, Any]:
+        return {
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "dtype": self.dtype,
+            "score_threshold": self.score_threshold,
+        }
+
+    def _reserve(self, rows: int):
+        """确保容量至少为 rows，不足时倍增并拷贝有效行"""
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        vectors = np.empty((capacity, self.dimension), dtype=self.dtype)
+        norms = np.empty(capacity, dtype=np.float32)
+        alive = np.zeros(capacity, dtype=bool)
+        if self.size:
+            vectors[:self.size] = self._vectors[:self.size]
+            norms[:self.size] = self._norms[:self.size]
+            alive[:self.size] = self._alive[:self.size]
+        self._vectors, self._norms, self._alive = vectors, norms, alive
+
+    def add(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        if len(texts) == 0:
+            return []
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+
+        metadatas = metadatas or [{} for _ in texts]
+        generated = ids is None
+        if generated:
+            ids = [content_id(text, metadata) for text, metadata in zip(texts, metadatas)]
+        if len(ids) != len(texts):
+            raise ValueError("ids and texts must have the same length")
+        all_ids = list(ids)
+        matrix = prepare_vectors(vectors, self.dimension, self.metric)
+
+        with self._write_mutex:
+            self._materialize()
+            positions = new_positions(ids, self.chunk_store.labels_of(ids), generated)
+            if not positions:
+                return all_ids
+            if len(positions) < len(ids):
+                # 派生 ID 重复或内容已存储的条目不再写入
+                matrix = matrix[positions]
+                texts = [texts[i] for i in positions]
+                metadatas = [metadatas[i] for i in positions]
+                ids = [ids[i] for i in positions]
+
+            with self._rw.write():
+                if self.dimension is None:
+                    self.dimension = matrix.shape[1]
+                start, end = self.size, self.size + len(matrix)
+                self._reserve(end)
+                stored = matrix.astype(self.dtype, copy=False)
+                self._vectors[start:end] = stored
+                # 范数按存储精度计算，与检索时参与运算的向量一致
+                self._norms[start:end] = np.square(stored.astype(np.float32)).sum(axis=1)
+                self._alive[start:end] = True
+                labels = list(range(start, end))
+                self.chunk_store.add(labels, ids, texts, metadatas)
+                self.metadata_index.add(labels, metadatas)
+                self.size = end
+                self._bump_content_generation()
+        return all_ids
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> int:
+        if ids is None and filter is None:
+            raise ValueError("delete requires ids or filter")
+        with self._write_mutex:
+            self._materialize()
+            labels = set()
+            if ids is not None:
+                labels.update(self.chunk_store.labels_of(ids).values())
+            if filter:
+                if self.metadata_index.can_serve(filter):
+                    labels.update(label for label in self.metadata_index.select(filter).tolist() if self._alive[label])
+                else:
+                    labels.update(
+                        label for label, doc in self.chunk_store.items() if match_filter(doc["metadata"], filter)
+                    )
+            if labels:
+                with self._rw.write():
+                    self.chunk_store.delete(labels)
+                    self._alive[sorted(labels)] = False
+                    self.tombstones.update(labels)
+                    self._bump_content_generation()
+            return len(labels)
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        with self._rw.read():
+            mapping = self.chunk_store.labels_of(ids)
+            if not mapping:
+                return {}
+            rows = self._vectors[list(mapping.values())].astype(np.float32)
+        return dict(zip(mapping, rows))
+
+    def search(
+        self,
+        query_vector: Vector,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        return self.search_batch([query_vector], top_k, filter=filter, **kwargs)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Vectors,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        fetch_k: int = 20,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        check_top_k(top_k)
+        if len(query_vectors) == 0:
+            return []
+        score_threshold = kwargs.get("score_threshold", self.score_threshold)
+        with self._rw.read():
+            if self.size == len(self.tombstones):
+                return [[] for _ in query_vectors]
+            queries = prepare_vectors(query_vectors, self.dimension, self.metric)
+
+            rows = None
+            k = top_k
+            if filter and self.metadata_index.can_serve(filter):
+                # 倒排索引预过滤：只对命中的行打分
+                rows = self.metadata_index.select(filter)
+                rows = rows[self._alive[rows]]
+                if len(rows) == 0:
+                    return [[] for _ in query_vectors]
+                filter = None
+            elif filter:
+                k = max(top_k, fetch_k)
+
+            scores, labels = self._top_k(queries, k, rows)
+            candidates = labels >= 0
+            if score_threshold is not None:
+                candidates &= within_threshold(scores, score_threshold, self.metric)
+            docs = self.chunk_store.get_many(labels[candidates].tolist())
+
+        return [
+            collect_results(row_scores, row_labels, docs, top_k, self.metric, filter, score_threshold)
+            for row_scores, row_labels in zip(scores, labels)
+        ]
+
+    def _top_k(
+        self,
+        queries: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        精确 top-k
+
+        Returns:
+            (分数, label)，形状均为 (查询数, k)，按相似度排序；不足 k 个时 label 以 -1 补齐
+        """
+        if rows is None:
+            # 墓碑行参与矩阵乘后再屏蔽，比先挑出存活行更省拷贝
+            candidates = np.arange(self.size)
+            dead = ~self._alive[:self.size]
+        else:
+            candidates = rows
+            dead = None
+
+        # 统一转成 "越小越好" 的代价，便于 argpartition
+        cost = np.empty((len(queries), len(candidates)), dtype=np.float32)
+        query_norms = np.square(queries).sum(axis=1, keepdims=True)
+        for start in range(0, len(candidates), _BLOCK_ROWS):
+            block_labels = candidates[start:start + _BLOCK_ROWS]
+            if rows is None:
+                block = self._vectors[block_labels[0]:block_labels[-1] + 1]
+            else:
+                block = self._vectors[block_labels]
+            dots = queries @ block.astype(np.float32, copy=False).T
+            if self.metric == "l2":
+                cost[:, start:start + len(block_labels)] = query_norms - 2 * dots + self._norms[block_labels]
+            else:
+                cost[:, start:start + len(block_labels)] = -dots
+        if dead is not None and dead.any():
+            cost[:, dead] = np.inf
+
+        k_eff = min(k, len(candidates))
+        if k_eff < len(candidates):
+            part = np.argpartition(cost, k_eff - 1, axis=1)[:, :k_eff]
+        else:
+            part = np.broadcast_to(np.arange(len(candidates)), (len(queries), len(candidates)))
+        part_cost = np.take_along_axis(cost, part, axis=1)
+        order = np.argsort(part_cost, axis=1, kind="stable")
+        top_cost = np.take_along_axis(part_cost, order, axis=1)
+        top_labels = candidates[np.take_along_axis(part, order, axis=1)]
+        top_labels[np.isinf(top_cost)] = -1
+
+        scores = np.maximum(top_cost, 0) if self.metric == "l2" else -top_cost
+        if k_eff < k:
+            pad = k - k_eff
+            scores = np.pad(scores, ((0, 0), (0, pad)))
+            top_labels = np.pad(top_labels, ((0, 0), (0, pad)), constant_values=-1)
+        return scores, top_labels
+
+    def memory_bytes(self) -> int:
+        with self._rw.read():
+            if self._vectors is None or self._mmap_path is not None:
+                return self.chunk_store.memory_bytes()
+            return self._vectors.nbytes + self._norms.nbytes + self._alive.nbytes + self.chunk_store.memory_bytes()
+
+    def close(self):
+        with self._write_mutex, self._rw.write():
+            self._vectors = self._norms = self._alive = None
+            self.size = 0
+            self.tombstones = set()
+            self.chunk_store.close()
+            self.chunk_store = ChunkStore.memory()
+            self._mmap_path = None
+            self._bump_content_generation()
+
+    def _materialize(self):
+        """mmap 只读加载的存储在首次写入前转为完整的内存副本"""
+        if self._mmap_path is not None:
+            self.load(self._mmap_path, mmap=False)
+
+    def save(self, path: str = "./vector_store"):
+        with self._write_mutex:
+            if self._vectors is None:
+                return
+            os.makedirs(path, exist_ok=True)
+            with self._rw.read():
+                for filename, array in ((VECTORS_FILE, self._vectors), (NORMS_FILE, self._norms)):
+                    target = os.path.join(path, filename)
+                    # 先写临时文件再原子替换，正在 mmap 旧文件的进程不受影响
+                    with open(target + ".tmp", "wb") as f:
+                        np.save(f, array[:self.size])
+                    os.replace(target + ".tmp", target)
+                self.chunk_store.save(path)
+                self.metadata_index.save(path)
+                state_path = os.path.join(path, STATE_FILE)
+                with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump({
+                        "config": self._config(),
+                        "size": self.size,
+                        "tombstones": sorted(self.tombstones),
+                    }, f)
+                os.replace(state_path + ".tmp", state_path)
+
+    def load(self, path: str, mmap: Optional[bool] = None):
+        """
+        从本地加载
+
+        Args:
+            path: 持久化目录
+            mmap: 是否只读内存映射加载向量矩阵，缺省取构造参数 mmap
+        """
+        mmap = self.mmap if mmap is None else mmap
+        with self._write_mutex, self._rw.write():
+            with open(os.path.join(path, STATE_FILE), "r", encoding="utf-8") as f:
+                state = json.load(f)
+            persisted = state["config"].get("metric", "l2")
+            if self._requested_metric is not None and persisted != self._requested_metric:
+                raise ValueError(
+                    f"Vector store at {path} was built with metric {persisted!r}, "
+                    f"but this store was configured with {self._requested_metric!r}"
+                )
+            for key, value in state["config"].items():
+                setattr(self, key, value)
+            mmap_mode = "r" if mmap else None
+            vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode=mmap_mode)
+            norms = np.load(os.path.join(path, NORMS_FILE), mmap_mode=mmap_mode)
+            if not mmap:
+                # 载入后直接作为可追加的工作矩阵
+                vectors, norms = np.ascontiguousarray(vectors), np.ascontiguousarray(norms)
+            self.size = state["size"]
+            self.tombstones = set(state["tombstones"])
+            self._alive = np.ones(self.size, dtype=bool)
+            self._alive[sorted(self.tombstones)] = False
+            self._vectors, self._norms = vectors, norms
+
+            self.chunk_store.close()
+            self.chunk_store = ChunkStore.open(path, read_only=mmap)
+            self.metadata_index = MetadataIndex.load(path, lazy=mmap)
+            self._mmap_path = path if mmap else None
+            self._bump_content_generation()
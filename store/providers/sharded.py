@@ -0,0 +1,301 @@
+"""
+input:
+- texts / vectors / metadatas / ids: 同 FAISSVectorStore
+- num_shards: 分片数
+- partition: 分片方式 (hash: 按文档 ID 哈希; source: 按 metadata["source"] 哈希)
+- max_workers: 并行检索线程数 (默认等于分片数)；压缩与保存/加载使用独立的维护线程池
+- **shard_kwargs: 透传给每个 FAISSVectorStore 分片的构造参数
+
+output:
+- search_results: 各分片 top-k 经堆归并后的全局 top-k
+- ids: add/upsert 写入的文档 ID，delete 删除的条数
+- content_generation: 各分片内容代号的最大值 (任一分片变化即变化)
+
+pos:
+- 位于 store/providers 目录下
+- 将数据划分到多个 faiss 分片，检索时线程池并行扇出，分片独立持久化
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable
+
+from store.base import BaseVectorStore, Vector, Vectors, as_vector_matrix, content_id, new_positions
+from store.providers.faiss import FAISSVectorStore
+
+
+SHARDS_FILE = "shards.json"
+
+
+def _stable_hash(value: str) -> int:
+    """进程无关的稳定哈希 (内置 hash 对 str 加了随机盐)"""
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "little")
+
+
+class ShardedVectorStore(BaseVectorStore):
+    """
+    分片向量存储：N 个 FAISSVectorStore 分片
+
+    - add 按 partition 把每条数据路由到一个分片；按 source 路由时先在全部分片中检查 ID，保证 ID 全局唯一
+    - search 在线程池中并行检索所有分片 (faiss 检索期间释放 GIL)，再把各分片已排序的 top-k 堆归并
+    - partition="source" 且 filter 指定单个 source 时只检索该 source 所在分片
+    - 每个分片持久化在 path/shard-{i} 下，可单独 save/load，并各自沿用增量预写日志
+    - 检索线程池只处理查询扇出；压缩、保存与加载在独立的维护线程池中执行，不让检索排队
+    """
+
+    def __init__(
+        self,
+        num_shards: int = 4,
+        partition: str = "hash",
+        max_workers: Optional[int] = None,
+        **shard_kwargs
+    ):
+        partition = partition.lower()
+        if partition not in ("hash", "source"):
+            raise ValueError(f"Unsupported shard partition: {partition}")
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+
+        self.num_shards = num_shards
+        self.partition = partition
+        self.shard_kwargs = shard_kwargs
+        self.max_workers = max_workers
+        # 写入之间互斥：跨分片的 ID 检查与写入之间不允许插入其他写者
+        self._write_lock = threading.RLock()
+        self.shards = [FAISSVectorStore(**shard_kwargs) for _ in range(num_shards)]
+        self._create_pools()
+
+    def _create_pools(self):
+        """按当前分片数创建检索线程池与维护线程池"""
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers or self.num_shards, thread_name_prefix="vector-shard"
+        )
+        # 维护任务 (压缩、保存、加载) 与检索分开，耗时的 IO 与重建不会占满检索线程
+        self._maintenance = ThreadPoolExecutor(max_workers=self.num_shards, thread_name_prefix="vector-shard-maintenance")
+
+    def _shard_of(self, doc_id: str, metadata: Dict[str, Any]) -> int:
+        if self.partition == "source" and metadata.get("source") is not None:
+            return _stable_hash(str(metadata["source"])) % self.num_shards
+        return _stable_hash(doc_id) % self.num_shards
+
+    def add(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        vectors = as_vector_matrix(vectors)
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+        metadatas = metadatas or [{} for _ in texts]
+        generated = ids is None
+        if generated:
+            ids = [content_id(text, metadata) for text, metadata in zip(texts, metadatas)]
+        if len(ids) != len(texts):
+            raise ValueError("ids and texts must have the same length")
+
+        with self._write_lock:
+            positions = list(range(len(ids)))
+            if self.partition == "source" or generated:
+                # 按 source 路由时同一 ID 换了 source 会落到其他分片，分片各自的重复检查看不到；
+                # 派生 ID 在此统一去重，分片收到的都是显式 ID
+                existing = [doc_id for shard in self.shards for doc_id in shard.chunk_store.labels_of(ids)]
+                positions = new_positions(ids, existing, generated)
+
+            groups: Dict[int, List[int]] = {}
+            for position in positions:
+                groups.setdefault(self._shard_of(ids[position], metadatas[position]), []).append(position)
+            for shard, positions in groups.items():
+                self.shards[shard].add(
+                    [texts[i] for i in positions],
+                    vectors[positions],
+                    [metadatas[i] for i in positions],
+                    ids=[ids[i] for i in positions],
+                    **kwargs
+                )
+        return list(ids)
+
+    def upsert(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        # 删除 (所有可能的分片) 与写入之间不允许插入其他写者
+        with self._write_lock:
+            return super().upsert(texts, vectors, metadatas, ids=ids, **kwargs)
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> int:
+        if ids is None and filter is None:
+            raise ValueError("delete requires ids or filter")
+        with self._write_lock:
+            return self._delete(ids, filter)
+
+    def _delete(self, ids: Optional[List[str]], filter: Optional[Dict[str, Any]]) -> int:
+        deleted = 0
+        if ids is not None:
+            if self.partition == "hash":
+                groups: Dict[int, List[str]] = {}
+                for doc_id in ids:
+                    groups.setdefault(self._shard_of(doc_id, {}), []).append(doc_id)
+                for shard, shard_ids in groups.items():
+                    deleted += self.shards[shard].delete(ids=shard_ids)
+            else:
+                # 按 source 分片时 ID 无法直接定位分片
+                deleted += sum(shard.delete(ids=ids) for shard in self.shards)
+        if filter:
+            deleted += sum(shard.delete(filter=filter) for shard in self._shards_for(filter))
+        return deleted
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, Any]:
+        if self.partition == "hash":
+            groups: Dict[int, List[str]] = {}
+            for doc_id in ids:
+                groups.setdefault(self._shard_of(doc_id, {}), []).append(doc_id)
+            targets = [(self.shards[shard], shard_ids) for shard, shard_ids in groups.items()]
+        else:
+            targets = [(shard, ids) for shard in self.shards]
+        vectors: Dict[str, Any] = {}
+        for shard, shard_ids in targets:
+            vectors.update(shard.get_vectors(shard_ids))
+        return vectors
+
+    def _shards_for(self, filter: Optional[Dict[str, Any]]) -> List[FAISSVectorStore]:
+        """partition="source" 时按 filter 中的 source 剪枝分片"""
+        if self.partition == "source" and filter and "source" in filter:
+            sources = filter["source"] if isinstance(filter["source"], list) else [filter["source"]]
+            targets = sorted({_stable_hash(str(source)) % self.num_shards for source in sources})
+            return [self.shards[i] for i in targets]
+        return self.shards
+
+    def search(
+        self,
+        query_vector: Vector,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        return self.search_batch([query_vector], top_k, filter=filter, **kwargs)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Vectors,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        if len(query_vectors) == 0:
+            return []
+        # 只转换一次，各分片直接共享同一个 float32 矩阵
+        query_vectors = as_vector_matrix(query_vectors)
+        shards = self._shards_for(filter)
+        if len(shards) == 1:
+            return shards[0].search_batch(query_vectors, top_k, filter=filter, **kwargs)
+
+        per_shard = list(self._executor.map(
+            lambda shard: shard.search_batch(query_vectors, top_k, filter=filter, **kwargs),
+            shards
+        ))
+        # 各分片结果已按相似度排好序：l2 距离升序，ip 相似度降序
+        descending = self.shards[0].metric != "l2"
+        return [
+            list(itertools.islice(
+                heapq.merge(*shard_results, key=lambda r: r["score"], reverse=descending),
+                top_k
+            ))
+            for shard_results in zip(*per_shard)
+        ]
+
+    @property
+    def content_generation(self) -> int:
+        # 代号全局递增，任一分片写入后其代号即为最大值
+        return max([super().content_generation] + [shard.content_generation for shard in self.shards])
+
+    def compact(self) -> int:
+        return sum(self._maintenance.map(lambda shard: shard.compact(), self.shards))
+
+    def memory_bytes(self) -> int:
+        return sum(shard.memory_bytes() for shard in self.shards)
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self._executor.shutdown(wait=False)
+        self._maintenance.shutdown(wait=False)
+
+    def _shard_indices(self, shards: Optional[Iterable[int]]) -> List[int]:
+        return list(range(self.num_shards)) if shards is None else list(shards)
+
+    def save(self, path: str = "./vector_store", shards: Optional[Iterable[int]] = None):
+        """
+        持久化到本地
+
+        Args:
+            path: 持久化目录
+            shards: 只保存指定编号的分片，缺省保存全部
+        """
+        os.makedirs(path, exist_ok=True)
+        indices = self._shard_indices(shards)
+        list(self._maintenance.map(
+            lambda i: self.shards[i].save(os.path.join(path, f"shard-{i}")), indices
+        ))
+        meta_path = os.path.join(path, SHARDS_FILE)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "num_shards": self.num_shards,
+                "partition": self.partition,
+                "shard_kwargs": self.shard_kwargs,
+            }, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def load(self, path: str, shards: Optional[Iterable[int]] = None):
+        """
+        从本地加载
+
+        Args:
+            path: 持久化目录
+            shards: 只加载指定编号的分片，其余分片保持不变；缺省加载全部
+        """
+        with open(os.path.join(path, SHARDS_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["num_shards"] != self.num_shards or meta["partition"] != self.partition:
+            # 分片布局与当前实例不同：按持久化的布局重建全部分片与线程池，替换后再关闭旧的
+            old_shards, old_pools = self.shards, (self._executor, self._maintenance)
+            self.num_shards = meta["num_shards"]
+            self.partition = meta["partition"]
+            self.shard_kwargs = meta["shard_kwargs"]
+            self.shards = [FAISSVectorStore(**self.shard_kwargs) for _ in range(self.num_shards)]
+            self._create_pools()
+            for shard in old_shards:
+                shard.close()
+            for pool in old_pools:
+                pool.shutdown(wait=False)
+            shards = None
+
+        indices = [
+            i for i in self._shard_indices(shards)
+            if os.path.exists(os.path.join(path, f"shard-{i}"))
+        ]
+        list(self._maintenance.map(
+            lambda i: self.shards[i].load(os.path.join(path, f"shard-{i}")), indices
+        ))
+        # 分片可能整体重建为新实例
+        self._bump_content_generation()
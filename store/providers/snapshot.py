@@ -0,0 +1,255 @@
+"""
+input:
+- root: 快照根目录，其下每个 v{版本号} 子目录是一份完整的向量存储快照
+- provider: 快照所用的存储引擎 (默认 faiss)
+- poll_interval / grace_period: 监视轮询间隔、旧快照释放前的宽限期 (秒)
+- **store_kwargs: 透传给底层存储的构造参数 (如 mmap=True)
+
+output:
+- SnapshotVectorStore: 只读服务用存储，后台发现新快照后加载并原子切换
+- publish_snapshot: 离线任务把存储发布为新版本快照
+- content_generation: 切换快照时变化，检索结果缓存随之失效
+
+pos:
+- 位于 store/providers 目录下
+- 负责服务进程的零停机热切换：离线入库产出新快照，无需重启 API 即可生效
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from store.base import BaseVectorStore, ReadOnlyStoreError, Vector, Vectors
+
+
+logger = logging.getLogger(__name__)
+
+_VERSION_PATTERN = re.compile(r"^v(\d+)$")
+
+
+def _versions(root: str) -> List[Tuple[int, str]]:
+    """root 下已发布的快照 (版本号, 目录)，按版本升序"""
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for entry in os.scandir(root):
+        match = _VERSION_PATTERN.match(entry.name)
+        if match and entry.is_dir():
+            versions.append((int(match.group(1)), entry.path))
+    return sorted(versions)
+
+
+def latest_version(root: str) -> Optional[Tuple[int, str]]:
+    versions = _versions(root)
+    return versions[-1] if versions else None
+
+
+def publish_snapshot(store: BaseVectorStore, root: str, keep: Optional[int] = None) -> int:
+    """
+    把存储发布为 root 下的新版本快照
+
+    先完整写入临时目录再 rename 为 v{版本号}，监视方只会看到完整的快照。
+
+    Args:
+        store: 待发布的存储
+        root: 快照根目录
+        keep: 保留最近的版本数，None 表示不清理旧版本
+
+    Returns:
+        新版本号 (毫秒时间戳，且大于已有版本)
+    """
+    os.makedirs(root, exist_ok=True)
+    current = latest_version(root)
+    version = max(int(time.time() * 1000), current[0] + 1 if current else 0)
+    staging = os.path.join(root, f".staging-v{version}")
+    store.save(staging)
+    os.rename(staging, os.path.join(root, f"v{version}"))
+
+    if keep is not None:
+        # 已映射旧快照的进程不受影响：POSIX 下已打开的文件在删除后仍可读
+        for _, path in _versions(root)[:-keep]:
+            shutil.rmtree(path, ignore_errors=True)
+    return version
+
+
+class SnapshotVectorStore(BaseVectorStore):
+    """
+    快照版本化的只读存储：服务进程始终查询 "当前" 快照
+
+    - load(root) 同步加载最新版本并启动后台监视线程
+    - 监视线程发现更新的版本后在后台完整加载，再原子替换服务引用；
+      切换前已开始的检索持有旧实例的引用，会在旧快照上完成
+    - 旧实例在 grace_period 秒后 close 释放；宽限期内 close 本存储时立即释放
+    - 写入应通过离线任务 + publish_snapshot 完成，本存储的 add/delete 抛出 ReadOnlyStoreError
+    - 根目录不存在或尚无快照时照常启动监视，首个快照发布后自动加载
+    """
+
+    always_load = True
+
+    def __init__(
+        self,
+        provider: str = "faiss",
+        poll_interval: float = 5.0,
+        grace_period: float = 30.0,
+        **store_kwargs
+    ):
+        self.provider = provider
+        self.poll_interval = poll_interval
+        self.grace_period = grace_period
+        self.store_kwargs = store_kwargs
+
+        self.root: Optional[str] = None
+        self.version: Optional[int] = None
+        self._current: Optional[BaseVectorStore] = None
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        # 等待宽限期结束的旧快照：(释放定时器, 实例)
+        self._retired: List[Tuple[threading.Timer, BaseVectorStore]] = []
+
+    def _open(self, path: str) -> BaseVectorStore:
+        # 延迟导入：工厂本身注册了本类
+        from store.factory import VectorStoreFactory
+        store = VectorStoreFactory.get_vector_store(self.provider, **self.store_kwargs)
+        store.load(path)
+        return store
+
+    def refresh(self) -> bool:
+        """
+        检查并切换到最新快照
+
+        Returns:
+            是否发生了切换
+        """
+        latest = latest_version(self.root)
+        if latest is None or (self.version is not None and latest[0] <= self.version):
+            return False
+        version, path = latest
+        # 加载在锁外完成，期间检索继续使用旧快照
+        store = self._open(path)
+        with self._swap_lock:
+            if self.version is not None and version <= self.version:
+                store.close()
+                return False
+            old, self._current, self.version = self._current, store, version
+            self._bump_content_generation()
+        if old is not None:
+            self._retire(old)
+        return True
+
+    @property
+    def content_generation(self) -> int:
+        store = self._current
+        own = super().content_generation
+        return max(own, store.content_generation) if store is not None else own
+
+    def _retire(self, store: BaseVectorStore):
+        timer = threading.Timer(self.grace_period, store.close)
+        timer.daemon = True
+        timer.start()
+        self._retired = [(t, s) for t, s in self._retired if t.is_alive()] + [(timer, store)]
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # 快照损坏或加载失败时继续服务旧快照，下个周期重试
+                logger.exception("Failed to load vector store snapshot under %s", self.root)
+
+    def start(self):
+        if self._watcher is None or not self._watcher.is_alive():
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="snapshot-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def load(self, path: str):
+        """以 path 为快照根目录，同步加载最新版本 (尚无快照时为空) 并开始监视"""
+        self.root = path
+        self.refresh()
+        self.start()
+
+    def save(self, path: str):
+        """快照由离线任务通过 publish_snapshot 发布，服务端无需保存"""
+        pass
+
+    def close(self):
+        self.stop()
+        # 取消尚未触发的定时器并立即释放对应的旧快照；已触发的由定时器自己完成 close
+        retired, self._retired = self._retired, []
+        for timer, store in retired:
+            if timer.is_alive():
+                timer.cancel()
+                store.close()
+        with self._swap_lock:
+            current, self._current = self._current, None
+            self._bump_content_generation()
+        if current is not None:
+            current.close()
+
+    def add(
+        self,
+        texts: List[str],
+        vectors: Vectors,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs
+    ) -> List[str]:
+        raise ReadOnlyStoreError("SnapshotVectorStore is read-only, publish a new snapshot instead")
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> int:
+        raise ReadOnlyStoreError("SnapshotVectorStore is read-only, publish a new snapshot instead")
+
+    def search(
+        self,
+        query_vector: Vector,
+        top_k: int = 5,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        store = self._current
+        return store.search(query_vector, top_k, **kwargs) if store is not None else []
+
+    def search_batch(
+        self,
+        query_vectors: Vectors,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        # 只读一次引用：整个批量检索都在同一快照上完成
+        store = self._current
+        if store is None:
+            return [[] for _ in query_vectors]
+        return store.search_batch(query_vectors, top_k, filter=filter, **kwargs)
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, Any]:
+        store = self._current
+        return store.get_vectors(ids) if store is not None else {}
+
+    def search_mmr(self, query_vector: Vector, top_k: int = 5, **kwargs) -> List[Dict[str, Any]]:
+        # 候选检索与取向量在同一快照上完成
+        store = self._current
+        return store.search_mmr(query_vector, top_k, **kwargs) if store is not None else []
+
+    def memory_bytes(self) -> int:
+        store = self._current
+        return store.memory_bytes() if store is not None else 0
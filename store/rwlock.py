@@ -0,0 +1,83 @@
+"""
+input:
+- 无 (由向量存储内部持有)
+
+output:
+- RWLock: 读写锁，read()/write() 上下文管理器
+
+pos:
+- 位于 store 层
+- 负责向量存储的并发控制：多个检索并行读，写入互斥
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    阶段公平的读写锁
+
+    - 读者之间不互斥；写者独占
+    - 有写者排队时新读者等待，避免写者饿死
+    - 写者释放时，已在排队的读者先于下一个写者进入，避免分批写入期间读者饿死
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_readers = 0
+        self._waiting_writers = 0
+        # 写者刚释放，轮到已排队的读者
+        self._read_turn = False
+
+    def acquire_read(self):
+        with self._cond:
+            self._waiting_readers += 1
+            while self._writer or (self._waiting_writers and not self._read_turn):
+                self._cond.wait()
+            self._waiting_readers -= 1
+            self._readers += 1
+            if self._waiting_readers == 0:
+                self._read_turn = False
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers or self._read_turn:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._read_turn = self._waiting_readers > 0
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
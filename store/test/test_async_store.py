@@ -0,0 +1,87 @@
+import asyncio
+import shutil
+import threading
+import time
+import unittest
+import numpy as np
+from store import executor, vector_store
+from store.providers.faiss import FAISSVectorStore
+
+
+class TestAsyncStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.vectors = rng.standard_normal((200, 8)).astype("float32")
+        self.texts = [f"doc-{i}" for i in range(len(self.vectors))]
+
+    def tearDown(self):
+        executor.configure_store_executor()
+
+    def test_async_methods_match_sync(self):
+        store = FAISSVectorStore()
+
+        async def scenario():
+            await store.aadd(self.texts, self.vectors)
+            single, batch = await asyncio.gather(
+                store.asearch(self.vectors[3], top_k=2),
+                store.asearch_batch(self.vectors[:4], top_k=2),
+            )
+            return single, batch
+
+        single, batch = asyncio.run(scenario())
+        self.assertEqual(single, store.search(self.vectors[3], top_k=2))
+        self.assertEqual(batch, store.search_batch(self.vectors[:4], top_k=2))
+
+    def test_executor_is_bounded_and_keeps_loop_responsive(self):
+        executor.configure_store_executor(max_workers=2)
+        store = FAISSVectorStore()
+        store.add(self.texts, self.vectors)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+        search = store.search
+
+        def slow_search(*args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return search(*args, **kwargs)
+
+        store.search = slow_search
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+
+            tick_task = asyncio.create_task(ticker())
+            results = await asyncio.gather(*(store.asearch(self.vectors[i], top_k=1) for i in range(8)))
+            tick_task.cancel()
+            return results, ticks
+
+        results, ticks = asyncio.run(scenario())
+        self.assertEqual([r[0]["text"] for r in results], [f"doc-{i}" for i in range(8)])
+        self.assertEqual(peak[0], 2)
+        # 检索在线程池中执行期间事件循环仍在调度其他协程
+        self.assertGreater(ticks, 10)
+
+    def test_module_level_async_wrappers(self):
+        path = "test_async_store"
+        self.addCleanup(shutil.rmtree, path, True)
+        self.addCleanup(vector_store.collections.clear)
+
+        async def scenario():
+            await vector_store.aadd(self.texts[:3], self.vectors[:3], path=path)
+            return await vector_store.asearch(self.vectors[1], top_k=1, path=path)
+
+        self.assertEqual(asyncio.run(scenario())[0]["text"], "doc-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
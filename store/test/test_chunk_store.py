@@ -0,0 +1,103 @@
+import os
+import shutil
+import unittest
+import numpy as np
+from store.chunk_store import ChunkStore
+
+
+class TestChunkStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = "test_chunk_store"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.store = ChunkStore.memory()
+        self.store.add(
+            [0, 1, 2],
+            ["a", "b", "c"],
+            ["苹果", "banana", "orange"],
+            [{"source": "x.txt", "page": 1}, {"source": "y.txt"}, {}]
+        )
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_point_and_bulk_lookup(self):
+        self.assertEqual(self.store.get(0), {"id": "a", "text": "苹果", "metadata": {"source": "x.txt", "page": 1}})
+        self.assertIsNone(self.store.get(99))
+        docs = self.store.get_many([2, 0, 2, 99])
+        self.assertEqual(sorted(docs), [0, 2])
+        self.assertEqual(self.store.labels_of(["c", "missing"]), {"c": 2})
+
+    def test_delete(self):
+        self.assertEqual(self.store.delete([1, 99]), 1)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual([label for label, _ in self.store.items()], [0, 2])
+
+    def test_save_and_open(self):
+        self.store.save(self.test_dir)
+        for read_only in (False, True):
+            with self.subTest(read_only=read_only):
+                loaded = ChunkStore.open(self.test_dir, read_only=read_only)
+                self.assertEqual(len(loaded), 3)
+                self.assertEqual(loaded.get(1)["text"], "banana")
+                loaded.close()
+
+    def test_snapshot_is_isolated_from_later_writes(self):
+        self.store.save(self.test_dir)
+        reader = ChunkStore.open(self.test_dir, read_only=True)
+        self.store.add([3], ["d"], ["kiwi"], [{}])
+        self.store.save(self.test_dir)
+        self.assertEqual(len(reader), 3)
+        reader.close()
+        reader = ChunkStore.open(self.test_dir, read_only=True)
+        self.assertEqual(len(reader), 4)
+        reader.close()
+
+    def test_original_vectors(self):
+        self.store.add([5, 6], ["e", "f"], ["x", "y"], [{}, {}], vectors=np.eye(2, dtype="float32"))
+        vectors = self.store.get_vectors([6, 0, 5])
+        self.assertEqual(sorted(vectors), [5, 6])
+        np.testing.assert_array_equal(vectors[6], [0.0, 1.0])
+        self.store.delete([5])
+        self.assertEqual(list(self.store.get_vectors([5, 6])), [6])
+
+    def test_original_vectors_are_saved_to_their_own_file(self):
+        vectors = np.random.rand(3, 4).astype("float32")
+        self.store.add([7, 8, 9], ["g", "h", "i"], ["x", "y", "z"], [{}] * 3, vectors=vectors)
+        self.store.delete([8])
+        self.store.save(self.test_dir)
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "originals.npy")))
+        for read_only in (False, True):
+            with self.subTest(read_only=read_only):
+                loaded = ChunkStore.open(self.test_dir, read_only=read_only)
+                found = loaded.get_vectors([9, 8, 7, 0])
+                self.assertEqual(sorted(found), [7, 9])
+                np.testing.assert_array_equal(found[9], vectors[2])
+                loaded.close()
+
+    def test_legacy_vector_table_is_migrated(self):
+        vector = np.arange(3, dtype="float32")
+        self.store._conn.execute("INSERT INTO vectors (label, vector) VALUES (?, ?)", (1, vector.tobytes()))
+        self.store.save(self.test_dir)
+        reader = ChunkStore.open(self.test_dir, read_only=True)
+        np.testing.assert_array_equal(reader.get_vectors([1])[1], vector)
+        reader.close()
+
+        writer = ChunkStore.open(self.test_dir)
+        self.assertEqual(writer._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0], 0)
+        np.testing.assert_array_equal(writer.get_vectors([1])[1], vector)
+        writer.close()
+
+    def test_reclaim_returns_free_pages(self):
+        labels = list(range(10, 3010))
+        self.store.add(labels, [f"id-{i}" for i in labels], ["x" * 500] * len(labels), [{}] * len(labels))
+        before = self.store.memory_bytes()
+        self.store.delete(labels)
+        self.assertGreater(self.store.reclaim(step_pages=64), 0)
+        self.assertLess(self.store.memory_bytes(), before // 2)
+        self.assertEqual(self.store.reclaim(), 0)
+        self.assertEqual(len(self.store), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+import numpy as np
+from store.providers.faiss import FAISSVectorStore
+from store.rwlock import RWLock
+
+
+class TestRWLock(unittest.TestCase):
+    def test_readers_share_and_writer_excludes(self):
+        lock = RWLock()
+        inside = []
+        both_readers_in = threading.Barrier(2, timeout=5)
+
+        def reader():
+            with lock.read():
+                inside.append("r")
+                # 两个读者必须能同时持有读锁，否则 barrier 超时
+                both_readers_in.wait()
+
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(inside, ["r", "r"])
+
+        lock.acquire_write()
+        acquired = threading.Event()
+
+        def blocked_reader():
+            with lock.read():
+                acquired.set()
+
+        thread = threading.Thread(target=blocked_reader)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        lock.release_write()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+
+class TestConcurrentStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.base = rng.standard_normal((100, 16)).astype("float32")
+        self.bulk = rng.standard_normal((40000, 16)).astype("float32") + 5
+
+    def test_searches_run_during_bulk_add_and_see_whole_adds(self):
+        store = FAISSVectorStore(add_batch_size=64)
+        store.add([f"base-{i}" for i in range(len(self.base))], self.base)
+
+        adder = threading.Thread(
+            target=store.add, args=([f"bulk-{i}" for i in range(len(self.bulk))], self.bulk)
+        )
+        adder.start()
+        while store.next_label == len(self.base):
+            time.sleep(0.001)
+
+        searched_during_add = 0
+        while adder.is_alive():
+            results = store.search(self.bulk[0], top_k=3)
+            if store._visible_label == len(self.base):
+                searched_during_add += 1
+                # 未完成的批量 add 对检索不可见
+                self.assertTrue(all(r["text"].startswith("base-") for r in results))
+        adder.join()
+
+        self.assertGreater(searched_during_add, 0)
+        self.assertEqual(store.search(self.bulk[0], top_k=1)[0]["text"], "bulk-0")
+
+    def test_parallel_searches_and_writes(self):
+        store = FAISSVectorStore()
+        store.add([f"base-{i}" for i in range(len(self.base))], self.base)
+        errors = []
+
+        def searcher():
+            try:
+                for i in range(200):
+                    results = store.search_batch(self.base[i % 10:i % 10 + 4], top_k=2)
+                    assert all(len(rows) == 2 for rows in results)
+            except Exception as e:
+                errors.append(e)
+
+        def writer():
+            try:
+                for i in range(20):
+                    store.add([f"w-{i}"], self.bulk[i:i + 1])
+                    store.delete(ids=[store.search(self.bulk[i], top_k=1)[0]["id"]])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=searcher) for _ in range(4)] + [threading.Thread(target=writer)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(store.chunk_store), len(self.base))
+
+
+if __name__ == "__main__":
+    unittest.main()
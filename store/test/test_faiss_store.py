@@ -0,0 +1,572 @@
+import os
+import shutil
+import threading
+import unittest
+from unittest import mock
+import faiss
+import numpy as np
+from store.factory import VectorStoreFactory
+from store.base import content_id, prepare_vectors
+from config.config import Config
+from store.providers.faiss import FAISSVectorStore, compression_summary
+from store.providers import faiss as faiss_module
+
+
+class TestFAISSVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = "test_faiss_provider"
+        rng = np.random.default_rng(42)
+        self.vectors = rng.standard_normal((512, 16)).astype("float32")
+        self.texts = [f"doc-{i}" for i in range(len(self.vectors))]
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_index_types_find_exact_match(self):
+        configs = [
+            {"index_type": "flat"},
+            {"index_type": "flat", "metric": "ip"},
+            {"index_type": "ivf_flat", "nlist": 8, "nprobe": 8},
+            {"index_type": "ivf_pq", "nlist": 8, "nprobe": 8, "pq_m": 4, "pq_nbits": 4},
+            {"index_type": "hnsw_flat", "m": 16, "ef_search": 64},
+        ]
+        for config in configs:
+            with self.subTest(**config):
+                store = VectorStoreFactory.get_vector_store("faiss", **config)
+                store.add(self.texts, self.vectors.tolist())
+                results = store.search(self.vectors[7].tolist(), top_k=3)
+                self.assertEqual(len(results), 3)
+                self.assertIn("doc-7", [r["text"] for r in results])
+
+    def test_ivf_requires_enough_training_vectors(self):
+        store = FAISSVectorStore(index_type="ivf_flat", nlist=64)
+        with self.assertRaises(ValueError):
+            store.add(self.texts[:10], self.vectors[:10].tolist())
+
+    def test_unsupported_index_type(self):
+        with self.assertRaises(ValueError):
+            FAISSVectorStore(index_type="lsh")
+
+    def test_ids_are_content_derived_and_stable(self):
+        store = FAISSVectorStore()
+        first = store.add(self.texts[:2], self.vectors[:2].tolist())
+        second = store.add(self.texts[2:4], self.vectors[2:4].tolist())
+        self.assertEqual(first + second, [content_id(t, {}) for t in self.texts[:4]])
+        self.assertEqual(store.search(self.vectors[2].tolist(), top_k=1)[0]["id"], second[0])
+
+    def test_top_k_must_be_positive(self):
+        store = FAISSVectorStore()
+        store.add(self.texts[:5], self.vectors[:5])
+        for top_k in (0, -1):
+            with self.assertRaises(ValueError):
+                store.search(self.vectors[0], top_k=top_k)
+        with self.assertRaises(ValueError):
+            store.search_batch([], top_k=0)
+
+    def test_generated_ids_skip_repeated_content(self):
+        store = FAISSVectorStore()
+        ids = store.add(["same", "same", "other"], self.vectors[:3].tolist())
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(len(store.chunk_store), 2)
+        # 重复写入已存储的内容不报错，也不产生新条目
+        self.assertEqual(store.add(["same"], self.vectors[5:6].tolist()), ids[:1])
+        self.assertEqual(store.index.ntotal, 2)
+        with self.assertRaises(ValueError):
+            store.add(["x", "y"], self.vectors[3:5].tolist(), ids=["dup", "dup"])
+
+    def test_caller_supplied_ids_and_duplicates(self):
+        store = FAISSVectorStore()
+        ids = store.add(self.texts[:2], self.vectors[:2].tolist(), ids=["a", "b"])
+        self.assertEqual(ids, ["a", "b"])
+        with self.assertRaises(ValueError):
+            store.add(self.texts[2:3], self.vectors[2:3].tolist(), ids=["a"])
+
+    def test_upsert_replaces_existing_document(self):
+        store = FAISSVectorStore()
+        store.add(self.texts[:3], self.vectors[:3].tolist(), ids=["a", "b", "c"])
+        store.upsert(["b-v2"], self.vectors[100:101].tolist(), ids=["b"])
+
+        self.assertEqual(len(store.chunk_store), 3)
+        self.assertEqual(store.search(self.vectors[100].tolist(), top_k=1)[0]["text"], "b-v2")
+        texts = [r["text"] for r in store.search(self.vectors[1].tolist(), top_k=3)]
+        self.assertNotIn("doc-1", texts)
+
+    def test_delete_by_ids_and_filter(self):
+        store = FAISSVectorStore(index_type="hnsw_flat", m=16)
+        metadatas = [{"source": f"{i % 4}.txt"} for i in range(len(self.texts))]
+        ids = store.add(self.texts, self.vectors.tolist(), metadatas)
+
+        self.assertEqual(store.delete(ids=[ids[5], "missing"]), 1)
+        self.assertNotIn("doc-5", [r["text"] for r in store.search(self.vectors[5].tolist(), top_k=5)])
+
+        # doc-5 属于 1.txt 且已被删除
+        self.assertEqual(store.delete(filter={"source": "1.txt"}), len(self.texts) // 4 - 1)
+        results = store.search(self.vectors[9].tolist(), top_k=20)
+        self.assertTrue(all(r["metadata"]["source"] != "1.txt" for r in results))
+        self.assertEqual(store.search(self.vectors[9].tolist(), filter={"source": "1.txt"}), [])
+
+    def test_tombstones_survive_save_and_load(self):
+        store = FAISSVectorStore()
+        ids = store.add(self.texts[:4], self.vectors[:4].tolist())
+        store.delete(ids=[ids[0]])
+        store.save(self.test_dir)
+
+        loaded = FAISSVectorStore()
+        loaded.load(self.test_dir)
+        self.assertEqual(loaded.tombstones, {0})
+        self.assertNotEqual(loaded.search(self.vectors[0].tolist(), top_k=1)[0]["id"], ids[0])
+        loaded.upsert(["doc-0"], self.vectors[:1].tolist(), ids=[ids[0]])
+        self.assertEqual(loaded.search(self.vectors[0].tolist(), top_k=1)[0]["id"], ids[0])
+
+    def test_load_empty_directory_gives_empty_store(self):
+        store = FAISSVectorStore()
+        store.add(self.texts, self.vectors)
+        os.makedirs(self.test_dir)
+        store.load(self.test_dir)
+        self.assertEqual(store.search(self.vectors[0], top_k=1), [])
+        store.add(["again"], self.vectors[:1])
+        self.assertEqual(store.search(self.vectors[0], top_k=1)[0]["text"], "again")
+
+    def test_save_and_load_restores_index_config(self):
+        store = FAISSVectorStore(index_type="hnsw_flat", m=16, ef_search=32)
+        store.add(self.texts, self.vectors.tolist())
+        store.save(self.test_dir)
+
+        loaded = FAISSVectorStore()
+        loaded.load(self.test_dir)
+        self.assertEqual(loaded.index_type, "hnsw_flat")
+        self.assertEqual(loaded.ef_search, 32)
+        self.assertEqual(loaded.search(self.vectors[3].tolist(), top_k=1)[0]["text"], "doc-3")
+
+    def test_search_batch_matches_single_search(self):
+        store = FAISSVectorStore()
+        store.add(self.texts, self.vectors.tolist())
+        queries = self.vectors[[1, 5, 9]].tolist()
+        batched = store.search_batch(queries, top_k=2)
+        self.assertEqual(len(batched), 3)
+        for query, results in zip(queries, batched):
+            self.assertEqual(results, store.search(query, top_k=2))
+
+    def test_float32_matrix_is_used_without_copy(self):
+        store = FAISSVectorStore()
+        self.assertIs(prepare_vectors(self.vectors, store.dimension, store.metric), self.vectors)
+        self.assertEqual(prepare_vectors([], store.dimension, store.metric).shape, (0, 0))
+
+        from_lists = FAISSVectorStore()
+        from_lists.add(self.texts, self.vectors.tolist())
+        store.add(self.texts, self.vectors)
+        self.assertEqual(
+            store.search_batch(self.vectors[[2, 4]], top_k=3),
+            from_lists.search_batch(self.vectors[[2, 4]].tolist(), top_k=3)
+        )
+
+    def test_scores_are_real_distances(self):
+        store = FAISSVectorStore()
+        store.add(["a", "b"], [[1.0, 0.0], [0.0, 2.0]])
+        results = store.search([1.0, 0.0], top_k=2)
+        self.assertEqual([r["score"] for r in results], [0.0, 5.0])
+
+    def test_ip_score_threshold_defaults_to_config(self):
+        from config.config import Config
+        store = FAISSVectorStore(metric="ip")
+        self.assertEqual(store.score_threshold, Config.SIMILARITY_THRESHOLD)
+
+        store.add(["near", "far"], [[1.0, 0.0], [0.6, 0.8]])
+        results = store.search([1.0, 0.0], top_k=2, score_threshold=0.9)
+        self.assertEqual([r["text"] for r in results], ["near"])
+        self.assertAlmostEqual(results[0]["score"], 1.0)
+
+        results = store.search([1.0, 0.0], top_k=2, score_threshold=None)
+        self.assertEqual(len(results), 2)
+
+    def test_cosine_normalizes_at_add_and_query(self):
+        store = FAISSVectorStore(metric="cosine")
+        self.assertEqual(store.score_threshold, Config.SIMILARITY_THRESHOLD)
+        store.add(["near", "far"], [[3.0, 0.0], [0.6, 0.8]])
+        results = store.search([10.0, 0.0], top_k=2, score_threshold=None)
+        self.assertEqual([r["text"] for r in results], ["near", "far"])
+        np.testing.assert_allclose([r["score"] for r in results], [1.0, 0.6], rtol=1e-6)
+
+        # 同方向、不同长度的向量得到同样的余弦分数
+        store.add(["long"], [[0.0, 50.0]])
+        self.assertAlmostEqual(store.search([0.0, 0.1], top_k=1)[0]["score"], 1.0, places=5)
+
+    def test_metric_is_persisted_and_mismatch_is_rejected(self):
+        store = FAISSVectorStore(metric="cosine")
+        store.add(self.texts, self.vectors)
+        store.save(self.test_dir)
+
+        loaded = FAISSVectorStore()
+        loaded.load(self.test_dir)
+        self.assertEqual(loaded.metric, "cosine")
+        self.assertAlmostEqual(loaded.search(self.vectors[3] * 7, top_k=1)[0]["score"], 1.0, places=5)
+        FAISSVectorStore(metric="cosine").load(self.test_dir)
+        for metric in ("l2", "ip"):
+            with self.assertRaises(ValueError):
+                FAISSVectorStore(metric=metric).load(self.test_dir)
+
+    def test_l2_score_threshold_is_max_distance(self):
+        store = FAISSVectorStore(score_threshold=1.0)
+        store.add(["a", "b"], [[1.0, 0.0], [0.0, 2.0]])
+        results = store.search([1.0, 0.0], top_k=2)
+        self.assertEqual([r["text"] for r in results], ["a"])
+
+    def test_filter(self):
+        store = FAISSVectorStore()
+        metadatas = [{"source": "a.txt" if i % 2 else "b.txt"} for i in range(len(self.texts))]
+        store.add(self.texts, self.vectors.tolist(), metadatas)
+        results = store.search(self.vectors[4].tolist(), top_k=5, filter={"source": "a.txt"})
+        self.assertTrue(results)
+        self.assertTrue(all(r["metadata"]["source"] == "a.txt" for r in results))
+
+
+    def test_selective_filter_returns_far_match(self):
+        # 只有一个命中且距离查询很远：后过滤 (fetch_k) 会漏掉，预过滤不会
+        store = FAISSVectorStore()
+        metadatas = [{"source": "rare.txt" if i == 300 else "common.txt"} for i in range(len(self.texts))]
+        store.add(self.texts, self.vectors.tolist(), metadatas)
+        results = store.search((-self.vectors[300]).tolist(), top_k=3, filter={"source": "rare.txt"})
+        self.assertEqual([r["text"] for r in results], ["doc-300"])
+
+    def test_filter_list_values_and_multiple_fields(self):
+        store = FAISSVectorStore(index_type="hnsw_flat", m=16)
+        metadatas = [{"source": f"{i % 4}.txt", "page": i % 3} for i in range(len(self.texts))]
+        store.add(self.texts, self.vectors.tolist(), metadatas)
+        results = store.search(self.vectors[0].tolist(), top_k=10, filter={"source": ["1.txt", "2.txt"], "page": 0})
+        self.assertEqual(len(results), 10)
+        for r in results:
+            self.assertIn(r["metadata"]["source"], ["1.txt", "2.txt"])
+            self.assertEqual(r["metadata"]["page"], 0)
+        self.assertEqual(store.search(self.vectors[0].tolist(), filter={"source": "missing"}), [])
+
+    def test_unindexed_field_falls_back_to_post_filter(self):
+        store = FAISSVectorStore(indexed_fields=["source"])
+        metadatas = [{"source": "a.txt", "lang": "en" if i % 2 else "zh"} for i in range(len(self.texts))]
+        store.add(self.texts, self.vectors.tolist(), metadatas)
+        self.assertFalse(store.metadata_index.can_serve({"lang": "en"}))
+        results = store.search(self.vectors[1].tolist(), top_k=3, filter={"lang": "en"})
+        self.assertTrue(all(r["metadata"]["lang"] == "en" for r in results))
+
+    def test_metadata_index_persists(self):
+        store = FAISSVectorStore()
+        metadatas = [{"source": f"{i % 8}.txt"} for i in range(len(self.texts))]
+        store.add(self.texts, self.vectors.tolist(), metadatas)
+        store.save(self.test_dir)
+
+        loaded = FAISSVectorStore()
+        loaded.load(self.test_dir)
+        expected = store.metadata_index.select({"source": "3.txt"})
+        np.testing.assert_array_equal(loaded.metadata_index.select({"source": "3.txt"}), expected)
+        results = loaded.search(self.vectors[11].tolist(), top_k=1, filter={"source": "3.txt"})
+        self.assertEqual(results[0]["text"], "doc-11")
+
+
+    def test_mmap_load_reads_lazily(self):
+        store = FAISSVectorStore(index_type="ivf_flat", nlist=8, nprobe=8)
+        metadatas = [{"source": f"{i % 4}.txt"} for i in range(len(self.texts))]
+        store.add(self.texts, self.vectors.tolist(), metadatas)
+        store.save(self.test_dir)
+
+        loaded = FAISSVectorStore(mmap=True)
+        loaded.load(self.test_dir)
+        self.assertTrue(loaded.chunk_store.read_only)
+        self.assertEqual(loaded.search(self.vectors[6].tolist(), top_k=1)[0]["text"], "doc-6")
+        results = loaded.search(self.vectors[6].tolist(), top_k=3, filter={"source": "1.txt"})
+        self.assertTrue(all(r["metadata"]["source"] == "1.txt" for r in results))
+
+    def test_saving_unchanged_mmap_store_keeps_mapping(self):
+        store = FAISSVectorStore()
+        store.add(self.texts[:10], self.vectors[:10])
+        store.save(self.test_dir)
+        state_mtime = os.stat(os.path.join(self.test_dir, "state.json")).st_mtime_ns
+
+        loaded = FAISSVectorStore(mmap=True)
+        loaded.load(self.test_dir)
+        loaded.save(self.test_dir)
+        # 未变更的存储保存回原目录：不写文件，也不把映射读入私有内存
+        self.assertEqual(loaded._mmap_path, self.test_dir)
+        self.assertTrue(loaded.chunk_store.read_only)
+        self.assertEqual(os.stat(os.path.join(self.test_dir, "state.json")).st_mtime_ns, state_mtime)
+
+    def test_write_after_mmap_load_materializes(self):
+        store = FAISSVectorStore()
+        ids = store.add(self.texts[:10], self.vectors[:10].tolist())
+        store.save(self.test_dir)
+
+        loaded = FAISSVectorStore(mmap=True)
+        loaded.load(self.test_dir)
+        loaded.delete(ids=[ids[0]])
+        loaded.add(["new"], self.vectors[200:201].tolist())
+        self.assertFalse(loaded.chunk_store.read_only)
+        self.assertEqual(loaded.search(self.vectors[200].tolist(), top_k=1)[0]["text"], "new")
+
+        loaded.save(self.test_dir)
+        reloaded = FAISSVectorStore(mmap=True)
+        reloaded.load(self.test_dir)
+        self.assertEqual(len(reloaded.chunk_store), 10)
+        self.assertNotEqual(reloaded.search(self.vectors[0].tolist(), top_k=1)[0]["id"], ids[0])
+
+    def test_incremental_save_appends_to_wal(self):
+        store = FAISSVectorStore(wal_compact_ratio=10)
+        ids = store.add(self.texts[:100], self.vectors[:100].tolist())
+        store.save(self.test_dir)
+        base = os.path.join(self.test_dir, "index.1.faiss")
+        base_mtime = os.stat(base).st_mtime_ns
+
+        store.add(self.texts[100:110], self.vectors[100:110].tolist())
+        store.delete(ids=[ids[0]])
+        store.save(self.test_dir)
+        self.assertEqual(os.stat(base).st_mtime_ns, base_mtime)
+        self.assertGreater(os.path.getsize(os.path.join(self.test_dir, "wal.1.log")), 0)
+
+        loaded = FAISSVectorStore()
+        loaded.load(self.test_dir)
+        self.assertEqual(len(loaded.chunk_store), 109)
+        self.assertEqual(loaded.search(self.vectors[105].tolist(), top_k=1)[0]["text"], "doc-105")
+        self.assertNotEqual(loaded.search(self.vectors[0].tolist(), top_k=1)[0]["id"], ids[0])
+
+        # 重放后继续增量写入同一代日志
+        loaded.add(["new"], self.vectors[300:301].tolist())
+        loaded.save(self.test_dir)
+        reloaded = FAISSVectorStore()
+        reloaded.load(self.test_dir)
+        self.assertEqual(reloaded.search(self.vectors[300].tolist(), top_k=1)[0]["text"], "new")
+        self.assertEqual(reloaded.next_label, 111)
+
+    def test_wal_records_are_buffered_only_with_a_home(self):
+        store = FAISSVectorStore(compression="sq8")
+        store.add(self.texts[:100], self.vectors[:100])
+        # 从未保存：下次 save 必然写完整快照，不缓冲向量副本
+        self.assertEqual(store._pending, [])
+        store.save(self.test_dir)
+
+        before = store.memory_bytes()
+        store.add(self.texts[100:110], self.vectors[100:110])
+        self.assertEqual(len(store._pending), 1)
+        # 缓冲的向量计入内存估算
+        self.assertGreaterEqual(store.memory_bytes() - before, self.vectors[100:110].nbytes)
+        store.save(self.test_dir)
+        self.assertEqual((store._pending, store._pending_bytes), ([], 0))
+
+    def test_wal_torn_tail_is_discarded(self):
+        store = FAISSVectorStore(wal_compact_ratio=10)
+        store.add(self.texts[:50], self.vectors[:50].tolist())
+        store.save(self.test_dir)
+        store.add(self.texts[50:60], self.vectors[50:60].tolist())
+        store.save(self.test_dir)
+        wal_path = os.path.join(self.test_dir, "wal.1.log")
+        complete = os.path.getsize(wal_path)
+        store.add(self.texts[60:70], self.vectors[60:70].tolist())
+        store.save(self.test_dir)
+        # 模拟写第二条记录时崩溃
+        os.truncate(wal_path, complete + 40)
+
+        loaded = FAISSVectorStore()
+        loaded.load(self.test_dir)
+        self.assertEqual(len(loaded.chunk_store), 60)
+        self.assertEqual(os.path.getsize(wal_path), complete)
+
+    def test_wal_compacts_into_new_generation(self):
+        store = FAISSVectorStore(wal_compact_ratio=0.2)
+        store.add(self.texts[:100], self.vectors[:100].tolist())
+        store.save(self.test_dir)
+        store.add(self.texts[100:200], self.vectors[100:200].tolist())
+        store.save(self.test_dir)
+
+        files = set(os.listdir(self.test_dir))
+        self.assertIn("index.2.faiss", files)
+        self.assertFalse({"index.1.faiss", "chunks.1.db", "wal.1.log"} & files)
+        loaded = FAISSVectorStore(mmap=True)
+        loaded.load(self.test_dir)
+        self.assertTrue(loaded.chunk_store.read_only)
+        self.assertEqual(len(loaded.chunk_store), 200)
+
+    def test_compression_modes_with_rescore(self):
+        for compression in ("fp16", "sq8", "pq"):
+            for index_type in ("flat", "hnsw_flat"):
+                with self.subTest(compression=compression, index_type=index_type):
+                    store = FAISSVectorStore(
+                        index_type=index_type, compression=compression, pq_m=4, pq_nbits=4, rescore=True
+                    )
+                    store.add(self.texts, self.vectors)
+                    results = store.search(self.vectors[7], top_k=3)
+                    self.assertEqual(results[0]["text"], "doc-7")
+                    # 重排后的分数是原始向量的精确平方 L2 距离
+                    expected = np.square(self.vectors[[int(r["text"][4:]) for r in results]] - self.vectors[7]).sum(axis=1)
+                    np.testing.assert_allclose([r["score"] for r in results], expected, rtol=1e-4, atol=1e-4)
+
+        with self.assertRaises(ValueError):
+            FAISSVectorStore(index_type="ivf_pq", compression="sq8")
+
+    def test_rescore_survives_save_and_mmap_load(self):
+        store = FAISSVectorStore(compression="sq8", rescore=True)
+        store.add(self.texts, self.vectors)
+        # 原始向量在磁盘文件中，不增加块存储的内存工作副本
+        plain = FAISSVectorStore(compression="sq8")
+        plain.add(self.texts, self.vectors)
+        self.assertEqual(store.chunk_store.memory_bytes(), plain.chunk_store.memory_bytes())
+        store.save(self.test_dir)
+        self.assertIn(f"originals.{store._generation}.npy", os.listdir(self.test_dir))
+
+        loaded = FAISSVectorStore(mmap=True)
+        loaded.load(self.test_dir)
+        self.assertEqual(loaded.compression, "sq8")
+        result = loaded.search(self.vectors[9], top_k=1)[0]
+        self.assertEqual(result["text"], "doc-9")
+        self.assertAlmostEqual(result["score"], 0.0, places=4)
+
+    def test_compression_summary(self):
+        summary = compression_summary(self.vectors, self.vectors[:20], top_k=5, pq_m=4, pq_nbits=4)
+        rows = {row["compression"]: row for row in summary}
+        self.assertEqual(set(rows), {"none", "fp16", "sq8", "pq"})
+        self.assertEqual(rows["none"]["recall"], 1.0)
+        self.assertGreater(rows["sq8"]["memory_ratio"], 2 * rows["none"]["memory_ratio"])
+        self.assertGreater(rows["pq"]["memory_ratio"], rows["sq8"]["memory_ratio"])
+        self.assertGreaterEqual(rows["pq"]["rescored_recall"], rows["pq"]["recall"])
+
+    def test_auto_switches_to_ivf_past_threshold(self):
+        store = FAISSVectorStore(index_type="auto", auto_train_threshold=400, nprobe=64)
+        store.add(self.texts[:300], self.vectors[:300])
+        self.assertEqual(store.active_type, "flat")
+
+        store.add(self.texts[300:], self.vectors[300:])
+        store._background.join()
+        self.assertEqual(store.active_type, "ivf_flat")
+        self.assertIsInstance(faiss.downcast_index(store.index.index), faiss.IndexIVF)
+        self.assertEqual(store.index.ntotal, len(self.vectors))
+        self.assertEqual(store.search(self.vectors[7], top_k=1)[0]["text"], "doc-7")
+
+        generation = store.generations[-1]
+        self.assertEqual(generation["generation"], 1)
+        self.assertEqual(generation["vectors"], len(self.vectors))
+        self.assertGreater(generation["recall"], 0.9)
+        self.assertGreater(generation["latency_ms"], 0)
+
+        store.save(self.test_dir)
+        loaded = FAISSVectorStore()
+        loaded.load(self.test_dir)
+        self.assertEqual((loaded.index_type, loaded.active_type), ("auto", "ivf_flat"))
+        self.assertEqual(loaded.search(self.vectors[9], top_k=1)[0]["text"], "doc-9")
+
+    def test_retrain_catches_up_with_concurrent_writes(self):
+        store = FAISSVectorStore(index_type="auto", auto_train_threshold=10 ** 9)
+        store.add(self.texts[:400], self.vectors[:400])
+        original_evaluate = store._evaluate
+
+        def evaluate_then_write(*args):
+            # 训练完成、替换之前写入的向量与墓碑都必须出现在新索引中
+            store.add(self.texts[400:], self.vectors[400:])
+            store.delete(ids=[content_id("doc-3", {})])
+            return original_evaluate(*args)
+
+        store._evaluate = evaluate_then_write
+        store.retrain()
+        self.assertEqual(store.active_type, "ivf_flat")
+        self.assertEqual(store.index.ntotal, len(self.vectors))
+        self.assertEqual(store.search(self.vectors[500], top_k=1)[0]["text"], "doc-500")
+        self.assertNotIn("doc-3", [r["text"] for r in store.search(self.vectors[3], top_k=3)])
+
+    def test_rebuilds_use_originals_instead_of_decoded_vectors(self):
+        def error(store):
+            vectors, labels = faiss_module._reconstruct(store.index, 0, store.index.ntotal)
+            return float(np.square(vectors - self.vectors[labels]).sum())
+
+        store = FAISSVectorStore(
+            index_type="auto", auto_train_threshold=10 ** 9, compression="pq", pq_m=4, pq_nbits=4, rescore=True
+        )
+        store.add(self.texts, self.vectors)
+        store.retrain()
+        first = error(store)
+        with mock.patch.object(faiss_module, "_reconstruct", side_effect=AssertionError("decoded vectors used")):
+            for _ in range(3):
+                store.retrain()
+                store.delete(ids=[content_id(f"doc-{len(store.generations)}", {})])
+                store.compact()
+        # 每次都从原始向量重新训练与编码，量化误差不累积
+        self.assertLessEqual(error(store), first * 1.05)
+
+    def test_compact_removes_tombstones(self):
+        configs = [
+            {"index_type": "flat"},
+            {"index_type": "ivf_flat", "nlist": 8, "nprobe": 8},
+            {"index_type": "hnsw_flat", "m": 16},
+            {"compression": "sq8", "rescore": True},
+        ]
+        metadatas = [{"source": f"{i % 2}.txt"} for i in range(len(self.texts))]
+        for config in configs:
+            with self.subTest(**config):
+                store = FAISSVectorStore(**config)
+                self.assertEqual(store.compact(), 0)
+                ids = store.add(self.texts, self.vectors, metadatas)
+                store.delete(ids=ids[:200])
+                before = store.memory_bytes()
+
+                self.assertEqual(store.compact(), 200)
+                self.assertEqual(store.index.ntotal, len(self.texts) - 200)
+                self.assertEqual(store.tombstones, set())
+                self.assertLess(store.memory_bytes(), before)
+                self.assertTrue(np.all(store.metadata_index.select({"source": "0.txt"}) >= 200))
+                self.assertEqual(store.search(self.vectors[300], top_k=1)[0]["text"], "doc-300")
+                self.assertNotIn("doc-7", [r["text"] for r in store.search(self.vectors[7], top_k=5)])
+                self.assertEqual(store.search(self.vectors[7], top_k=1, filter={"source": "1.txt"})[0]["metadata"]["source"], "1.txt")
+
+                store.add(["new"], self.vectors[:1] + 100)
+                store.save(self.test_dir)
+                loaded = FAISSVectorStore()
+                loaded.load(self.test_dir)
+                self.assertEqual(loaded.index.ntotal, len(self.texts) - 199)
+                self.assertEqual(loaded.search(self.vectors[0] + 100, top_k=1)[0]["text"], "new")
+
+    def test_dead_ratio_triggers_background_compaction(self):
+        store = FAISSVectorStore(compact_dead_ratio=0.25)
+        ids = store.add(self.texts, self.vectors)
+        with mock.patch("store.providers.faiss._COMPACT_MIN_DEAD", 50):
+            store.delete(ids=ids[:100])
+            self.assertIsNone(store._background)
+            store.delete(ids=ids[100:150])
+        store._background.join()
+        self.assertEqual(store.index.ntotal, len(self.texts) - 150)
+        self.assertEqual(store.tombstones, set())
+
+    def test_compact_alongside_writes(self):
+        rng = np.random.default_rng(7)
+        vectors = rng.standard_normal((20000, 16)).astype("float32")
+        store = FAISSVectorStore(compact_dead_ratio=None)
+        ids = store.add([f"v-{i}" for i in range(len(vectors))], vectors)
+        store.delete(ids=ids[:10000])
+
+        compactor = threading.Thread(target=store.compact)
+        compactor.start()
+        extra = rng.standard_normal((50, 16)).astype("float32") + 10
+        for i in range(50):
+            store.add([f"extra-{i}"], extra[i:i + 1])
+            store.delete(ids=[ids[10000 + i]])
+        compactor.join()
+
+        # 压缩期间的写入全部保留，墓碑始终是索引中向量的子集
+        self.assertEqual(store.index.ntotal - len(store.tombstones), 10000)
+        self.assertEqual(len(store.chunk_store), 10000)
+        self.assertEqual(store.search(extra[49], top_k=1)[0]["text"], "extra-49")
+        self.assertNotIn("v-10000", [r["text"] for r in store.search(vectors[10000], top_k=3)])
+
+    def test_load_legacy_langchain_format(self):
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.embeddings import FakeEmbeddings
+
+        legacy = FAISS.from_embeddings(
+            text_embeddings=list(zip(self.texts[:5], self.vectors[:5].tolist())),
+            embedding=FakeEmbeddings(size=16),
+            metadatas=[{"source": "old.txt"}] * 5
+        )
+        legacy.save_local(self.test_dir)
+
+        store = FAISSVectorStore()
+        store.load(self.test_dir)
+        results = store.search(self.vectors[2].tolist(), top_k=1, filter={"source": "old.txt"})
+        self.assertEqual(results[0]["text"], "doc-2")
+        self.assertEqual(store.delete(ids=[results[0]["id"]]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from store.factory import VectorStoreFactory
+from store.mmr import maximal_marginal_relevance
+
+
+class TestMaximalMarginalRelevance(unittest.TestCase):
+    def test_skips_near_duplicates(self):
+        query = np.array([1.0, 0.0])
+        candidates = np.array([[1.0, 0.05], [1.0, 0.06], [1.0, 0.07], [0.6, -0.8]])
+        self.assertEqual(maximal_marginal_relevance(query, candidates, top_k=2, lambda_mult=0.5), [0, 3])
+        # lambda_mult=1 退化为按相关性排序
+        self.assertEqual(maximal_marginal_relevance(query, candidates, top_k=3, lambda_mult=1.0), [0, 1, 2])
+
+    def test_edge_cases(self):
+        self.assertEqual(maximal_marginal_relevance([1.0, 0.0], np.empty((0, 2)), top_k=3), [])
+        self.assertEqual(maximal_marginal_relevance([1.0, 0.0], [[0.0, 1.0], [1.0, 0.0]], top_k=5), [1, 0])
+
+
+class TestSearchMMR(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        base = rng.standard_normal((50, 8)).astype("float32")
+        # 每个块有 3 个几乎相同的重叠副本
+        self.vectors = np.repeat(base, 3, axis=0) + rng.normal(0, 1e-3, (150, 8)).astype("float32")
+        self.texts = [f"chunk-{i // 3}-{i % 3}" for i in range(len(self.vectors))]
+
+    def test_providers_return_diverse_results(self):
+        for provider, kwargs in (
+            ("faiss", {}),
+            ("faiss", {"index_type": "ivf_flat", "nlist": 4, "nprobe": 4}),
+            ("faiss", {"compression": "sq8", "rescore": True}),
+            ("numpy", {}),
+            ("sharded", {"num_shards": 3}),
+        ):
+            with self.subTest(provider=provider, **kwargs):
+                store = VectorStoreFactory.get_vector_store(provider, **kwargs)
+                store.add(self.texts, self.vectors)
+                plain = store.search(self.vectors[30], top_k=3)
+                self.assertEqual({r["text"].rsplit("-", 1)[0] for r in plain}, {"chunk-10"})
+
+                diverse = store.search_mmr(self.vectors[30], top_k=3, fetch_k=12)
+                self.assertEqual(len(diverse), 3)
+                self.assertEqual(diverse[0]["text"].rsplit("-", 1)[0], "chunk-10")
+                self.assertEqual(len({r["text"].rsplit("-", 1)[0] for r in diverse}), 3)
+
+    def test_deleted_candidates_are_dropped(self):
+        store = VectorStoreFactory.get_vector_store("faiss")
+        ids = store.add(self.texts, self.vectors)
+        self.assertEqual(store.get_vectors([ids[0], "missing"]).keys(), {ids[0]})
+        np.testing.assert_allclose(store.get_vectors([ids[4]])[ids[4]], self.vectors[4])
+        store.delete(ids=[ids[0]])
+        self.assertEqual(store.get_vectors([ids[0]]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import shutil
+import unittest
+import numpy as np
+from store.factory import VectorStoreFactory
+from store.providers.numpy_store import NumpyVectorStore
+
+
+class TestNumpyVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = "test_numpy_provider"
+        rng = np.random.default_rng(11)
+        self.vectors = rng.standard_normal((700, 16)).astype("float32")
+        self.texts = [f"doc-{i}" for i in range(len(self.vectors))]
+        self.metadatas = [{"source": f"{i % 5}.txt"} for i in range(len(self.texts))]
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _exact(self, query, k, metric="l2"):
+        if metric == "l2":
+            scores = np.square(self.vectors - query).sum(axis=1)
+            return np.argsort(scores)[:k].tolist()
+        return np.argsort(-(self.vectors @ query))[:k].tolist()
+
+    def test_exact_top_k_matches_brute_force(self):
+        for metric in ("l2", "ip"):
+            with self.subTest(metric=metric):
+                store = VectorStoreFactory.get_vector_store("numpy", metric=metric, score_threshold=None)
+                # 分两次写入，覆盖容量扩展
+                store.add(self.texts[:300], self.vectors[:300])
+                store.add(self.texts[300:], self.vectors[300:].tolist())
+                queries = self.vectors[[4, 123, 456]] + 0.1
+                for query, results in zip(queries, store.search_batch(queries, top_k=5)):
+                    self.assertEqual([int(r["text"][4:]) for r in results], self._exact(query, 5, metric))
+
+    def test_scores_match_faiss_semantics(self):
+        store = NumpyVectorStore()
+        store.add(["a", "b"], [[1.0, 0.0], [0.0, 2.0]])
+        results = store.search([1.0, 0.0], top_k=5)
+        self.assertEqual([r["text"] for r in results], ["a", "b"])
+        self.assertEqual([r["score"] for r in results], [0.0, 5.0])
+
+        store = NumpyVectorStore(metric="ip")
+        store.add(["near", "far"], [[1.0, 0.0], [0.6, 0.8]])
+        self.assertEqual([r["text"] for r in store.search([1.0, 0.0], top_k=2, score_threshold=0.9)], ["near"])
+
+    def test_cosine_metric_persists_and_rejects_mismatch(self):
+        store = NumpyVectorStore(metric="cosine")
+        store.add(["near", "far"], [[3.0, 0.0], [0.6, 0.8]])
+        results = store.search([10.0, 0.0], top_k=2, score_threshold=None)
+        self.assertEqual([r["text"] for r in results], ["near", "far"])
+        np.testing.assert_allclose([r["score"] for r in results], [1.0, 0.6], rtol=1e-6)
+        store.save(self.test_dir)
+
+        loaded = NumpyVectorStore()
+        loaded.load(self.test_dir)
+        self.assertEqual(loaded.metric, "cosine")
+        with self.assertRaises(ValueError):
+            NumpyVectorStore(metric="l2").load(self.test_dir)
+
+    def test_top_k_must_be_positive(self):
+        store = NumpyVectorStore()
+        store.add(self.texts[:5], self.vectors[:5])
+        for top_k in (0, -1):
+            with self.assertRaises(ValueError):
+                store.search(self.vectors[0], top_k=top_k)
+
+    def test_generated_ids_skip_repeated_content(self):
+        store = NumpyVectorStore()
+        ids = store.add(["same", "same", "other"], self.vectors[:3])
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(store.add(["same"], self.vectors[5:6]), ids[:1])
+        self.assertEqual(len(store.chunk_store), 2)
+        with self.assertRaises(ValueError):
+            store.add(["x"], self.vectors[3:4], ids=[ids[2]])
+
+    def test_float16_storage(self):
+        store = NumpyVectorStore(dtype="float16")
+        store.add(self.texts, self.vectors)
+        self.assertEqual(store._vectors.dtype, np.float16)
+        self.assertEqual(store.search(self.vectors[77], top_k=1)[0]["text"], "doc-77")
+
+    def test_delete_upsert_and_filters(self):
+        store = NumpyVectorStore(indexed_fields=["source"])
+        metadatas = [dict(m, page=i % 3) for i, m in enumerate(self.metadatas)]
+        ids = store.add(self.texts, self.vectors, metadatas)
+
+        self.assertEqual(store.delete(ids=[ids[10]]), 1)
+        self.assertNotIn("doc-10", [r["text"] for r in store.search(self.vectors[10], top_k=5)])
+        store.upsert(["doc-11-v2"], self.vectors[600:601] + 50, ids=[ids[11]])
+        self.assertEqual(store.search(self.vectors[600] + 50, top_k=1)[0]["text"], "doc-11-v2")
+
+        results = store.search(-self.vectors[3], top_k=3, filter={"source": "3.txt"})
+        self.assertTrue(results and all(r["metadata"]["source"] == "3.txt" for r in results))
+        # page 未建索引：多取候选后逐条过滤
+        results = store.search(self.vectors[5], top_k=2, filter={"page": 2})
+        self.assertEqual(results[0]["text"], "doc-5")
+        self.assertTrue(all(r["metadata"]["page"] == 2 for r in results))
+        self.assertEqual(store.delete(filter={"source": "0.txt"}), 140 - 1)
+
+    def test_save_and_mmap_load(self):
+        store = NumpyVectorStore(dtype="float16")
+        ids = store.add(self.texts, self.vectors, self.metadatas)
+        store.delete(ids=[ids[0]])
+        store.save(self.test_dir)
+
+        loaded = NumpyVectorStore(mmap=True)
+        loaded.load(self.test_dir)
+        self.assertIsInstance(loaded._vectors, np.memmap)
+        self.assertEqual(loaded.dtype, "float16")
+        self.assertEqual(loaded.search(self.vectors[8], top_k=1)[0]["text"], "doc-8")
+        self.assertNotEqual(loaded.search(self.vectors[0], top_k=1)[0]["id"], ids[0])
+
+        loaded.add(["new"], self.vectors[:1] + 20)
+        self.assertNotIsInstance(loaded._vectors, np.memmap)
+        self.assertEqual(loaded.search(self.vectors[0] + 20, top_k=1)[0]["text"], "new")
+        self.assertEqual(len(loaded.chunk_store), len(self.texts))
+
+
+if __name__ == "__main__":
+    unittest.main()
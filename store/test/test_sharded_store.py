@@ -0,0 +1,159 @@
+import os
+import shutil
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+from store.factory import VectorStoreFactory
+from store.providers.faiss import FAISSVectorStore
+from store.providers.sharded import ShardedVectorStore
+
+
+class TestShardedVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = "test_sharded_provider"
+        rng = np.random.default_rng(7)
+        self.vectors = rng.standard_normal((400, 16)).astype("float32")
+        self.texts = [f"doc-{i}" for i in range(len(self.vectors))]
+        self.metadatas = [{"source": f"{i % 10}.txt"} for i in range(len(self.texts))]
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_factory_registration(self):
+        store = VectorStoreFactory.get_vector_store("sharded", num_shards=2, index_type="hnsw_flat")
+        self.assertIsInstance(store, ShardedVectorStore)
+        self.assertEqual(len(store.shards), 2)
+        self.assertEqual(store.shards[0].index_type, "hnsw_flat")
+
+    def test_merged_results_match_single_index(self):
+        for metric in ("l2", "ip"):
+            with self.subTest(metric=metric):
+                single = FAISSVectorStore(metric=metric, score_threshold=None)
+                sharded = ShardedVectorStore(num_shards=4, metric=metric, score_threshold=None)
+                ids = single.add(self.texts, self.vectors, self.metadatas)
+                self.assertEqual(sharded.add(self.texts, self.vectors, self.metadatas), ids)
+                self.assertTrue(all(len(shard.chunk_store) > 0 for shard in sharded.shards))
+
+                queries = self.vectors[[3, 50, 77]]
+                expected = single.search_batch(queries, top_k=5)
+                actual = sharded.search_batch(queries, top_k=5)
+                for want, got in zip(expected, actual):
+                    self.assertEqual([r["id"] for r in got], [r["id"] for r in want])
+
+    def test_accepts_lists_and_matrices(self):
+        from_matrix = ShardedVectorStore(num_shards=3)
+        from_lists = ShardedVectorStore(num_shards=3)
+        ids = from_matrix.add(self.texts, self.vectors, self.metadatas)
+        self.assertEqual(from_lists.add(self.texts, self.vectors.tolist(), self.metadatas), ids)
+        self.assertEqual(from_matrix.add([], []), [])
+        self.assertEqual(
+            from_matrix.search_batch(self.vectors[[1, 2]], top_k=4),
+            from_lists.search_batch(self.vectors[[1, 2]].tolist(), top_k=4)
+        )
+
+    def test_source_partition_routes_filtered_search(self):
+        store = ShardedVectorStore(num_shards=4, partition="source")
+        store.add(self.texts, self.vectors, self.metadatas)
+        for shard in store.shards:
+            sources = {doc["metadata"]["source"] for _, doc in shard.chunk_store.items()}
+            for other in store.shards:
+                if other is not shard:
+                    others = {doc["metadata"]["source"] for _, doc in other.chunk_store.items()}
+                    self.assertFalse(sources & others)
+
+        self.assertEqual(len(store._shards_for({"source": "3.txt"})), 1)
+        results = store.search(self.vectors[13], top_k=3, filter={"source": "3.txt"})
+        self.assertEqual(results[0]["text"], "doc-13")
+        self.assertTrue(all(r["metadata"]["source"] == "3.txt" for r in results))
+
+    def test_source_partition_keeps_ids_unique(self):
+        store = ShardedVectorStore(num_shards=4, partition="source")
+        first = "0.txt"
+        other = next(
+            source for source in (f"{i}.txt" for i in range(1, 10))
+            if store._shard_of("same", {"source": source}) != store._shard_of("same", {"source": first})
+        )
+        store.add(["v1"], self.vectors[:1], [{"source": first}], ids=["same"])
+        # 同一 ID 换了 source 会路由到其他分片，仍然视为重复
+        with self.assertRaises(ValueError):
+            store.add(["v2"], self.vectors[1:2], [{"source": other}], ids=["same"])
+        with self.assertRaises(ValueError):
+            store.add(["a", "b"], self.vectors[:2], [{"source": first}, {"source": other}], ids=["dup", "dup"])
+
+        store.upsert(["v2"], self.vectors[1:2], [{"source": other}], ids=["same"])
+        self.assertEqual(sum(len(shard.chunk_store) for shard in store.shards), 1)
+        self.assertEqual(store.search(self.vectors[1], top_k=1)[0]["text"], "v2")
+        self.assertEqual(store.delete(ids=["same"]), 1)
+
+    def test_generated_ids_skip_repeated_content(self):
+        store = ShardedVectorStore(num_shards=4)
+        ids = store.add(["same", "same", "other"], self.vectors[:3])
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(store.add(["same"], self.vectors[5:6]), ids[:1])
+        self.assertEqual(sum(len(shard.chunk_store) for shard in store.shards), 2)
+        store.upsert(["same", "same"], self.vectors[6:8])
+        self.assertEqual(sum(len(shard.chunk_store) for shard in store.shards), 2)
+
+    def test_upsert_and_delete(self):
+        store = ShardedVectorStore(num_shards=3)
+        ids = store.add(self.texts[:30], self.vectors[:30], self.metadatas[:30])
+        self.assertEqual(store.delete(ids=[ids[0], "missing"]), 1)
+        self.assertEqual(store.delete(filter={"source": "1.txt"}), 3)
+        store.upsert(["doc-2-v2"], self.vectors[200:201], ids=[ids[2]])
+        self.assertEqual(store.search(self.vectors[200], top_k=1)[0]["text"], "doc-2-v2")
+        self.assertEqual(sum(len(shard.chunk_store) for shard in store.shards), 26)
+
+    def test_compaction_does_not_block_search(self):
+        store = ShardedVectorStore(num_shards=2)
+        self.addCleanup(store.close)
+        store.add(self.texts[:50], self.vectors[:50])
+        started, proceed = threading.Barrier(3), threading.Event()
+
+        def slow_compact(shard):
+            started.wait(5)
+            proceed.wait(5)
+            return 0
+
+        with mock.patch.object(FAISSVectorStore, "compact", slow_compact):
+            compacting = threading.Thread(target=store.compact)
+            compacting.start()
+            # 两个分片都在压缩时，检索仍有空闲线程可用
+            started.wait(5)
+            searching = threading.Thread(target=store.search, args=(self.vectors[7],))
+            searching.start()
+            searching.join(2)
+            self.assertFalse(searching.is_alive())
+            proceed.set()
+            compacting.join()
+
+    def test_save_and_load_shards_independently(self):
+        store = ShardedVectorStore(num_shards=3, index_type="hnsw_flat", m=16)
+        store.add(self.texts, self.vectors, self.metadatas)
+        store.save(self.test_dir)
+        self.assertTrue(all(os.path.isdir(os.path.join(self.test_dir, f"shard-{i}")) for i in range(3)))
+
+        loaded = ShardedVectorStore()
+        old_shards = loaded.shards
+        with mock.patch.object(FAISSVectorStore, "close", autospec=True) as close:
+            loaded.load(self.test_dir)
+        self.assertEqual(loaded.num_shards, 3)
+        # 布局不同：旧分片被关闭，线程池按新的分片数重建
+        self.assertEqual([call.args[0] for call in close.call_args_list], old_shards)
+        self.assertEqual(loaded._maintenance._max_workers, 3)
+        self.assertEqual(loaded.shards[0].index_type, "hnsw_flat")
+        self.assertEqual(loaded.search(self.vectors[42], top_k=1)[0]["text"], "doc-42")
+
+        # 只保存一个分片的改动，再只重新加载该分片
+        target = loaded._shard_of(loaded.search(self.vectors[42], top_k=1)[0]["id"], {})
+        loaded.shards[target].add(["extra"], self.vectors[:1] + 10, ids=["extra"])
+        loaded.save(self.test_dir, shards=[target])
+        partial = ShardedVectorStore(num_shards=3, index_type="hnsw_flat", m=16)
+        partial.load(self.test_dir, shards=[target])
+        self.assertEqual(partial.search(self.vectors[0] + 10, top_k=1)[0]["text"], "extra")
+        self.assertEqual(sum(len(shard.chunk_store) for shard in partial.shards), len(partial.shards[target].chunk_store))
+
+
+if __name__ == "__main__":
+    unittest.main()
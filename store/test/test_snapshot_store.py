@@ -0,0 +1,99 @@
+import os
+import shutil
+import time
+import unittest
+from store import vector_store
+from store.base import ReadOnlyStoreError
+from store.factory import VectorStoreFactory
+from store.providers.faiss import FAISSVectorStore
+from store.providers.snapshot import SnapshotVectorStore, publish_snapshot, latest_version
+
+
+class TestSnapshotVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.root = "test_snapshots"
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _publish(self, texts, keep=None):
+        store = FAISSVectorStore()
+        store.add(texts, [[float(i), 1.0] for i in range(len(texts))])
+        return publish_snapshot(store, self.root, keep=keep)
+
+    def test_refresh_swaps_and_retires_old_snapshot(self):
+        first = self._publish(["old-0", "old-1"])
+        store = SnapshotVectorStore(poll_interval=3600, grace_period=0.05)
+        store.load(self.root)
+        self.addCleanup(store.close)
+        self.assertEqual(store.version, first)
+        self.assertEqual(store.search([0.0, 1.0], top_k=1)[0]["text"], "old-0")
+        self.assertFalse(store.refresh())
+
+        old = store._current
+        second = self._publish(["new-0", "new-1"])
+        self.assertGreater(second, first)
+        self.assertTrue(store.refresh())
+        self.assertEqual(store.version, second)
+        self.assertEqual(store.search([0.0, 1.0], top_k=1)[0]["text"], "new-0")
+
+        # 切换前拿到旧引用的检索仍在旧快照上完成，宽限期后旧快照被释放
+        self.assertEqual(old.search([0.0, 1.0], top_k=1)[0]["text"], "old-0")
+        time.sleep(0.3)
+        self.assertEqual(old.search([0.0, 1.0], top_k=1), [])
+
+    def test_close_releases_retired_snapshots(self):
+        self._publish(["old"])
+        store = SnapshotVectorStore(poll_interval=3600, grace_period=3600)
+        store.load(self.root)
+        old = store._current
+        self._publish(["new"])
+        self.assertTrue(store.refresh())
+        self.assertEqual(old.search([0.0, 1.0], top_k=1)[0]["text"], "old")
+
+        # 宽限期未到就关闭：旧快照立即释放，不等定时器
+        store.close()
+        self.assertEqual(old.search([0.0, 1.0], top_k=1), [])
+        self.assertEqual(store._retired, [])
+
+    def test_watcher_picks_up_new_snapshot(self):
+        self._publish(["v1"])
+        store = VectorStoreFactory.get_vector_store("snapshot", poll_interval=0.02, mmap=True)
+        store.load(self.root)
+        self.addCleanup(store.close)
+
+        latest = self._publish(["v2"])
+        deadline = time.time() + 5
+        while store.version != latest and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(store.version, latest)
+        self.assertEqual(store.search([0.0, 1.0], top_k=1)[0]["text"], "v2")
+
+    def test_collection_waits_for_first_snapshot(self):
+        # 根目录尚不存在时按集合打开：照常开始监视，首个快照发布后可检索
+        manager = vector_store.CollectionManager()
+        self.addCleanup(manager.clear)
+        with manager.use(self.root, "snapshot", poll_interval=0.02) as store:
+            self.assertEqual(store.search([0.0, 1.0], top_k=1), [])
+            latest = self._publish(["first"])
+            deadline = time.time() + 5
+            while store.version != latest and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(store.search([0.0, 1.0], top_k=1)[0]["text"], "first")
+
+    def test_read_only_and_pruning(self):
+        for i in range(3):
+            self._publish([f"doc-{i}"], keep=2)
+        self.assertEqual(len([name for name in os.listdir(self.root) if name.startswith("v")]), 2)
+        self.assertIsNotNone(latest_version(self.root))
+
+        store = SnapshotVectorStore()
+        with self.assertRaises(ReadOnlyStoreError):
+            store.add(["x"], [[1.0, 0.0]])
+        with self.assertRaises(ReadOnlyStoreError):
+            store.delete(ids=["x"])
+        self.assertEqual(store.search_batch([[1.0, 0.0]]), [[]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
 import os
 import shutil
+import threading
+import time
 import unittest
+from unittest import mock
 import numpy as np
 from store import vector_store
+from store.providers.faiss import FAISSVectorStore
+from store.providers.snapshot import publish_snapshot
 
 
 class TestVectorStore(unittest.TestCase):
@@ -10,14 +15,14 @@ class TestVectorStore(unittest.TestCase):
         self.test_dir = "test_faiss_store"
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
-        vector_store._instances.clear()
-        vector_store._loaded_paths.clear()
+        vector_store.collections.clear()
+        vector_store.query_cache.clear()
 
     def tearDown(self):
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
-        vector_store._instances.clear()
-        vector_store._loaded_paths.clear()
+        vector_store.collections.clear()
+        vector_store.query_cache.clear()
 
     def test_add_and_search(self):
         texts = ["apple", "banana", "orange"]
@@ -34,6 +39,53 @@ class TestVectorStore(unittest.TestCase):
         self.assertEqual(results[0]["text"], "apple")
         self.assertEqual(results[0]["metadata"]["type"], "fruit")
 
+    def test_search_batch(self):
+        texts = ["apple", "banana", "orange"]
+        vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        vector_store.add(texts, vectors, path=self.test_dir)
+
+        results = vector_store.search_batch(
+            [[0.0, 0.9, 0.1], [0.1, 0.0, 0.9]], top_k=1, path=self.test_dir
+        )
+
+        self.assertEqual([r[0]["text"] for r in results], ["banana", "orange"])
+
+    def test_upsert_and_delete(self):
+        vector_store.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], ids=["1", "2"], path=self.test_dir)
+        vector_store.upsert(["b2"], [[0.0, 1.0]], ids=["2"], path=self.test_dir)
+
+        results = vector_store.search([0.0, 1.0], top_k=1, path=self.test_dir)
+        self.assertEqual(results[0]["text"], "b2")
+
+        self.assertEqual(vector_store.delete(ids=["1"], path=self.test_dir), 1)
+        results = vector_store.search([1.0, 0.0], top_k=2, path=self.test_dir)
+        self.assertEqual([r["id"] for r in results], ["2"])
+
+    def test_save_fresh_path_and_open_empty_directory(self):
+        # 从未写入过的集合：保存不报错，也不留下会被误读为旧版格式的空目录
+        vector_store.save(path=self.test_dir)
+        self.assertFalse(os.path.exists(self.test_dir))
+
+        os.makedirs(self.test_dir)
+        self.assertEqual(vector_store.search([1.0, 0.0], top_k=1, path=self.test_dir), [])
+        vector_store.add(["fresh"], [[1.0, 0.0]], path=self.test_dir)
+        vector_store.save(path=self.test_dir)
+        vector_store.load(self.test_dir)
+        self.assertEqual(vector_store.search([1.0, 0.0], top_k=1, path=self.test_dir)[0]["text"], "fresh")
+
+    def test_get_store_returns_loaded_collection(self):
+        vector_store.add(["kept"], [[1.0, 0.0]], path=self.test_dir)
+        vector_store.save(path=self.test_dir)
+        vector_store.collections.clear()
+
+        vector_store.load(self.test_dir)
+        store = vector_store.get_store("faiss", path=self.test_dir)
+        self.addCleanup(vector_store.collections.release, self.test_dir)
+        self.assertEqual(store.search([1.0, 0.0], top_k=1)[0]["text"], "kept")
+        # 与模块级接口共用同一实例
+        vector_store.add(["more"], [[0.0, 1.0]], path=self.test_dir)
+        self.assertEqual(store.search([0.0, 1.0], top_k=1)[0]["text"], "more")
+
     def test_save_and_load(self):
         texts = ["hello", "world"]
         vectors = [[0.5, 0.5], [1.0, 1.0]]
@@ -41,8 +93,7 @@ class TestVectorStore(unittest.TestCase):
         vector_store.add(texts, vectors, path=self.test_dir)
         vector_store.save(path=self.test_dir)
         
-        vector_store._loaded_paths.clear()
-        vector_store._instances.clear()
+        vector_store.collections.clear()
         
         results = vector_store.search([0.4, 0.4], top_k=1, path=self.test_dir)
         
@@ -59,8 +110,7 @@ class TestVectorStore(unittest.TestCase):
         
         self.assertTrue(os.path.exists("./save"))
         
-        vector_store._loaded_paths.clear()
-        vector_store._instances.clear()
+        vector_store.collections.clear()
         
         results = vector_store.search([1.0, 2.0], top_k=1, path="./save")
         self.assertEqual(len(results), 1)
@@ -75,8 +125,7 @@ class TestVectorStore(unittest.TestCase):
         vector_store.add(texts, vectors, path=self.test_dir)
         vector_store.save(path=self.test_dir)
         
-        vector_store._loaded_paths.clear()
-        vector_store._instances.clear()
+        vector_store.collections.clear()
         
         results = vector_store.search([0.9, 0.1], top_k=1, path=self.test_dir)
         
@@ -91,8 +140,7 @@ class TestVectorStore(unittest.TestCase):
         vector_store.add(texts1, vectors1, path=self.test_dir)
         vector_store.save(path=self.test_dir)
         
-        vector_store._loaded_paths.clear()
-        vector_store._instances.clear()
+        vector_store.collections.clear()
         
         texts2 = ["third"]
         vectors2 = [[1.0, 1.0]]
@@ -103,6 +151,232 @@ class TestVectorStore(unittest.TestCase):
         
         self.assertEqual(len(results), 3)
 
+    def test_paths_are_separate_collections(self):
+        other_dir = self.test_dir + "_other"
+        self.addCleanup(shutil.rmtree, other_dir, ignore_errors=True)
+        vector_store.add(["tenant-a"], [[1.0, 0.0]], path=self.test_dir)
+        vector_store.add(["tenant-b"], [[1.0, 0.0]], path=other_dir)
+
+        self.assertEqual(vector_store.search([1.0, 0.0], top_k=5, path=self.test_dir)[0]["text"], "tenant-a")
+        self.assertEqual([r["text"] for r in vector_store.search([1.0, 0.0], top_k=5, path=other_dir)], ["tenant-b"])
+
+
+class TestCollectionManager(unittest.TestCase):
+    def setUp(self):
+        self.root = "test_collections"
+        os.makedirs(self.root, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_lru_eviction_saves_and_reloads(self):
+        manager = vector_store.CollectionManager(root=self.root, max_collections=2)
+        for name in ("a", "b"):
+            with manager.use(name) as store:
+                store.add([f"doc-{name}"], [[1.0, 0.0]])
+        with manager.use("a"):
+            pass
+        with manager.use("c") as store:
+            store.add(["doc-c"], [[0.0, 1.0]])
+
+        stats = manager.stats()
+        # b 最久未使用，被淘汰前已落盘
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["resident"], 2)
+        self.assertNotIn(os.path.abspath(os.path.join(self.root, "b")), stats["collections"])
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 3))
+
+        with manager.use("b") as store:
+            self.assertEqual(store.search([1.0, 0.0], top_k=1)[0]["text"], "doc-b")
+        self.assertEqual(manager.stats()["misses"], 4)
+
+    def test_memory_budget(self):
+        manager = vector_store.CollectionManager(root=self.root, max_collections=10)
+        vectors = np.random.default_rng(0).standard_normal((200, 32)).astype("float32")
+        with manager.use("a") as store:
+            store.add([str(i) for i in range(200)], vectors)
+        manager.memory_budget_bytes = manager.memory_bytes() + 1
+        with manager.use("b") as store:
+            store.add([str(i) for i in range(200)], vectors)
+
+        self.assertEqual(manager.stats()["evictions"], 1)
+        self.assertLessEqual(manager.memory_bytes(), manager.memory_budget_bytes)
+
+    def test_collection_in_use_is_not_evicted(self):
+        manager = vector_store.CollectionManager(root=self.root, max_collections=1)
+        with manager.use("a") as pinned:
+            pinned.add(["x"], [[1.0]])
+            with manager.use("b"):
+                pass
+            # a 被固定，只能淘汰 b
+            self.assertEqual(manager.stats()["collections"], [os.path.abspath(os.path.join(self.root, "a"))])
+        with manager.use("a") as store:
+            self.assertIs(store, pinned)
+        self.assertEqual(manager.stats()["evictions"], 1)
+
+    def test_get_pins_until_release(self):
+        manager = vector_store.CollectionManager(root=self.root, max_collections=1)
+        held = manager.get("a")
+        held.add(["doc-a"], [[1.0, 0.0]])
+        with manager.use("b") as store:
+            store.add(["doc-b"], [[0.0, 1.0]])
+        # get 取得的实例在 release 前不会被淘汰关闭
+        self.assertEqual(held.search([1.0, 0.0], top_k=1)[0]["text"], "doc-a")
+        self.assertEqual(manager.stats()["evictions"], 1)
+
+        manager.release("a")
+        with manager.use("b"):
+            pass
+        self.assertEqual(manager.stats()["evictions"], 2)
+        # 淘汰前已保存，重新加载后数据仍在
+        with manager.use("a") as store:
+            self.assertIsNot(store, held)
+            self.assertEqual(store.search([1.0, 0.0], top_k=1)[0]["text"], "doc-a")
+
+    def test_eviction_saves_outside_manager_lock(self):
+        manager = vector_store.CollectionManager(root=self.root, max_collections=1)
+        with manager.use("a") as store:
+            store.add(["doc-a"], [[1.0, 0.0]])
+        saving, proceed = threading.Event(), threading.Event()
+        original_save = FAISSVectorStore.save
+
+        def slow_save(store, path, *args, **kwargs):
+            saving.set()
+            proceed.wait(5)
+            return original_save(store, path, *args, **kwargs)
+
+        with mock.patch.object(FAISSVectorStore, "save", slow_save):
+            # 访问 b 后释放时淘汰 a，a 的保存在该线程中进行
+            evicting = threading.Thread(target=self._touch, args=(manager, "b"))
+            evicting.start()
+            self.assertTrue(saving.wait(5))
+            # a 正在保存时，其他线程仍能取得管理器锁
+            self.assertTrue(manager._lock.acquire(timeout=1))
+            manager._lock.release()
+            proceed.set()
+            evicting.join()
+        self.assertEqual(manager.stats()["evictions"], 1)
+        with manager.use("a") as store:
+            self.assertEqual(store.search([1.0, 0.0], top_k=1)[0]["text"], "doc-a")
+
+    def test_drop_and_clear_close_idle_stores(self):
+        manager = vector_store.CollectionManager(root=self.root)
+        with manager.use("a") as idle:
+            idle.add(["doc-a"], [[1.0, 0.0]])
+        held = manager.get("b")
+        held.add(["doc-b"], [[1.0, 0.0]])
+
+        with mock.patch.object(FAISSVectorStore, "close", autospec=True) as close:
+            manager.drop("a")
+            manager.clear()
+        # 未固定的 a 被关闭，仍被持有的 b 不关闭
+        self.assertEqual([call.args[0] for call in close.call_args_list], [idle])
+        self.assertEqual(held.search([1.0, 0.0], top_k=1)[0]["text"], "doc-b")
+        manager.release("b")
+        self.assertEqual(manager.stats()["resident"], 0)
+
+    @staticmethod
+    def _touch(manager, name):
+        with manager.use(name):
+            pass
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.path = "test_query_cache"
+        vector_store.collections.clear()
+        vector_store.query_cache.clear()
+        vector_store.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], path=self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        vector_store.collections.clear()
+        vector_store.query_cache.clear()
+
+    def test_repeated_and_nearby_queries_hit(self):
+        cache = vector_store.query_cache
+        first = vector_store.search([1.0, 0.0], top_k=1, path=self.path)
+        with mock.patch.object(FAISSVectorStore, "search", side_effect=AssertionError("should hit cache")):
+            self.assertEqual(vector_store.search([1.0, 0.0], top_k=1, path=self.path), first)
+            # 取整后相同的查询共用缓存
+            self.assertEqual(vector_store.search([1.00001, -0.00001], top_k=1, path=self.path), first)
+        # top_k、filter 不同则是不同的键
+        vector_store.search([1.0, 0.0], top_k=2, path=self.path)
+        vector_store.search([1.0, 0.0], top_k=1, path=self.path, filter={"source": "x"})
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+        # 返回副本，调用方修改结果不影响缓存
+        first[0]["text"] = "mutated"
+        self.assertEqual(vector_store.search([1.0, 0.0], top_k=1, path=self.path)[0]["text"], "a")
+
+    def test_writes_and_load_invalidate(self):
+        self.assertEqual(vector_store.search([0.0, 1.0], top_k=1, path=self.path)[0]["text"], "b")
+        vector_store.add(["b2"], [[0.0, 1.1]], path=self.path)
+        vector_store.delete(ids=[vector_store.search([0.0, 1.0], top_k=1, path=self.path)[0]["id"]], path=self.path)
+        self.assertEqual(vector_store.search([0.0, 1.0], top_k=1, path=self.path)[0]["text"], "b2")
+
+        vector_store.save(self.path)
+        vector_store.load(self.path)
+        self.assertEqual(vector_store.query_cache.misses, 3)
+        vector_store.search([0.0, 1.0], top_k=1, path=self.path)
+        self.assertEqual(vector_store.query_cache.misses, 4)
+
+    def test_direct_writes_invalidate(self):
+        self.assertEqual(vector_store.search([0.0, 1.0], top_k=1, path=self.path)[0]["text"], "b")
+        store = vector_store.collections.get(self.path)
+        try:
+            store.add(["b2"], [[0.0, 1.1]])
+            store.delete(ids=[vector_store.search([0.0, 1.0], top_k=1, path=self.path)[0]["id"]])
+        finally:
+            vector_store.collections.release(self.path)
+        self.assertEqual(vector_store.search([0.0, 1.0], top_k=1, path=self.path)[0]["text"], "b2")
+        self.assertEqual(vector_store.query_cache.hits, 0)
+
+    def test_snapshot_swap_invalidates(self):
+        root = "test_query_cache_snapshots"
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.addCleanup(vector_store.collections.clear)
+
+        def publish(text):
+            source = FAISSVectorStore()
+            source.add([text], [[1.0, 0.0]])
+            publish_snapshot(source, root)
+
+        publish("v1")
+        store = vector_store.collections.get(root, "snapshot", poll_interval=3600, grace_period=0.01)
+        self.addCleanup(vector_store.collections.release, root, "snapshot")
+        search = lambda: vector_store.search([1.0, 0.0], top_k=1, provider="snapshot", path=root)[0]["text"]
+        self.assertEqual(search(), "v1")
+        self.assertEqual(search(), "v1")
+        self.assertEqual(vector_store.query_cache.hits, 1)
+
+        publish("v2")
+        self.assertTrue(store.refresh())
+        self.assertEqual(search(), "v2")
+
+    def test_batch_reuses_entries_and_searches_only_misses(self):
+        vector_store.search([1.0, 0.0], top_k=1, path=self.path)
+        with vector_store.collections.use(self.path) as store, \
+                mock.patch.object(FAISSVectorStore, "search_batch", wraps=store.search_batch) as batch:
+            results = vector_store.search_batch([[1.0, 0.0], [0.0, 1.0]], top_k=1, path=self.path)
+        self.assertEqual([r[0]["text"] for r in results], ["a", "b"])
+        self.assertEqual(len(batch.call_args.args[0]), 1)
+
+    def test_lru_and_ttl_eviction(self):
+        cache = vector_store.QueryCache(max_entries=2, ttl=0.05)
+        collection = ("faiss", "c")
+        keys = [cache.key(collection, 1, "search", [float(i)], 1) for i in range(3)]
+        for key in keys:
+            cache.put(key, [key])
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[2]), [keys[2]])
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(keys[2]))
+        # 内容代号不同是不同的键
+        cache.put(keys[1], ["old"])
+        self.assertIsNone(cache.get(cache.key(collection, 2, "search", [1.0], 1)))
+        self.assertEqual(cache.stats()["hits"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,88 +3,529 @@ input:
 - texts: 文本列表
 - vectors: 向量列表
 - query_vector: 查询向量
-- path: 持久化路径
+- query_vectors: 批量查询向量
+- ids: 文档 ID (add/upsert/delete/compact)
+- path: 持久化路径 / 集合名 (每个路径对应一个独立的集合)
 
 output:
-- search_results: 检索出的文档列表
+- search_results: 检索出的文档列表 (search_mmr 为去除近似重复后的多样性结果)
+- get_store: 从集合管理器取得并固定的集合实例 (长期持有者使用)
+- collections: 集合管理器 (按需加载、LRU 淘汰、命中/未命中/淘汰计数；use()/get()+release() 固定集合实例)
+- query_cache: 检索结果缓存 (量化查询向量哈希与存储内容代号为键，LRU/TTL 淘汰，存储内容变化后自动失效)
+- aadd/asearch/asearch_batch: 异步版本，在存储专用线程池中执行 (含集合加载)
 
 pos:
 - 位于 store 层对外唯一入口
 - 负责屏蔽底层存储细节
+- 多集合 (如每个客户一个知识库) 按需加载，常驻数量与内存受限，按 LRU 淘汰
+- search/search_batch/search_mmr 先查检索结果缓存，重复流量不再进入存储
+- 注册表加锁，并发的入库与检索共享同一实例 (实例内部读写锁保证检索并行、写入串行)
 
 声明：
 - 一旦本文件逻辑更新
 - 必须同步更新本文件注释
 - 并更新所属目录的 README.md
 """
+import copy
+import hashlib
+import json
 import os
-from typing import List, Dict, Any, Optional, Union
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from config.config import Config
+from monitoring.metrics import Metrics
+from store.base import BaseVectorStore, Vector, Vectors, as_vector_matrix
+from store.executor import run_in_store_executor
 from store.factory import VectorStoreFactory
 
 
-# 全局单例缓存（可选，通常建议由上层业务控制生命周期）
-_instances = {}
-_loaded_paths = set()
+# 检索结果缓存键中查询向量保留的小数位数
+_QUERY_DECIMALS = 4
+
+
+def get_store(provider: str = "faiss", path: str = "./vector_store", **kwargs) -> BaseVectorStore:
+    """
+    获取集合实例，供需要长期持有存储的调用方 (如 agent) 使用
+
+    与模块级 add/search/load 共用集合管理器：load(path) 之后取到的就是已加载的实例。
+    实例被固定，不会被淘汰关闭；不再使用时调用 collections.release(path, provider)。
+
+    Args:
+        provider: 存储引擎
+        path: 集合路径
+        **kwargs: 首次创建时的构造参数 (如 dimension)
+    """
+    return collections.get(path, provider, **kwargs)
+
+
+class CollectionManager:
+    """
+    向量集合管理器：每个集合 (持久化目录) 对应一个独立的存储实例
+
+    - 首次访问时按需创建并从磁盘加载 (未命中)，之后直接复用 (命中)
+    - 常驻集合数超过 max_collections，或估算内存 (BaseVectorStore.memory_bytes) 超过 memory_budget_bytes 时，
+      按最近最少使用 (LRU) 淘汰；淘汰前先 save 再 close，未落盘的写入不会丢失
+    - 被固定 (use 上下文内，或 get 之后尚未 release) 的集合不会被淘汰
+    - 淘汰对象在锁内选出，保存与关闭在锁外进行，不阻塞其他集合的访问；
+      保存期间再次访问该集合会等待保存完成后从磁盘重新加载
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_collections: int = Config.VECTOR_STORE_MAX_COLLECTIONS,
+        memory_budget_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            root: 集合根目录；给定时不含路径分隔符的名称解析为 root/名称，否则名称即路径
+            max_collections: 常驻集合数上限
+            memory_budget_bytes: 常驻集合估算内存上限，None 表示不限
+        """
+        self.root = root
+        self.max_collections = max_collections
+        self.memory_budget_bytes = memory_budget_bytes
+        self._stores: "OrderedDict[Tuple[str, str], BaseVectorStore]" = OrderedDict()
+        self._in_use: Dict[Tuple[str, str], int] = {}
+        self._loading: Dict[Tuple[str, str], threading.Event] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resolve(self, collection: str) -> str:
+        if self.root and os.sep not in collection and "/" not in collection:
+            return os.path.join(self.root, collection)
+        return collection
+
+    def _key(self, collection: str, provider: str) -> Tuple[str, str]:
+        return provider, os.path.abspath(self.resolve(collection))
+
+    def get(self, collection: str, provider: str = "faiss", **kwargs) -> BaseVectorStore:
+        """
+        获取并固定集合实例，未常驻时创建并加载
+
+        返回的实例在 release 之前不会被淘汰 (淘汰会 close 实例)，适合长期持有 (如交给 agent)；
+        只在一段代码内使用时优先用 use()
+
+        Args:
+            collection: 集合名或持久化路径
+            provider: 存储引擎
+            **kwargs: 首次创建时的构造参数
+        """
+        return self._acquire(self._key(collection, provider), collection, provider, kwargs)
+
+    def release(self, collection: str, provider: str = "faiss"):
+        """解除一次 get 的固定，之后该集合可被淘汰，调用方不应再使用此前取得的实例"""
+        self._release(self._key(collection, provider))
+
+    @contextmanager
+    def use(self, collection: str, provider: str = "faiss", **kwargs) -> Iterator[BaseVectorStore]:
+        """在上下文内固定集合，期间不会被淘汰"""
+        key = self._key(collection, provider)
+        store = self._acquire(key, collection, provider, kwargs)
+        try:
+            yield store
+        finally:
+            self._release(key)
+
+    def _release(self, key: Tuple[str, str]):
+        with self._lock:
+            count = self._in_use.get(key, 0) - 1
+            if count > 0:
+                self._in_use[key] = count
+            else:
+                self._in_use.pop(key, None)
+            victims = self._pick_victims()
+        self._retire(victims)
+
+    def _acquire(
+        self,
+        key: Tuple[str, str],
+        collection: str,
+        provider: str,
+        kwargs: Dict[str, Any]
+    ) -> BaseVectorStore:
+        while True:
+            with self._lock:
+                store = self._stores.get(key)
+                if store is not None:
+                    self._stores.move_to_end(key)
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    self.hits += 1
+                    _count("hit")
+                    return store
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    _count("miss")
+                    break
+            # 同一集合正在被其他线程加载：等待其完成后按命中处理
+            loading.wait()
 
+        # 加载不持有管理器锁，其他集合的访问不受影响
+        try:
+            store = VectorStoreFactory.get_vector_store(provider, **kwargs)
+            path = self.resolve(collection)
+            # 不存在或尚未保存过的空目录视为新集合 (always_load 的存储自行处理)
+            if store.always_load or (os.path.isdir(path) and os.listdir(path)):
+                store.load(path)
+            with self._lock:
+                self._stores[key] = store
+                self._in_use[key] = self._in_use.get(key, 0) + 1
+            return store
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
 
-def get_store(provider: str = "faiss", **kwargs):
+    def _pick_victims(self) -> List[Tuple[Tuple[str, str], BaseVectorStore, threading.Event]]:
+        """(持有锁) 按 LRU 选出需淘汰的集合并移出；标记为加载中，保存完成前的访问会等待"""
+        victims = []
+        while True:
+            over_count = len(self._stores) > self.max_collections
+            over_memory = (
+                self.memory_budget_bytes is not None
+                and len(self._stores) > 1
+                and self.memory_bytes() > self.memory_budget_bytes
+            )
+            if not (over_count or over_memory):
+                return victims
+            victim = next((key for key in self._stores if key not in self._in_use), None)
+            if victim is None:
+                return victims
+            saving = self._loading[victim] = threading.Event()
+            victims.append((victim, self._stores.pop(victim), saving))
+
+    def _retire(self, victims: List[Tuple[Tuple[str, str], BaseVectorStore, threading.Event]]):
+        """(不持有锁) 保存并关闭被淘汰的集合；保存失败时放回常驻集合，不丢失写入"""
+        for i, (key, store, saving) in enumerate(victims):
+            try:
+                store.save(key[1])
+            except Exception:
+                # 本集合与其余尚未处理的集合都放回常驻
+                with self._lock:
+                    for pending, pending_store, _ in victims[i:]:
+                        self._stores[pending] = pending_store
+                        del self._loading[pending]
+                for _, _, pending_saving in victims[i:]:
+                    pending_saving.set()
+                raise
+            store.close()
+            with self._lock:
+                del self._loading[key]
+                self.evictions += 1
+            saving.set()
+            _count("eviction")
+
+    def drop(self, collection: str, provider: str = "faiss"):
+        """移出集合 (不保存) 并关闭，下次访问重新从磁盘加载；仍被固定的实例留给持有者继续使用，不关闭"""
+        key = self._key(collection, provider)
+        with self._lock:
+            store = self._stores.pop(key, None)
+            idle = [store] if store is not None and key not in self._in_use else []
+        self._close(idle)
+
+    def clear(self):
+        """移出全部集合 (不保存) 并清零计数；未被固定的实例随之关闭"""
+        with self._lock:
+            idle = [store for key, store in self._stores.items() if key not in self._in_use]
+            self._stores.clear()
+            self.hits = self.misses = self.evictions = 0
+        self._close(idle)
+
+    @staticmethod
+    def _close(stores: List[BaseVectorStore]):
+        """(不持有锁) 关闭移出的实例，释放文件句柄与后台线程"""
+        for store in stores:
+            store.close()
+
+    def memory_bytes(self) -> int:
+        return sum(store.memory_bytes() for store in self._stores.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            memory = self.memory_bytes()
+            lookups = self.hits + self.misses
+            Metrics.set_gauge("vector_store_collections_resident", len(self._stores), "常驻向量集合数", root=self.root or "")
+            Metrics.set_gauge("vector_store_collections_memory_bytes", memory, "常驻向量集合估算内存", root=self.root or "")
+            return {
+                "resident": len(self._stores),
+                "collections": [path for _, path in self._stores],
+                "memory_bytes": memory,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _count(event: str):
+    Metrics.inc_counter("vector_store_collection_events_total", "向量集合命中/未命中/淘汰次数", event=event)
+
+
+class QueryCache:
     """
-    获取或创建一个存储实例。
-    注意：这里的 kwargs 应该是初始化参数（如 dimension）。
+    检索结果缓存：相同 (或几乎相同) 的查询直接返回上次的结果
+
+    - 键: 集合 + 存储内容代号 + 检索方式 + 查询向量按 decimals 位小数取整后的哈希 + top_k + filter 等检索参数
+    - 按条数上限 LRU 淘汰，超过 ttl 秒的条目视为过期 (ttl 为 0 时不过期)
+    - 内容代号由存储实例自身在 add/delete/load、快照切换后更新 (见 BaseVectorStore.content_generation)，
+      无论经本模块还是直接操作实例写入，旧代号的条目都不再命中，由 LRU 自然淘汰
+    - 命中/未命中通过 Metrics 上报 (vector_store_query_cache_total{result=hit|miss})
     """
-    # 过滤掉非初始化参数（可选，但目前为了兼容性，我们通过 key 来区分）
-    instance_key = f"{provider}_{str(kwargs)}"
-    if instance_key not in _instances:
-        _instances[instance_key] = VectorStoreFactory.get_vector_store(provider, **kwargs)
-    return _instances[instance_key]
 
+    def __init__(
+        self,
+        max_entries: int = Config.VECTOR_STORE_QUERY_CACHE_SIZE,
+        ttl: float = Config.VECTOR_STORE_QUERY_CACHE_TTL,
+        decimals: int = _QUERY_DECIMALS,
+    ):
+        """
+        Args:
+            max_entries: 缓存条数上限，0 表示关闭缓存
+            ttl: 条目有效期 (秒)，0 表示不过期
+            decimals: 查询向量取整的小数位数，差异小于该精度的查询共用缓存
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.decimals = decimals
+        # 键 → (写入时间, 结果)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, collection: Tuple[str, str], generation: int, mode: str, query_vector, top_k: int, **kwargs) -> Tuple:
+        rounded = np.round(np.asarray(query_vector, dtype=np.float32), self.decimals) + 0.0  # -0.0 与 0.0 同键
+        digest = hashlib.blake2b(rounded.tobytes(), digest_size=16).hexdigest()
+        params = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+        return collection, generation, mode, digest, top_k, params
 
-def _ensure_loaded(path: str = "./save", provider: str = "faiss"):
-    """确保数据已加载"""
-    full_path = f"{provider}:{path}"
-    if full_path not in _loaded_paths:
-        store = get_store(provider)
-        if os.path.exists(path):
-            store.load(path)
-            _loaded_paths.add(full_path)
+    def get(self, key: Tuple) -> Optional[Any]:
+        """返回结果的副本；条目不存在或已过期时返回 None"""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, results = entry
+                if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+                    del self._entries[key]
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        Metrics.inc_counter("vector_store_query_cache_total", "检索结果缓存命中/未命中次数", result="miss" if entry is None else "hit")
+        return copy.deepcopy(results) if entry is not None else None
+
+    def put(self, key: Tuple, results: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空条目并清零计数"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            Metrics.set_gauge("vector_store_query_cache_entries", len(self._entries), "检索结果缓存条数", cache="query")
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+collections = CollectionManager(
+    memory_budget_bytes=int(Config.VECTOR_STORE_MEMORY_BUDGET_MB * 1024 * 1024) or None
+)
+query_cache = QueryCache()
+
+
+def _cached(mode: str, query_vector, top_k: int, provider: str, path: str, run, **kwargs):
+    """run(store) 执行检索；键含检索前读到的内容代号，检索期间存储有写入时结果不写入缓存"""
+    with collections.use(path, provider) as store:
+        generation = store.content_generation
+        key = query_cache.key(collections._key(path, provider), generation, mode, query_vector, top_k, **kwargs)
+        results = query_cache.get(key)
+        if results is None:
+            results = run(store)
+            if store.content_generation == generation:
+                query_cache.put(key, results)
+    return results
 
 
 def add(
     texts: List[str], 
-    vectors: List[List[float]], 
+    vectors: Vectors, 
     metadatas: Optional[List[Dict[str, Any]]] = None,
     provider: str = "faiss",
     path: str = "./vector_store",
+    ids: Optional[List[str]] = None,
     **kwargs
 ) -> List[str]:
     """快捷添加接口"""
-    _ensure_loaded(path, provider)
-    store = get_store(provider)
-    return store.add(texts, vectors, metadatas, **kwargs)
+    with collections.use(path, provider) as store:
+        return store.add(texts, vectors, metadatas, ids=ids, **kwargs)
+
+
+def upsert(
+    texts: List[str], 
+    vectors: Vectors, 
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+    provider: str = "faiss",
+    path: str = "./vector_store",
+    ids: Optional[List[str]] = None,
+    **kwargs
+) -> List[str]:
+    """快捷插入或覆盖接口"""
+    with collections.use(path, provider) as store:
+        return store.upsert(texts, vectors, metadatas, ids=ids, **kwargs)
+
+
+def delete(
+    ids: Optional[List[str]] = None,
+    filter: Optional[Dict[str, Any]] = None,
+    provider: str = "faiss",
+    path: str = "./vector_store",
+    **kwargs
+) -> int:
+    """快捷删除接口：按 ID 或元数据过滤条件删除"""
+    with collections.use(path, provider) as store:
+        return store.delete(ids=ids, filter=filter, **kwargs)
 
 
 def search(
-    query_vector: List[float], 
+    query_vector: Vector, 
     top_k: int = 5, 
     provider: str = "faiss",
     path: str = "./vector_store",
     **kwargs
 ) -> List[Dict[str, Any]]:
-    """快捷检索接口"""
-    _ensure_loaded(path, provider)
-    store = get_store(provider)
-    return store.search(query_vector, top_k, **kwargs)
+    """快捷检索接口 (经检索结果缓存)"""
+    def run(store: BaseVectorStore):
+        return store.search(query_vector, top_k, **kwargs)
+
+    return _cached("search", query_vector, top_k, provider, path, run, **kwargs)
+
+
+def search_batch(
+    query_vectors: Vectors,
+    top_k: int = 5,
+    provider: str = "faiss",
+    path: str = "./vector_store",
+    **kwargs
+) -> List[List[Dict[str, Any]]]:
+    """快捷批量检索接口：逐条查缓存，未命中的查询合并为一次检索"""
+    collection = collections._key(path, provider)
+    with collections.use(path, provider) as store:
+        generation = store.content_generation
+        keys = [
+            query_cache.key(collection, generation, "search", query_vector, top_k, **kwargs)
+            for query_vector in query_vectors
+        ]
+        results = [query_cache.get(key) for key in keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            fetched = store.search_batch(as_vector_matrix(query_vectors)[missing], top_k, **kwargs)
+            unchanged = store.content_generation == generation
+            for i, rows in zip(missing, fetched):
+                if unchanged:
+                    query_cache.put(keys[i], rows)
+                results[i] = rows
+    return results
+
+
+def search_mmr(
+    query_vector: Vector,
+    top_k: int = 5,
+    fetch_k: int = 20,
+    lambda_mult: float = 0.5,
+    provider: str = "faiss",
+    path: str = "./vector_store",
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """快捷多样性检索接口：从 fetch_k 个候选中按最大边际相关性挑出 top_k 个，去掉近似重复的块 (经检索结果缓存)"""
+    def run(store: BaseVectorStore):
+        return store.search_mmr(query_vector, top_k, fetch_k=fetch_k, lambda_mult=lambda_mult, **kwargs)
+
+    return _cached("mmr", query_vector, top_k, provider, path, run, fetch_k=fetch_k, lambda_mult=lambda_mult, **kwargs)
+
+
+async def aadd(
+    texts: List[str],
+    vectors: Vectors,
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+    provider: str = "faiss",
+    path: str = "./vector_store",
+    ids: Optional[List[str]] = None,
+    **kwargs
+) -> List[str]:
+    """快捷异步写入接口：集合加载与写入都在存储专用线程池中完成"""
+    return await run_in_store_executor(add, texts, vectors, metadatas, provider=provider, path=path, ids=ids, **kwargs)
+
+
+async def asearch(
+    query_vector: Vector,
+    top_k: int = 5,
+    provider: str = "faiss",
+    path: str = "./vector_store",
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """快捷异步检索接口"""
+    return await run_in_store_executor(search, query_vector, top_k, provider=provider, path=path, **kwargs)
+
+
+async def asearch_batch(
+    query_vectors: Vectors,
+    top_k: int = 5,
+    provider: str = "faiss",
+    path: str = "./vector_store",
+    **kwargs
+) -> List[List[Dict[str, Any]]]:
+    """快捷异步批量检索接口"""
+    return await run_in_store_executor(search_batch, query_vectors, top_k, provider=provider, path=path, **kwargs)
+
+
+def compact(path: str = "./vector_store", provider: str = "faiss") -> int:
+    """快捷压缩接口：物理清除集合中已删除的条目"""
+    with collections.use(path, provider) as store:
+        return store.compact()
 
 
 def save(path: str = "./vector_store", provider: str = "faiss", **kwargs):
-    """持久化存储"""
-    os.makedirs(path, exist_ok=True)
-    store = get_store(provider)
-    store.save(path)
+    """持久化存储 (目录由存储在保存时创建)"""
+    with collections.use(path, provider) as store:
+        store.save(path)
 
 
 def load(path: str = "./vector_store", provider: str = "faiss", **kwargs):
-    """从本地加载"""
-    store = get_store(provider)
-    store.load(path)
-    return store
+    """
+    从本地 (重新) 加载集合，丢弃未保存的内存状态
+
+    不返回实例：集合可能随时被淘汰并关闭，需要直接操作实例时用 collections.use()，
+    或 collections.get() 固定后在用完时 release
+    """
+    collections.drop(path, provider)
+    with collections.use(path, provider):
+        pass
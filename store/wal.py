@@ -0,0 +1,121 @@
+"""
+input:
+- path: 预写日志文件路径
+- records: 变更记录 (add: labels/ids/texts/metadatas + 向量; delete: labels)
+
+output:
+- append_records: 追加并 fsync 一批记录
+- read_records: 顺序读出完整记录，遇到残缺尾部即停止
+- record_bytes: 估算记录在内存中占用的字节数 (待写缓冲计入内存预算)
+
+pos:
+- 位于 store 层
+- 负责向量存储的追加式预写日志 (WAL)，使每次持久化只写本次新增的内容
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+_MAGIC = b"WAL1"
+# magic | header 长度 (u32) | 向量字节数 (u64)
+_PREFIX = struct.Struct("<4sIQ")
+_CRC = struct.Struct("<I")
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    header = {key: value for key, value in record.items() if key != "vectors"}
+    vectors = record.get("vectors")
+    payload = b""
+    if vectors is not None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        header["dim"] = int(vectors.shape[1])
+        payload = vectors.tobytes()
+    header_bytes = json.dumps(header, ensure_ascii=False, default=str).encode("utf-8")
+    body = header_bytes + payload
+    return _PREFIX.pack(_MAGIC, len(header_bytes), len(payload)) + body + _CRC.pack(zlib.crc32(body))
+
+
+def append_records(path: str, records: List[Dict[str, Any]]):
+    """
+    追加一批记录并 fsync
+
+    每条记录自带长度与 CRC32 校验；写入中途崩溃只会留下残缺的尾部，读取时会被丢弃。
+    """
+    if not records:
+        return
+    data = b"".join(_encode(record) for record in records)
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_records(path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    顺序读取全部完整记录
+
+    Returns:
+        (记录列表, 完整记录的总字节数)；后者小于文件大小时说明尾部残缺，可据此截断
+    """
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, "rb") as f:
+        data = f.read()
+
+    records = []
+    offset = 0
+    while offset + _PREFIX.size <= len(data):
+        magic, header_len, payload_len = _PREFIX.unpack_from(data, offset)
+        end = offset + _PREFIX.size + header_len + payload_len + _CRC.size
+        if magic != _MAGIC or end > len(data):
+            break
+        body = data[offset + _PREFIX.size:end - _CRC.size]
+        if zlib.crc32(body) != _CRC.unpack_from(data, end - _CRC.size)[0]:
+            break
+        record = json.loads(body[:header_len].decode("utf-8"))
+        if payload_len:
+            record["vectors"] = np.frombuffer(body[header_len:], dtype=np.float32).reshape(-1, record.pop("dim"))
+        records.append(record)
+        offset = end
+    return records, offset
+
+
+def wal_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def truncate(path: str, size: int):
+    """丢弃残缺尾部"""
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        os.truncate(path, size)
+
+
+def add_record(
+    labels: List[int],
+    vectors: np.ndarray,
+    ids: List[str],
+    texts: List[str],
+    metadatas: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    return {"op": "add", "labels": labels, "ids": ids, "texts": texts, "metadatas": metadatas, "vectors": vectors}
+
+
+def delete_record(labels: List[int]) -> Dict[str, Any]:
+    return {"op": "delete", "labels": labels}
+
+
+def record_bytes(record: Dict[str, Any]) -> int:
+    """向量 + label + 文档 ID/文本的字节数 (元数据按文本量级忽略)"""
+    vectors = record.get("vectors")
+    size = 8 * len(record["labels"]) + (vectors.nbytes if vectors is not None else 0)
+    return size + sum(len(value) for key in ("ids", "texts") for value in record.get(key, ()))
@@ -45,6 +45,10 @@ def get_mock_agent():
         {"text": "RAG (Retrieval-Augmented Generation) 是一种结合检索和生成的架构。", "metadata": {"source": "test1"}, "score": 0.1},
         {"text": "LangGraph 可以用于构建复杂的有状态 Agent 工作流。", "metadata": {"source": "test2"}, "score": 0.2}
     ]
+    # Retrieval issues one batched search for all expanded queries
+    vector_store.search_batch.side_effect = lambda query_vectors, top_k=3: [
+        vector_store.search.return_value for _ in query_vectors
+    ]
 
     # Mock Embed function
     mock_embed_func = MagicMock(return_value=[0.1, 0.2, 0.3])
@@ -71,7 +75,7 @@ def test_structured_rag_flow():
         
         # Verify internal store search was called
         print(f"\n--- Verification ---")
-        print(f"Vector store search called: {agent.vector_store.search.called}")
+        print(f"Vector store search_batch called: {agent.vector_store.search_batch.called}")
         print(f"Embed func called: {agent.embed_func.called}")
         
     except Exception as e:
@@ -0,0 +1,73 @@
+"""
+input:
+- thread_name_prefix: 线程名前缀 (区分所属层)
+- default_workers: 返回默认线程数的函数 (首次创建与重新配置时调用，读取各层自己的配置)
+- fn / args / kwargs: 要在线程池中执行的同步调用
+- max_workers: 线程数
+
+output:
+- BoundedExecutor: 按需创建、可重新配置的共享有界线程池，run 可 await 同步调用的结果
+- cpu_workers: 配置值为 0 时取 CPU 核数
+
+pos:
+- 位于 utils 层
+- store 与 embedding 各持有一个实例 (store/executor.py、embedding/executor.py)，
+  线程池互相隔离，检索与嵌入不争抢同一组线程
+
+声明：
+- 一旦本文件逻辑更新
+- 必须同步更新本文件注释
+- 并更新所属目录的 README.md
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+def cpu_workers(configured: int) -> int:
+    """配置的线程数，0 表示 CPU 核数"""
+    return configured or os.cpu_count() or 4
+
+
+class BoundedExecutor:
+    """
+    共享的有界线程池
+
+    - 首次使用时创建，线程数取 default_workers()
+    - configure 按新的并行度重建，已提交的任务在旧线程池中继续执行完
+    - run 在线程池中执行同步调用并等待结果，不阻塞事件循环；并发再多也最多占用 max_workers 个线程
+    """
+
+    def __init__(self, thread_name_prefix: str, default_workers: Callable[[], int]):
+        self.thread_name_prefix = thread_name_prefix
+        self.default_workers = default_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _create(self, max_workers: Optional[int]) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=max_workers or self.default_workers(), thread_name_prefix=self.thread_name_prefix
+        )
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create(None)
+            return self._executor
+
+    def configure(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: 线程数，None 时取默认值
+        """
+        with self._lock:
+            old, self._executor = self._executor, self._create(max_workers)
+        if old is not None:
+            old.shutdown(wait=False)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(), functools.partial(fn, *args, **kwargs))